@@ -7,7 +7,11 @@ import shutil
 import sys
 
 from retico.headless import load
-from retico.core.audio.io import SpeakerModule, StreamingSpeakerModule
+from retico.core.audio.io import (
+    SpeakerModule,
+    StreamingSpeakerModule,
+    VirtualSpeakerModule,
+)
 from retico.modules.net.network import DelayedNetworkModule
 
 
@@ -38,24 +42,30 @@ def end_sim(module, event_name, data):
     is_running = False
 
 
-def do_sim(delay_level, i):
-    global sim_base, is_running, log_files
-    print(f"  Simulation {i}")
+def load_network():
+    """Load the network once. The modules are reset and reused for every
+    simulation."""
     modules, _ = load(sim_base)
     new_modules = []
     for module in modules:
         if isinstance(module, (SpeakerModule, StreamingSpeakerModule)):
-            module.remove()
-            continue
-        if isinstance(module, DelayedNetworkModule):
-            module.delay = delay_level
+            module = VirtualSpeakerModule.from_speaker(module)
         module.event_subscribe("dialogue_end", end_sim)
         module.event_subscribe(
             "doubletalk", lambda a, b, c: print(f"Double Talk {a.tt_delay}")
         )
-        module.setup()
         new_modules.append(module)
-    modules = new_modules
+    return new_modules
+
+
+def do_sim(delay_level, i):
+    global sim_base, is_running, log_files, modules
+    print(f"  Simulation {i}")
+    for module in modules:
+        module.reset()
+        if isinstance(module, DelayedNetworkModule):
+            module.delay = delay_level
+        module.setup()
 
     is_running = True
     for module in modules:
@@ -83,6 +93,7 @@ def do_sim(delay_level, i):
         shutil.move(log_file, current_path)
 
 
+modules = load_network()
 for delay_level in DELAY_LEVELS:
     current_folder = f"{OUTPUT_FOLDER}/{CONVTYPE}_{int(delay_level*1000)}"
     if not os.path.exists(current_folder):
@@ -6,22 +6,57 @@ The IncrementalQueue defines the basic functionality of an incremental queue
 like appending an IU to the queue and letting modules subscribe to the Queue.
 The Incremental Unit provides the basic data structure to exchange information
 between modules.
+The UpdateMessage wraps an IU together with the type of update (ADD, REVOKE or
+COMMIT) that should be communicated to the modules consuming the IU.
 """
 
 import queue
 import threading
 import time
+import weakref
 
 QUEUE_TIMEOUT = 0.01
 
 
+class UpdateType:
+    """The types of updates that a module may send about an incremental unit.
+
+    Attributes:
+        ADD (str): A new IU was produced.
+        REVOKE (str): A previously produced IU is no longer valid.
+        COMMIT (str): A previously produced IU will not change or be revoked
+            anymore.
+    """
+
+    ADD = "add"
+    REVOKE = "revoke"
+    COMMIT = "commit"
+
+
+class UpdateMessage:
+    """A message that is placed in an incremental queue and informs the
+    consuming module about an update of an incremental unit.
+
+    Attributes:
+        iu (IncrementalUnit): The incremental unit the update is about.
+        update_type (str): The type of the update as defined in UpdateType.
+    """
+
+    def __init__(self, iu, update_type=UpdateType.ADD):
+        self.iu = iu
+        self.update_type = update_type
+
+    def __repr__(self):
+        return "%s: %s" % (self.update_type, self.iu)
+
+
 class IncrementalQueue(queue.Queue):
     """An abstract incremental queue.
 
     A module may subscribe to a queue of another module. Every time a new
-    incremental unit (IU) is produced, the IU is put into a special queue for
-    every subscriber to the incremental queue. Every unit gets its own queue and
-    may process the items at different speeds.
+    incremental unit (IU) is produced, revoked or committed, an UpdateMessage is
+    put into a special queue for every subscriber to the incremental queue.
+    Every unit gets its own queue and may process the items at different speeds.
 
     Attributes:
         provider (AbstractModule): The module that provides IUs for this queue.
@@ -64,6 +99,9 @@ class IncrementalUnit:
     """
 
     MAX_DEPTH = 10
+    tracker = None
+    """An optional tracker (e.g. `retico.core.debug.memory.IUMemoryTracker`)
+    that every newly created IU is registered with."""
 
     def __init__(
         self,
@@ -96,13 +134,17 @@ class IncrementalUnit:
 
         self.committed = False
         self.revoked = False
+        self._grounded_ius = weakref.WeakSet()
 
         self.meta_data = {}
         if grounded_in:
             self.meta_data = {**grounded_in.meta_data}
+            grounded_in.add_grounded_iu(self)
 
         self.created_at = time.time()
         self._remove_old_links()
+        if IncrementalUnit.tracker is not None:
+            IncrementalUnit.tracker.register(self)
 
     def _remove_old_links(self):
         current_depth = 0
@@ -178,6 +220,28 @@ class IncrementalUnit:
         with self.mutex:
             return module in self._processed_list
 
+    def add_grounded_iu(self, iu):
+        """Register an IU that is grounded in this IU.
+
+        The IU is only referenced weakly, so that registering it does not keep
+        it alive.
+
+        Args:
+            iu (IncrementalUnit): An IU that is grounded in this IU.
+        """
+        with self.mutex:
+            self._grounded_ius.add(iu)
+
+    def grounded_ius(self):
+        """Return a list of all IUs that are grounded in this IU and are still
+        alive.
+
+        Returns:
+            list: A list of IUs that are grounded in this IU.
+        """
+        with self.mutex:
+            return list(self._grounded_ius)
+
     def __repr__(self):
         return "%s - (%s): %s" % (
             self.type(),
@@ -271,6 +335,7 @@ class AbstractModule:
         """
         self._right_buffers = []
         self.is_running = False
+        self._run_thread = None
         self._previous_iu = None
         self._left_buffers = []
         self.mutex = threading.Lock()
@@ -376,8 +441,46 @@ class AbstractModule:
             return
         if not isinstance(iu, IncrementalUnit):
             raise TypeError("IU is of type %s but should be IncrementalUnit" % type(iu))
+        self._put_update(UpdateMessage(iu, UpdateType.ADD))
+
+    def _put_update(self, update_message):
         for q in self._right_buffers:
-            q.put(iu)
+            q.put(update_message)
+
+    def revoke(self, iu):
+        """Revoke an IU that was produced by this module.
+
+        The revoked flag of the IU is set and a REVOKE update is put into all
+        output queues. The modules that consume the IU are informed through
+        their `process_revoke` method and automatically revoke the IUs they
+        produced that are grounded in the revoked IU. Revoking an IU that is
+        already revoked does nothing.
+
+        Args:
+            iu (IncrementalUnit): The IU that should be revoked.
+        """
+        with iu.mutex:
+            if iu.revoked:
+                return
+            iu.revoked = True
+        self._put_update(UpdateMessage(iu, UpdateType.REVOKE))
+
+    def commit(self, iu):
+        """Commit an IU that was produced by this module.
+
+        The committed flag of the IU is set and a COMMIT update is put into all
+        output queues. The modules that consume the IU are informed through
+        their `process_commit` method. Committing an IU that is already
+        committed does nothing.
+
+        Args:
+            iu (IncrementalUnit): The IU that should be committed.
+        """
+        with iu.mutex:
+            if iu.committed:
+                return
+            iu.committed = True
+        self._put_update(UpdateMessage(iu, UpdateType.COMMIT))
 
     def subscribe(self, module, q=None):
         """Subscribe a module to the queue.
@@ -475,34 +578,66 @@ class AbstractModule:
         """
         raise NotImplementedError()
 
+    def process_revoke(self, revoked_iu):
+        """Handles the revocation of an IU that was given to this module.
+
+        This method is called exactly once for every revoked input IU. It may
+        be used to remove the IU from internal buffers. IUs that this module
+        created based on the revoked IU are revoked automatically after this
+        method returns.
+
+        Args:
+            revoked_iu (IncrementalUnit): The IU that was revoked.
+        """
+        pass
+
+    def process_commit(self, committed_iu):
+        """Handles the commitment of an IU that was given to this module.
+
+        This method is called exactly once for every committed input IU.
+
+        Args:
+            committed_iu (IncrementalUnit): The IU that was committed.
+        """
+        pass
+
+    def _process_update(self, update_message):
+        input_iu = update_message.iu
+        if not self.is_valid_input_iu(input_iu):
+            raise TypeError("This module can't handle this " "type of IU")
+        if update_message.update_type == UpdateType.REVOKE:
+            self.process_revoke(input_iu)
+            for grounded_iu in input_iu.grounded_ius():
+                if grounded_iu.creator is self:
+                    self.revoke(grounded_iu)
+            return
+        if update_message.update_type == UpdateType.COMMIT:
+            self.process_commit(input_iu)
+            return
+        self.event_call(self.EVENT_PROCESS_IU, {"iu": input_iu})
+        output_iu = self.process_iu(input_iu)
+        input_iu.set_processed(self)
+        if output_iu:
+            if self.output_iu() is not None or isinstance(
+                output_iu, self.output_iu()
+            ):
+                self.append(output_iu)
+            else:
+                raise TypeError(
+                    "This module should not produce" " IUs of this type."
+                )
+
     def _run(self):
         self.prepare_run()
-        self.is_running = True
         while self.is_running:
             for buffer in self._left_buffers:
                 with self.mutex:
                     try:
-                        input_iu = buffer.get(timeout=QUEUE_TIMEOUT)
+                        update_message = buffer.get(timeout=QUEUE_TIMEOUT)
                     except queue.Empty:
-                        input_iu = None
-                    if input_iu:
-                        if not self.is_valid_input_iu(input_iu):
-                            raise TypeError(
-                                "This module can't handle this " "type of IU"
-                            )
-                        self.event_call(self.EVENT_PROCESS_IU, {"iu": input_iu})
-                        output_iu = self.process_iu(input_iu)
-                        input_iu.set_processed(self)
-                        if output_iu:
-                            if self.output_iu() is not None or isinstance(
-                                output_iu, self.output_iu()
-                            ):
-                                self.append(output_iu)
-                            else:
-                                raise TypeError(
-                                    "This module should not produce"
-                                    " IUs of this type."
-                                )
+                        update_message = None
+                    if update_message:
+                        self._process_update(update_message)
         self.shutdown()
 
     def is_valid_input_iu(self, iu):
@@ -553,6 +688,27 @@ class AbstractModule:
         be used to tear down the pipeline needed for processing the IUs."""
         pass
 
+    def reset(self):
+        """Resets the conversation state of the module so that the same module
+        can be run again without being created anew.
+
+        Resources that were loaded by the module (like models, corpora or audio
+        devices) are kept. This method resets the IU counter and the link to the
+        previously created IU and discards all IUs that are still waiting in the
+        left buffers of the module.
+
+        Modules that keep additional state about the current conversation
+        should extend this method. It should only be called while the module is
+        not running. If the thread of the previous run is still shutting down,
+        this method waits for it first.
+        """
+        self.join()
+        self.iu_counter = 0
+        self._previous_iu = None
+        for buffer in self.left_buffers():
+            with buffer.mutex:
+                buffer.queue.clear()
+
     def run(self, run_setup=True):
         """Run the processing pipeline of this module in a new thread. The
         thread can be stopped by calling the stop() method.
@@ -566,21 +722,43 @@ class AbstractModule:
         for q in self.right_buffers():
             with q.mutex:
                 q.queue.clear()
-        t = threading.Thread(target=self._run)
-        t.start()
+        self.is_running = True
+        self._run_thread = threading.Thread(target=self._run)
+        self._run_thread.start()
         self.event_call(self.EVENT_START)
 
     def stop(self, clear_buffer=True):
         """Stops the execution of the processing pipeline of this module at the
         next possible point in time. This may be after the next incoming IU is
-        processed."""
+        processed.
+
+        Unless it is called from the thread of the module itself, this method
+        waits until the thread has finished and the `shutdown` method was
+        executed, so that the module can be reset and set up again right away.
+        """
         self.is_running = False
+        self._wake()
         if clear_buffer:
             for buffer in self.right_buffers():
                 while not buffer.empty():
                     buffer.get()
+        self.join()
         self.event_call(self.EVENT_STOP)
 
+    def _wake(self):
+        """Wake up the thread of the module if it is waiting, so that it notices
+        that the module was stopped."""
+        pass
+
+    def join(self):
+        """Wait until the thread of the last run of the module has finished.
+        Does nothing if the module was not run or if it is called from the thread
+        of the module itself."""
+        thread = self._run_thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+            self._run_thread = None
+
     def create_iu(self, grounded_in=None):
         """Creates a new Incremental Unit that contains the information of the
         creator (the current module), the previous IU that was created in this
@@ -674,8 +852,11 @@ class AbstractProducingModule(AbstractModule):
     """An abstract producing module that is able to incrementally process data.
 
     The producing module has no input queue and thus does not wait for any
-    input. The producing module is called continously and may return new output
-    when it becomes available.
+    input. Instead, the module waits until its source of data signals that new
+    data is available by calling the `notify` or the `signal` method. For every
+    notification, the process_iu method is called once and may return new
+    output. While no data is available, the module does not use any CPU time
+    and stopping the module wakes it up immediately.
     """
 
     @staticmethod
@@ -696,11 +877,72 @@ class AbstractProducingModule(AbstractModule):
 
     def __init__(self, queue_class=IncrementalQueue, **kwargs):
         super().__init__(queue_class=IncrementalQueue, **kwargs)
+        self._ready = threading.Condition()
+        self._ready_count = 0
+        self._signals = 0
+        self._signals_consumed = 0
+
+    def notify(self, n=1):
+        """Signal the module that new data is available so that process_iu can
+        produce n new IUs.
+
+        This method may be called from any thread, for example from the
+        callback of an audio device.
+
+        Args:
+            n (int): The number of IUs that may be produced.
+        """
+        with self._ready:
+            self._ready_count += n
+            self._ready.notify()
+
+    def signal(self):
+        """Signal the module that new data is available so that process_iu can
+        produce one new IU, without taking any lock.
+
+        Other than `notify`, this method never blocks and may thus be called from
+        real-time threads like the callback of an audio device. The counter of
+        signals is only written by the caller of this method, so only one thread
+        may signal the module. The module notices the signal within
+        QUEUE_TIMEOUT seconds.
+        """
+        self._signals += 1
+
+    def _pending(self):
+        return self._ready_count > 0 or self._signals > self._signals_consumed
+
+    def wait_until_ready(self):
+        """Block until the module was notified that new data is available or
+        until the module is stopped.
+
+        Returns:
+            bool: True if process_iu should be called, False if the module was
+            stopped.
+        """
+        with self._ready:
+            while not self._pending() and self.is_running:
+                self._ready.wait(QUEUE_TIMEOUT)
+            if not self.is_running:
+                return False
+            if self._ready_count > 0:
+                self._ready_count -= 1
+            else:
+                self._signals_consumed += 1
+            return True
+
+    def reset(self):
+        super().reset()
+        with self._ready:
+            self._ready_count = 0
+            self._signals_consumed = self._signals
+
+    def _wake(self):
+        with self._ready:
+            self._ready.notify_all()
 
     def _run(self):
         self.prepare_run()
-        self.is_running = True
-        while self.is_running:
+        while self.wait_until_ready():
             with self.mutex:
                 output_iu = self.process_iu(None)
                 if output_iu:
@@ -749,7 +991,10 @@ class AbstractConsumingModule(AbstractModule):
 
 class AbstractTriggerModule(AbstractProducingModule):
     """An abstract trigger module that produces IU once a trigger method is
-    called. Unless the module is triggered no IUs are produced"""
+    called. Unless the module is triggered no IUs are produced.
+
+    The trigger method appends its IU directly to the right buffers, so the
+    thread of the module only waits until the module is stopped."""
 
     @staticmethod
     def name():
@@ -770,14 +1015,6 @@ class AbstractTriggerModule(AbstractProducingModule):
     def __init__(self, queue_class=IncrementalQueue, **kwargs):
         super().__init__(queue_class=IncrementalQueue, **kwargs)
 
-    def _run(self):
-        self.prepare_run()
-        self.is_running = True
-        while self.is_running:
-            with self.mutex:
-                time.sleep(0.05)
-        self.shutdown()
-
     def process_iu(self, input_iu):
         return None
 
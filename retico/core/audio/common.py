@@ -1,14 +1,161 @@
 """
 This module redefines the abstract classes to fit the needs of audio processing.
+
+Audio with more than one channel is stored interleaved (one frame contains one
+sample of every channel).
+
+The raw audio of an AudioIU may be any object supporting the buffer protocol
+(bytes, a memoryview or a NumPy array). Modules that split or analyze audio
+should use views on the raw audio (`audio_view` and `samples`) so that no data
+is copied. Only sinks that need a bytes object (like a PyAudio stream) should
+convert the audio with `audio_bytes`.
 """
 
+import itertools
+import threading
+import time
+
+import numpy as np
+
 from retico.core import abstract
 
+SAMPLE_DTYPES = {1: np.dtype("u1"), 2: np.dtype("<i2"), 4: np.dtype("<i4")}
+"""The NumPy data types of PCM samples for each sample width in bytes."""
+
+_silence = bytes(0)
+
+
+def silence_view(nbytes):
+    """Return a read-only view of nbytes zero bytes.
+
+    All views returned by this function share the same underlying buffer, so
+    silence does not have to be allocated for every chunk of audio.
+
+    Args:
+        nbytes (int): The number of zero bytes.
+
+    Returns:
+        memoryview: A read-only view on nbytes zero bytes.
+    """
+    global _silence
+    if len(_silence) < nbytes:
+        _silence = bytes(max(nbytes, 2 * len(_silence)))
+    return memoryview(_silence)[:nbytes]
+
+
+def as_byte_view(raw_audio):
+    """Return a flat memoryview of unsigned bytes on the given audio buffer
+    without copying it.
+
+    Args:
+        raw_audio: An object supporting the buffer protocol.
+
+    Returns:
+        memoryview: A view of unsigned bytes on the raw audio.
+    """
+    view = memoryview(raw_audio)
+    if view.format != "B" or view.ndim != 1:
+        view = view.cast("B")
+    return view
+
+
+_stream_ids = itertools.count()
+
+
+class AudioTimeline:
+    """The sample timeline of one audio stream.
+
+    A timeline counts the samples that were produced by a source of audio and
+    maps sample indices to the clock (UNIX timestamps) and back. Every AudioIU
+    of the stream carries the ID of the stream and the index of its first
+    sample, so that the overlap and the gaps between IUs can be computed exactly
+    without relying on the time the IUs were created at.
+
+    Attributes:
+        stream_id (str): The unique ID of the stream.
+        rate (int): The sample rate of the stream.
+        speed (float): The speed at which the samples are produced. 1.0 means
+            realtime.
+        start_time (float): The UNIX timestamp of the first sample of the
+            stream or None if the stream has not started yet.
+        position (int): The index of the next sample of the stream.
+    """
+
+    def __init__(self, rate, name="stream", speed=1.0):
+        """Initialize the timeline.
+
+        Args:
+            rate (int): The sample rate of the stream.
+            name (str): A name that is used as the prefix of the stream ID.
+            speed (float): The speed at which the samples are produced.
+        """
+        self.stream_id = "%s-%d" % (name, next(_stream_ids))
+        self.rate = int(rate)
+        self.speed = speed
+        self.start_time = None
+        self.position = 0
+        self._mutex = threading.Lock()
+
+    def start(self, start_time=None):
+        """Set the time of the first sample of the stream if the stream has not
+        yet started.
+
+        Args:
+            start_time (float): The UNIX timestamp of the first sample. If None,
+                the current time is used.
+        """
+        with self._mutex:
+            if self.start_time is None:
+                self.start_time = time.time() if start_time is None else start_time
+
+    def advance(self, nframes):
+        """Advance the timeline by the given number of samples.
+
+        The timeline is started at the current time if it was not started yet.
+
+        Args:
+            nframes (int): The number of samples that were produced.
+
+        Returns:
+            int: The index of the first of the produced samples.
+        """
+        self.start()
+        with self._mutex:
+            offset = self.position
+            self.position += int(nframes)
+        return offset
+
+    def sample_to_time(self, sample):
+        """Return the UNIX timestamp of the given sample.
+
+        Args:
+            sample (int): The index of a sample of the stream.
+
+        Returns:
+            float: The time of the sample or None if the stream has not started.
+        """
+        if self.start_time is None:
+            return None
+        return self.start_time + sample / (self.rate * self.speed)
+
+    def time_to_sample(self, timestamp):
+        """Return the index of the sample that is produced at the given time.
+
+        Args:
+            timestamp (float): A UNIX timestamp.
+
+        Returns:
+            int: The index of the sample or None if the stream has not started.
+        """
+        if self.start_time is None:
+            return None
+        return int((timestamp - self.start_time) * self.rate * self.speed)
+
 
 class AudioIU(abstract.IncrementalUnit):
     """An audio incremental unit that receives raw audio data from a source.
 
-    The audio contained should be monaural.
+    The audio contained is monaural unless the number of channels is set.
 
     Attributes:
         creator (AbstractModule): The module that created this IU
@@ -16,10 +163,21 @@ class AudioIU(abstract.IncrementalUnit):
             current one.
         grounded_in (IncrementalUnit): A link to the IU this IU is based on.
         created_at (float): The UNIX timestamp of the moment the IU is created.
-        raw_audio (bytes[]): The raw audio of this IU
+        raw_audio (bytes-like): The raw audio of this IU. This may be bytes, a
+            memoryview or a NumPy array.
         rate (int): The frame rate of this IU
         nframes (int): The number of frames of this IU
         sample_width (int): The bytes per sample of this IU
+        channels (int): The number of interleaved channels of this IU
+        stream_id (str): The ID of the audio stream this IU belongs to.
+        sample_offset (int): The index of the first sample of this IU inside
+            its stream.
+        stream_start (float): The UNIX timestamp of the first sample of the
+            stream.
+        stream_speed (float): The speed at which the stream is produced.
+        is_silence (bool): Whether the IU is a span of digital silence. The raw
+            audio of a silence span is a view on a shared buffer of zeros, so
+            consumers may skip processing its samples.
     """
 
     @staticmethod
@@ -35,14 +193,72 @@ class AudioIU(abstract.IncrementalUnit):
         self.rate = rate
         self.nframes = nframes
         self.sample_width = sample_width
+        self.channels = 1
+        self.stream_id = None
+        self.sample_offset = None
+        self.stream_start = None
+        self.stream_speed = 1.0
+        self.is_silence = False
 
-    def set_audio(self, raw_audio, nframes, rate, sample_width):
+    def set_audio(self, raw_audio, nframes, rate, sample_width, channels=1):
         """Sets the audio content of the IU."""
         self.raw_audio = raw_audio
         self.payload = raw_audio
         self.nframes = int(nframes)
         self.rate = int(rate)
         self.sample_width = int(sample_width)
+        self.channels = int(channels)
+        self.is_silence = False
+
+    def set_silence(self, nframes, rate, sample_width, channels=1):
+        """Sets the content of the IU to a span of digital silence.
+
+        The raw audio is a view on a buffer of zeros that is shared by all
+        silence spans, so a span of any length does not allocate audio.
+
+        Args:
+            nframes (int): The number of frames of the span.
+            rate (int): The sample rate of the span.
+            sample_width (int): The sample width of the span.
+            channels (int): The number of channels of the span.
+        """
+        nbytes = int(nframes) * int(sample_width) * int(channels)
+        self.set_audio(silence_view(nbytes), nframes, rate, sample_width, channels)
+        self.is_silence = True
+
+    def audio_view(self):
+        """Return a memoryview of unsigned bytes on the raw audio without
+        copying it.
+
+        Returns:
+            memoryview: A view on the raw audio of this IU.
+        """
+        return as_byte_view(self.raw_audio)
+
+    def audio_bytes(self):
+        """Return the raw audio as a bytes object.
+
+        The audio is only copied if the raw audio is not already of type bytes.
+        This should only be used by sinks that require a bytes object.
+
+        Returns:
+            bytes: The raw audio of this IU.
+        """
+        if isinstance(self.raw_audio, bytes):
+            return self.raw_audio
+        return self.audio_view().tobytes()
+
+    def samples(self):
+        """Return a NumPy view on the samples of the raw audio without copying
+        it.
+
+        The returned array is read-only if the raw audio is read-only. Samples
+        of multiple channels are interleaved.
+
+        Returns:
+            numpy.ndarray: An array of the samples of this IU.
+        """
+        return np.frombuffer(self.audio_view(), dtype=SAMPLE_DTYPES[self.sample_width])
 
     def audio_length(self):
         """Return the length of the audio IU in seconds.
@@ -52,6 +268,94 @@ class AudioIU(abstract.IncrementalUnit):
         """
         return float(self.nframes) / float(self.rate)
 
+    def set_timeline(self, timeline, sample_offset):
+        """Set the position of the IU inside the sample timeline of a stream.
+
+        Args:
+            timeline (AudioTimeline): The timeline of the stream.
+            sample_offset (int): The index of the first sample of this IU.
+        """
+        self.stream_id = timeline.stream_id
+        self.sample_offset = sample_offset
+        self.stream_start = timeline.start_time
+        self.stream_speed = timeline.speed
+
+    def copy_timeline(self, other):
+        """Copy the position inside the sample timeline from another AudioIU.
+
+        Args:
+            other (AudioIU): The IU the position is copied from.
+        """
+        self.stream_id = other.stream_id
+        self.sample_offset = other.sample_offset
+        self.stream_start = other.stream_start
+        self.stream_speed = other.stream_speed
+
+    def start_sample(self):
+        """Return the index of the first sample of this IU inside its stream.
+
+        Returns:
+            int: The index of the first sample or None if the IU is not part of
+            a timeline.
+        """
+        return self.sample_offset
+
+    def end_sample(self):
+        """Return the index of the sample after the last sample of this IU.
+
+        Returns:
+            int: The index of the end sample or None if the IU is not part of a
+            timeline.
+        """
+        if self.sample_offset is None:
+            return None
+        return self.sample_offset + self.nframes
+
+    def _sample_to_time(self, sample):
+        if sample is None or self.stream_start is None:
+            return None
+        return self.stream_start + sample / (self.rate * self.stream_speed)
+
+    def start_time(self):
+        """Return the UNIX timestamp of the first sample of this IU.
+
+        Returns:
+            float: The start time or None if the IU is not part of a timeline.
+        """
+        return self._sample_to_time(self.start_sample())
+
+    def end_time(self):
+        """Return the UNIX timestamp of the end of this IU.
+
+        Returns:
+            float: The end time or None if the IU is not part of a timeline.
+        """
+        return self._sample_to_time(self.end_sample())
+
+    def overlap(self, other):
+        """Return the overlap of this IU with another AudioIU in seconds.
+
+        If both IUs belong to the same stream, the overlap is computed from the
+        sample indices. Otherwise, the start and end times of the IUs are
+        compared. A negative overlap is the gap between the two IUs.
+
+        Args:
+            other (AudioIU): Another AudioIU.
+
+        Returns:
+            float: The overlap in seconds or None if one of the IUs is not part
+            of a timeline.
+        """
+        if self.stream_id is not None and self.stream_id == other.stream_id:
+            start = max(self.start_sample(), other.start_sample())
+            end = min(self.end_sample(), other.end_sample())
+            return (end - start) / (self.rate * self.stream_speed)
+        times = (self.start_time(), self.end_time())
+        other_times = (other.start_time(), other.end_time())
+        if None in times or None in other_times:
+            return None
+        return min(times[1], other_times[1]) - max(times[0], other_times[0])
+
 
 class SpeechIU(AudioIU):
     """A type of audio incremental unit that contains a larger amount of audio
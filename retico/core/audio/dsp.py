@@ -0,0 +1,366 @@
+"""
+A module containing signal processing functions for converting the sample rate
+and the sample width of audio and for filtering audio.
+
+All functions work in-process on NumPy arrays. Audio is resampled with a
+polyphase windowed-sinc filter. The filter matrices are cached per conversion
+ratio, so that converting many utterances or streams with the same rates does
+not create the filter again.
+
+Usage:
+    pcm = convert_audio(raw_audio, 22050, 2, 44100, 2)
+"""
+
+import functools
+import io
+import math
+import wave
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from retico.core.audio.common import SAMPLE_DTYPES, as_byte_view
+
+HALF_WIDTH = 16
+"""The default number of zero crossings of the sinc filter on each side."""
+
+KAISER_BETA = 8.0
+"""The beta of the kaiser window that is applied to the sinc filter."""
+
+CUTOFF = 0.95
+"""The cutoff of the low pass filter relative to the lower Nyquist frequency."""
+
+MIN_BLOCK_SIZE = 32
+"""The minimum number of input samples that are converted in one block. Ratios
+with a small downsampling factor are converted in multiple blocks at once, so
+that the matrix multiplication does not become too small."""
+
+
+def to_float(raw_audio, sample_width):
+    """Convert PCM audio into an array of floats between -1.0 and 1.0.
+
+    Args:
+        raw_audio: An object supporting the buffer protocol containing PCM
+            audio or a NumPy array of samples.
+        sample_width (int): The width of one sample in bytes.
+
+    Returns:
+        numpy.ndarray: A float32 array of the samples.
+    """
+    dtype = SAMPLE_DTYPES[sample_width]
+    if isinstance(raw_audio, np.ndarray) and raw_audio.dtype == dtype:
+        samples = raw_audio
+    else:
+        samples = np.frombuffer(as_byte_view(raw_audio), dtype=dtype)
+    samples = samples.astype(np.float32)
+    if sample_width == 1:
+        samples -= 128.0
+    samples *= 1.0 / (1 << (8 * sample_width - 1))
+    return samples
+
+
+def from_float(samples, sample_width):
+    """Convert an array of floats between -1.0 and 1.0 into PCM samples.
+
+    Samples outside of the range are clipped.
+
+    Args:
+        samples (numpy.ndarray): An array of float samples.
+        sample_width (int): The width of one sample in bytes.
+
+    Returns:
+        numpy.ndarray: An array of PCM samples with the given sample width.
+    """
+    dtype = SAMPLE_DTYPES[sample_width]
+    scale = float(1 << (8 * sample_width - 1))
+    samples = np.rint(np.asarray(samples, dtype=np.float64) * scale)
+    if sample_width == 1:
+        samples += 128.0
+    info = np.iinfo(dtype)
+    return np.clip(samples, info.min, info.max).astype(dtype)
+
+
+def convert_sample_width(raw_audio, from_width, to_width):
+    """Convert PCM audio from one sample width to another.
+
+    Args:
+        raw_audio: An object supporting the buffer protocol containing PCM
+            audio or a NumPy array of samples.
+        from_width (int): The sample width of the given audio in bytes.
+        to_width (int): The sample width of the returned audio in bytes.
+
+    Returns:
+        numpy.ndarray: An array of PCM samples with the new sample width.
+    """
+    samples = np.frombuffer(as_byte_view(raw_audio), dtype=SAMPLE_DTYPES[from_width])
+    if from_width == to_width:
+        return samples
+    # Align the samples to 32 bit integers and shift them to the new width
+    aligned = samples.astype(np.int32)
+    if from_width == 1:
+        aligned -= 128
+    aligned <<= 32 - 8 * from_width
+    aligned >>= 32 - 8 * to_width
+    if to_width == 1:
+        aligned += 128
+    return aligned.astype(SAMPLE_DTYPES[to_width])
+
+
+@functools.lru_cache(maxsize=32)
+def polyphase_matrix(up, down, half_width=HALF_WIDTH):
+    """Create the filter matrix of a polyphase resampler.
+
+    A block of `down` input samples is converted into a block of `up` output
+    samples by multiplying a window of the (padded) input with this matrix. The
+    matrix is cached for every ratio.
+
+    Args:
+        up (int): The upsampling factor.
+        down (int): The downsampling factor.
+        half_width (int): The number of zero crossings of the sinc filter on
+            each side.
+
+    Returns:
+        numpy.ndarray: A float32 matrix of shape (window length, up).
+    """
+    taps = 2 * half_width + 2
+    length = 2 * half_width * up + 1
+    center = half_width * up
+    cutoff = CUTOFF / max(up, down)
+    m = np.arange(length) - center
+    prototype = up * cutoff * np.sinc(cutoff * m) * np.kaiser(length, KAISER_BETA)
+
+    phases = np.arange(up)
+    offsets = (phases * down) // up
+    remainders = (phases * down) % up
+    window_length = int(offsets[-1]) + taps
+    matrix = np.zeros((window_length, up), dtype=np.float32)
+    for k in range(taps):
+        idx = remainders + (2 * half_width - k) * up
+        valid = (idx >= 0) & (idx < length)
+        matrix[offsets[valid] + k, phases[valid]] = prototype[idx[valid]]
+    matrix.setflags(write=False)
+    return matrix
+
+
+class Resampler:
+    """A streaming polyphase resampler.
+
+    Audio may be passed to the resampler in chunks of any size. The resampler
+    keeps the samples that are needed for the next output block, so that there
+    are no artifacts at the borders of the chunks. The output of a chunk is
+    delayed by at most one block of input samples (at least MIN_BLOCK_SIZE) and
+    `half_width` samples of filter delay. At the end of a stream, `flush`
+    returns the remaining samples.
+
+    Attributes:
+        from_rate (int): The sample rate of the input.
+        to_rate (int): The sample rate of the output.
+        up (int): The upsampling factor.
+        down (int): The downsampling factor.
+        half_width (int): The number of zero crossings of the sinc filter on
+            each side.
+    """
+
+    def __init__(self, from_rate, to_rate, half_width=HALF_WIDTH):
+        """Initialize the resampler.
+
+        Args:
+            from_rate (int): The sample rate of the input.
+            to_rate (int): The sample rate of the output.
+            half_width (int): The number of zero crossings of the sinc filter
+                on each side.
+        """
+        self.from_rate = int(from_rate)
+        self.to_rate = int(to_rate)
+        g = math.gcd(self.from_rate, self.to_rate)
+        self.up = self.to_rate // g
+        self.down = self.from_rate // g
+        self.half_width = half_width
+        multiple = -(-MIN_BLOCK_SIZE // self.down)
+        self._block_up = self.up * multiple
+        self._block_down = self.down * multiple
+        self._matrix = polyphase_matrix(self._block_up, self._block_down, half_width)
+        self.reset()
+
+    def reset(self):
+        """Reset the resampler to the start of a new stream."""
+        self._buffer = np.zeros(self.half_width, dtype=np.float32)
+        self._total_in = 0
+        self._total_out = 0
+
+    def _blocks(self, buffer):
+        window_length = self._matrix.shape[0]
+        if len(buffer) < window_length:
+            return 0, np.zeros(0, dtype=np.float32)
+        nblocks = (len(buffer) - window_length) // self._block_down + 1
+        windows = sliding_window_view(buffer, window_length)[:: self._block_down]
+        windows = windows[:nblocks]
+        return nblocks, (windows @ self._matrix).ravel()
+
+    def process(self, samples):
+        """Resample a chunk of float samples.
+
+        Args:
+            samples (numpy.ndarray): An array of float samples.
+
+        Returns:
+            numpy.ndarray: A float32 array of the resampled samples that are
+            available.
+        """
+        samples = np.asarray(samples, dtype=np.float32)
+        self._total_in += len(samples)
+        if self.up == self.down:
+            self._total_out += len(samples)
+            return samples
+        buffer = np.concatenate((self._buffer, samples))
+        nblocks, output = self._blocks(buffer)
+        self._buffer = buffer[nblocks * self._block_down :]
+        self._total_out += len(output)
+        return output
+
+    def flush(self):
+        """Return the remaining samples at the end of a stream and reset the
+        resampler.
+
+        Returns:
+            numpy.ndarray: A float32 array of the remaining samples.
+        """
+        expected = -(-self._total_in * self.up // self.down)
+        remaining = expected - self._total_out
+        output = np.zeros(0, dtype=np.float32)
+        if remaining > 0 and self.up != self.down:
+            nblocks = -(-remaining // self._block_up)
+            padding = (nblocks - 1) * self._block_down + self._matrix.shape[0]
+            buffer = np.zeros(max(padding, len(self._buffer)), dtype=np.float32)
+            buffer[: len(self._buffer)] = self._buffer
+            _, output = self._blocks(buffer)
+            output = output[:remaining]
+        self.reset()
+        return output
+
+
+@functools.lru_cache(maxsize=32)
+def bandpass_filter(rate, low, high, length=None):
+    """Design a linear phase band pass FIR filter with a windowed sinc.
+
+    Args:
+        rate (int): The sample rate of the audio.
+        low (float): The lower cutoff frequency in Hz.
+        high (float): The upper cutoff frequency in Hz. It is limited to the
+            Nyquist frequency.
+        length (int): The number of taps. If None, the filter is 10 ms long.
+
+    Returns:
+        numpy.ndarray: The float32 taps of the filter.
+    """
+    if length is None:
+        length = 2 * int(rate * 0.005) + 1
+    m = np.arange(length) - (length - 1) / 2
+    high = min(high, rate / 2) / rate
+    low = low / rate
+    taps = 2 * high * np.sinc(2 * high * m) - 2 * low * np.sinc(2 * low * m)
+    taps *= np.hamming(length)
+    taps = taps.astype(np.float32)
+    taps.setflags(write=False)
+    return taps
+
+
+class FIRFilter:
+    """A streaming FIR filter.
+
+    The last samples of each chunk are kept, so that the filtered chunks are
+    continuous. The output is delayed by half the length of the filter.
+
+    Attributes:
+        taps (numpy.ndarray): The taps of the filter.
+    """
+
+    def __init__(self, taps):
+        """Initialize the filter.
+
+        Args:
+            taps (numpy.ndarray): The taps of the filter.
+        """
+        self.taps = np.asarray(taps, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """Reset the filter to the start of a new stream."""
+        self._history = np.zeros(len(self.taps) - 1, dtype=np.float32)
+
+    def process(self, samples):
+        """Filter a chunk of float samples.
+
+        Args:
+            samples (numpy.ndarray): An array of float samples.
+
+        Returns:
+            numpy.ndarray: A float32 array of the filtered samples with the same
+            length as the input.
+        """
+        buffer = np.concatenate((self._history, samples.astype(np.float32)))
+        if len(self._history):
+            self._history = buffer[-len(self._history) :]
+        return np.convolve(buffer, self.taps, "valid").astype(np.float32)
+
+
+def resample(samples, from_rate, to_rate, half_width=HALF_WIDTH):
+    """Resample a complete signal of float samples.
+
+    Args:
+        samples (numpy.ndarray): An array of float samples.
+        from_rate (int): The sample rate of the given samples.
+        to_rate (int): The sample rate of the returned samples.
+        half_width (int): The number of zero crossings of the sinc filter on
+            each side.
+
+    Returns:
+        numpy.ndarray: A float32 array of the resampled samples.
+    """
+    resampler = Resampler(from_rate, to_rate, half_width)
+    output = resampler.process(samples)
+    return np.concatenate((output, resampler.flush()))
+
+
+def convert_audio(raw_audio, from_rate, from_width, to_rate, to_width):
+    """Convert complete PCM audio to another sample rate and sample width.
+
+    Args:
+        raw_audio: An object supporting the buffer protocol containing PCM
+            audio.
+        from_rate (int): The sample rate of the given audio.
+        from_width (int): The sample width of the given audio in bytes.
+        to_rate (int): The sample rate of the returned audio.
+        to_width (int): The sample width of the returned audio in bytes.
+
+    Returns:
+        numpy.ndarray: An array of the converted PCM samples.
+    """
+    if from_rate == to_rate:
+        return convert_sample_width(raw_audio, from_width, to_width)
+    samples = resample(to_float(raw_audio, from_width), from_rate, to_rate)
+    return from_float(samples, to_width)
+
+
+def convert_wav(wav_data, rate, sample_width):
+    """Decode the given WAVE file and convert it to mono PCM audio with the
+    given sample rate and sample width.
+
+    Args:
+        wav_data (bytes): The content of a WAVE file.
+        rate (int): The sample rate of the returned audio.
+        sample_width (int): The sample width of the returned audio in bytes.
+
+    Returns:
+        bytes: The raw PCM audio without any header.
+    """
+    with wave.open(io.BytesIO(wav_data), "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        from_width = wav_file.getsampwidth()
+        from_rate = wav_file.getframerate()
+        frames = wav_file.readframes(wav_file.getnframes())
+    if channels > 1:
+        samples = to_float(frames, from_width).reshape(-1, channels).mean(axis=1)
+        frames = from_float(samples, from_width)
+    return convert_audio(frames, from_rate, from_width, rate, sample_width).tobytes()
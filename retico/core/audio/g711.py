@@ -0,0 +1,133 @@
+"""
+A module implementing the G.711 μ-law and A-law codecs with lookup tables.
+
+Encoding and decoding are done with tables that are computed once for every
+16 bit sample and every 8 bit code, so that whole chunks of audio are converted
+with a single indexing operation. The tables follow the reference
+implementation of the ITU-T G.711 conversion (14 bit linear samples for μ-law,
+13 bit linear samples for A-law).
+
+Usage:
+    codes = encode(samples, "ulaw")
+    decoded = decode(codes, "ulaw")
+"""
+
+import functools
+
+import numpy as np
+
+LAWS = ("ulaw", "alaw")
+"""The supported companding laws."""
+
+_SEG_ULAW_END = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+_SEG_ALAW_END = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 8159
+
+
+def _linear_values():
+    """Return the 16 bit samples in the order of their unsigned bit pattern, so
+    that a table can be indexed with a uint16 view on the samples."""
+    return np.arange(65536, dtype=np.uint32).astype(np.uint16).view(np.int16)
+
+
+def _ulaw_encode(pcm):
+    pcm = pcm.astype(np.int32) >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    pcm = np.minimum(np.abs(pcm), _ULAW_CLIP) + (_ULAW_BIAS >> 2)
+    seg = np.searchsorted(_SEG_ULAW_END, pcm)
+    code = (np.minimum(seg, 7) << 4) | ((pcm >> (np.minimum(seg, 7) + 1)) & 0xF)
+    code = np.where(seg >= 8, 0x7F, code)
+    return (code ^ mask).astype(np.uint8)
+
+
+def _ulaw_decode(codes):
+    u = ~codes.astype(np.int32) & 0xFF
+    t = ((u & 0x0F) << 3) + _ULAW_BIAS
+    t <<= (u & 0x70) >> 4
+    return np.where(u & 0x80, _ULAW_BIAS - t, t - _ULAW_BIAS).astype(np.int16)
+
+
+def _alaw_encode(pcm):
+    pcm = pcm.astype(np.int32) >> 3
+    mask = np.where(pcm >= 0, 0xD5, 0x55)
+    pcm = np.where(pcm >= 0, pcm, -pcm - 1)
+    seg = np.searchsorted(_SEG_ALAW_END, pcm)
+    shift = np.where(seg < 2, 1, np.minimum(seg, 7))
+    code = (np.minimum(seg, 7) << 4) | ((pcm >> shift) & 0xF)
+    code = np.where(seg >= 8, 0x7F, code)
+    return (code ^ mask).astype(np.uint8)
+
+
+def _alaw_decode(codes):
+    a = codes.astype(np.int32) ^ 0x55
+    t = (a & 0x0F) << 4
+    seg = (a & 0x70) >> 4
+    t = np.where(seg == 0, t + 8, t + 0x108)
+    t = np.where(seg > 1, t << np.maximum(seg - 1, 0), t)
+    return np.where(a & 0x80, t, -t).astype(np.int16)
+
+
+@functools.lru_cache(maxsize=None)
+def tables(law):
+    """Return the lookup tables of a companding law.
+
+    Args:
+        law (str): The companding law ("ulaw" or "alaw").
+
+    Returns:
+        tuple: The encoding table (65536 codes indexed by the unsigned bit
+        pattern of a 16 bit sample), the decoding table (256 16 bit samples)
+        and the table of the encoded and decoded sample of every 16 bit sample.
+    """
+    if law not in LAWS:
+        raise ValueError("Unknown companding law %s" % law)
+    encode_fn, decode_fn = {
+        "ulaw": (_ulaw_encode, _ulaw_decode),
+        "alaw": (_alaw_encode, _alaw_decode),
+    }[law]
+    encode_table = encode_fn(_linear_values())
+    decode_table = decode_fn(np.arange(256, dtype=np.uint8))
+    roundtrip_table = decode_table[encode_table]
+    for table in (encode_table, decode_table, roundtrip_table):
+        table.setflags(write=False)
+    return encode_table, decode_table, roundtrip_table
+
+
+def encode(samples, law):
+    """Encode 16 bit samples into G.711 codes.
+
+    Args:
+        samples (numpy.ndarray): An array of int16 samples.
+        law (str): The companding law ("ulaw" or "alaw").
+
+    Returns:
+        numpy.ndarray: An array of uint8 codes.
+    """
+    return tables(law)[0][samples.view(np.uint16)]
+
+
+def decode(codes, law):
+    """Decode G.711 codes into 16 bit samples.
+
+    Args:
+        codes (numpy.ndarray): An array of uint8 codes.
+        law (str): The companding law ("ulaw" or "alaw").
+
+    Returns:
+        numpy.ndarray: An array of int16 samples.
+    """
+    return tables(law)[1][codes]
+
+
+def roundtrip(samples, law):
+    """Encode and decode 16 bit samples with a single table lookup.
+
+    Args:
+        samples (numpy.ndarray): An array of int16 samples.
+        law (str): The companding law ("ulaw" or "alaw").
+
+    Returns:
+        numpy.ndarray: An array of the int16 samples after the codec.
+    """
+    return tables(law)[2][samples.view(np.uint16)]
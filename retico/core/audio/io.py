@@ -2,20 +2,35 @@
 A module for handling audio related input and output stuff.
 """
 
+import collections
 import threading
-import queue
 import time
 import wave
+
+import numpy as np
 import pyaudio
 from retico.core import abstract
-from retico.core.audio.common import AudioIU, SpeechIU, DispatchedAudioIU
+from retico.core.audio import dsp
+from retico.core.audio.common import (
+    AudioIU,
+    SpeechIU,
+    DispatchedAudioIU,
+    AudioTimeline,
+    silence_view,
+)
+from retico.core.audio.ringbuffer import RingBuffer
+from retico.core.audio.wav import BufferedWaveWriter, WaveFile
 
 CHANNELS = 1
-"""Number of channels. Should never be changed. As soon as stereo telephony
-becomes a thing I will rewrite this."""
+"""Default number of channels. Audio is monaural unless a module (like the
+AudioMixerModule) explicitly produces multiple interleaved channels."""
 
 TIMEOUT = 0.01
 
+RING_BUFFER_LENGTH = 30.0
+"""The length of audio in seconds the ring buffers between the audio device
+callbacks and the modules can hold."""
+
 
 def generate_silence(nsamples, sample_width):
     """Generates [nsamples] samples of silence, each with [sample_width] bytes.
@@ -26,15 +41,20 @@ def generate_silence(nsamples, sample_width):
         sample_width (int): Width of one sample
 
     Returns:
-        bytes: An array of silence with the length [nsamples] * [sample_width]
+        memoryview: A read-only view on silence with the length [nsamples] *
+        [sample_width]. The underlying buffer is shared and never copied.
     """
     # TODO: find a way to generate real silence
-    return b"\0" * nsamples * sample_width
+    return silence_view(nsamples * sample_width)
 
 
 class MicrophoneModule(abstract.AbstractProducingModule):
     """A module that produces IUs containing audio signals that are captures by
-    a microphone."""
+    a microphone.
+
+    The audio device callback copies the audio into a pre-allocated ring buffer
+    and signals the module without blocking or taking a lock. Audio that does not fit into the buffer is counted as an
+    overrun (see `stats`)."""
 
     @staticmethod
     def name():
@@ -56,8 +76,9 @@ class MicrophoneModule(abstract.AbstractProducingModule):
                 microphone
             frame_count (int): The number of frames that are stored in in_data
         """
-        self.audio_buffer.put(in_data)
-        return (in_data, pyaudio.paContinue)
+        self.audio_buffer.write(in_data)
+        self.signal()
+        return (None, pyaudio.paContinue)
 
     def __init__(self, chunk_size, rate=44100, sample_width=2, **kwargs):
         """
@@ -76,17 +97,34 @@ class MicrophoneModule(abstract.AbstractProducingModule):
 
         self._p = pyaudio.PyAudio()
 
-        self.audio_buffer = queue.Queue()
+        self.audio_buffer = RingBuffer(
+            RING_BUFFER_LENGTH * self.rate * self.sample_width * CHANNELS
+        )
         self.stream = None
+        self.timeline = AudioTimeline(self.rate, "microphone")
 
     def process_iu(self, input_iu):
-        if not self.audio_buffer:
+        sample = self.audio_buffer.read(self.chunk_size * self.sample_width * CHANNELS)
+        if sample is None:
             return None
-        sample = self.audio_buffer.get()
         output_iu = self.create_iu()
         output_iu.set_audio(sample, self.chunk_size, self.rate, self.sample_width)
+        output_iu.set_timeline(self.timeline, self.timeline.advance(self.chunk_size))
         return output_iu
 
+    def stats(self):
+        """Return the overrun counters of the ring buffer of the microphone.
+
+        Returns:
+            dict: The counters of the ring buffer.
+        """
+        return self.audio_buffer.stats()
+
+    def reset(self):
+        super().reset()
+        self.audio_buffer.clear()
+        self.timeline = AudioTimeline(self.rate, "microphone")
+
     def setup(self):
         """Set up the microphone for recording."""
         p = self._p
@@ -110,13 +148,211 @@ class MicrophoneModule(abstract.AbstractProducingModule):
         self.stream.stop_stream()
         self.stream.close()
         self.stream = None
-        self.audio_buffer = queue.Queue()
+        self.audio_buffer.clear()
+
+
+class WaveFileSourceModule(abstract.AbstractProducingModule):
+    """A module that produces AudioIUs from one or more PCM WAVE files.
+
+    The files are mapped into memory and the output IUs contain views on the
+    mapped audio, so the audio is not copied (only the last chunk of a file is
+    padded with silence). The files are played one after another and may be
+    looped. With `switch_file`, the module can jump to another file at any
+    time.
+
+    The output is paced by a thread: with a speed greater than 0, chunks are
+    produced on an absolute timeline at [speed] times real time. With a speed of
+    0, chunks are produced as fast as the downstream modules consume them (a
+    chunk is only produced if no queue of a subscribed module contains
+    [max_queue] or more IUs). The timeline of the output then has a speed of
+    1.0, so that the times of the samples are their positions in the audio.
+
+    All files should have the same sample rate, sample width and number of
+    channels.
+
+    Attributes:
+        files (str): A comma separated list of the paths of the WAVE files.
+        chunk_size (int): The number of frames of each output IU.
+        speed (float): The speed of the output. 1.0 means real time and 0 means
+            as fast as possible.
+        loop (bool): Whether the files should be played again after the last
+            file ended.
+        max_queue (int): The maximum number of IUs in the queues of subscribed
+            modules when running as fast as possible.
+        wave_files (list): The opened WaveFiles.
+        timeline (AudioTimeline): The sample timeline of the output.
+    """
+
+    EVENT_FILE_END = "file_end"
+    """Event that is called when the end of a file was reached."""
+    EVENT_SOURCE_END = "source_end"
+    """Event that is called when the last file ended and loop is not set."""
+
+    @staticmethod
+    def name():
+        return "Wave File Source Module"
+
+    @staticmethod
+    def description():
+        return "A producing module that plays audio from wave files."
+
+    @staticmethod
+    def output_iu():
+        return AudioIU
+
+    def __init__(
+        self, files, chunk_size=5000, speed=1.0, loop=False, max_queue=10, **kwargs
+    ):
+        """Initialize the wave file source module.
+
+        Args:
+            files (str or list): The path of a WAVE file, a comma separated list
+                of paths or a list of paths.
+            chunk_size (int): The number of frames of each output IU.
+            speed (float): The speed of the output. 1.0 means real time and 0
+                means as fast as possible.
+            loop (bool): Whether the files should be played again after the last
+                file ended.
+            max_queue (int): The maximum number of IUs in the queues of
+                subscribed modules when running as fast as possible.
+        """
+        super().__init__(**kwargs)
+        if not isinstance(files, str):
+            files = ",".join(files)
+        self.files = files
+        self.chunk_size = chunk_size
+        self.speed = speed
+        self.loop = loop
+        self.max_queue = max_queue
+        self.wave_files = []
+        self.timeline = None
+        self._file_index = 0
+        self._frame = 0
+        self._finished = False
+        self._pacing = False
+        self._pacing_thread = None
+        self._file_mutex = threading.Lock()
+
+    def file_paths(self):
+        """Return the paths of the WAVE files.
+
+        Returns:
+            list: A list of paths.
+        """
+        return [f.strip() for f in self.files.split(",") if f.strip()]
+
+    def switch_file(self, index):
+        """Continue with the beginning of the file with the given index.
+
+        Args:
+            index (int): The index of the file in the list of files.
+        """
+        with self._file_mutex:
+            self._file_index = index % len(self.wave_files)
+            self._frame = 0
+            self._finished = not any(wf.nframes for wf in self.wave_files)
+
+    def _next_file(self):
+        """Advance to the next file. Has to be called while holding the file
+        mutex."""
+        wave_file = self.wave_files[self._file_index]
+        self.event_call(self.EVENT_FILE_END, {"file": wave_file.filename})
+        self._frame = 0
+        self._file_index += 1
+        if self._file_index >= len(self.wave_files):
+            self._file_index = 0
+            if not self.loop:
+                self._finished = True
+                self.event_call(self.EVENT_SOURCE_END)
+
+    def process_iu(self, input_iu):
+        with self._file_mutex:
+            if self._finished:
+                return None
+            while self._frame >= self.wave_files[self._file_index].nframes:
+                self._next_file()
+                if self._finished:
+                    return None
+            wave_file = self.wave_files[self._file_index]
+            data = wave_file.frames(self._frame, self.chunk_size)
+            distance = self.chunk_size * wave_file.frame_width - len(data)
+            if distance:
+                data = data.tobytes() + bytes(distance)
+            self._frame += self.chunk_size
+            if self._frame >= wave_file.nframes:
+                self._next_file()
+        output_iu = self.create_iu()
+        output_iu.set_audio(
+            data,
+            self.chunk_size,
+            wave_file.rate,
+            wave_file.sample_width,
+            wave_file.channels,
+        )
+        output_iu.set_timeline(self.timeline, self.timeline.advance(self.chunk_size))
+        return output_iu
+
+    def _downstream_full(self):
+        return any(q.qsize() >= self.max_queue for q in self.right_buffers())
+
+    def _pacing_loop(self):
+        """A method run in a thread that notifies the module whenever the next
+        chunk should be produced."""
+        next_tick = time.monotonic()
+        while self._pacing and not self._finished:
+            if self.speed and self.speed > 0:
+                next_tick += self.chunk_size / self.timeline.rate / self.speed
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                while self._pacing and (
+                    self._ready_count > 0 or self._downstream_full()
+                ):
+                    time.sleep(0.001)
+            self.notify()
+
+    def _create_timeline(self, rate):
+        speed = self.speed if self.speed and self.speed > 0 else 1.0
+        return AudioTimeline(rate, "wavefile", speed)
+
+    def setup(self):
+        for wave_file in self.wave_files:
+            wave_file.close()
+        self.wave_files = [WaveFile(path) for path in self.file_paths()]
+        self.timeline = self._create_timeline(self.wave_files[0].rate)
+        self.switch_file(0)
+
+    def reset(self):
+        super().reset()
+        if self.wave_files:
+            self.switch_file(0)
+            self.timeline = self._create_timeline(self.timeline.rate)
+
+    def prepare_run(self):
+        self._pacing = True
+        self._pacing_thread = threading.Thread(target=self._pacing_loop)
+        self._pacing_thread.daemon = True
+        self._pacing_thread.start()
+
+    def shutdown(self):
+        self._pacing = False
+        if self._pacing_thread:
+            self._pacing_thread.join()
+            self._pacing_thread = None
+        for wave_file in self.wave_files:
+            wave_file.close()
+        self.wave_files = []
 
 
 class SpeakerModule(abstract.AbstractConsumingModule):
     """A module that consumes AudioIUs of arbitrary size and outputs them to the
     speakers of the machine. When a new IU is incoming, the module blocks as
-    long as the current IU is being played."""
+    long as the current IU is being played.
+
+    If only the left or right speaker should be used, the audio is routed with
+    the channel map of CoreAudio on macOS. On other platforms, a stereo stream
+    is opened and the audio is written to one of its channels."""
 
     @staticmethod
     def name():
@@ -144,28 +380,41 @@ class SpeakerModule(abstract.AbstractConsumingModule):
 
         self.stream = None
         self.time = None
+        self._channel = None
 
     def process_iu(self, input_iu):
-        self.stream.write(bytes(input_iu.raw_audio))
+        if self._channel is None:
+            self.stream.write(input_iu.audio_bytes())
+        else:
+            samples = input_iu.samples()
+            stereo = np.zeros((len(samples), 2), dtype=samples.dtype)
+            stereo[:, self._channel] = samples
+            self.stream.write(stereo.tobytes())
         return None
 
     def setup(self):
         """Set up the speaker for speaking...?"""
         p = self._p
-        if self.use_speaker == "left":
-            stream_info = pyaudio.PaMacCoreStreamInfo(channel_map=(0, -1))
-        elif self.use_speaker == "right":
-            stream_info = pyaudio.PaMacCoreStreamInfo(channel_map=(-1, 0))
-        else:
-            stream_info = pyaudio.PaMacCoreStreamInfo(channel_map=(0, 0))
+        channel_maps = {"left": (0, -1), "right": (-1, 0)}
+        channel_map = channel_maps.get(self.use_speaker, (0, 0))
+        channels = CHANNELS
+        kwargs = {}
+        self._channel = None
+        if hasattr(pyaudio, "PaMacCoreStreamInfo"):
+            kwargs["output_host_api_specific_stream_info"] = (
+                pyaudio.PaMacCoreStreamInfo(channel_map=channel_map)
+            )
+        elif self.use_speaker in channel_maps:
+            channels = 2
+            self._channel = 0 if self.use_speaker == "left" else 1
 
         self.stream = p.open(
             format=p.get_format_from_width(self.sample_width),
-            channels=CHANNELS,
+            channels=channels,
             rate=self.rate,
             input=False,
-            output_host_api_specific_stream_info=stream_info,
             output=True,
+            **kwargs
         )
 
     def shutdown(self):
@@ -178,7 +427,16 @@ class SpeakerModule(abstract.AbstractConsumingModule):
 class StreamingSpeakerModule(abstract.AbstractConsumingModule):
     """A module that consumes Audio IUs and outputs them to the speaker of the
     machine. The audio output is streamed and thus the Audio IUs have to have
-    exactly [chunk_size] samples."""
+    exactly [chunk_size] samples.
+
+    The audio is passed to the audio device callback through a pre-allocated
+    ring buffer. The callback neither blocks nor allocates: it copies the audio
+    into a pre-allocated output buffer and fills missing audio with silence.
+    While audio is playing, a callback that cannot be filled completely is
+    counted as an underrun (see `stats`), so the end of a stream that is not
+    dispatched continuously is counted once. Silence spans are written into the
+    ring buffer like audio, so that pauses keep their length while the buffer
+    holds a backlog."""
 
     @staticmethod
     def name():
@@ -198,15 +456,27 @@ class StreamingSpeakerModule(abstract.AbstractConsumingModule):
 
     def callback(self, in_data, frame_count, time_info, status):
         """The callback function that gets called by pyaudio."""
-        if self.audio_buffer:
-            try:
-                audio_paket = self.audio_buffer.get(timeout=TIMEOUT)
-                return (audio_paket, pyaudio.paContinue)
-            except queue.Empty:
-                pass
-        return (b"\0" * frame_count * self.sample_width, pyaudio.paContinue)
+        nbytes = frame_count * self.sample_width * self.channels
+        if nbytes > len(self._output):
+            self._allocate_output(frame_count)
+        output = self._output_view[:nbytes]
+        n = self.audio_buffer.read_into(output, count_underrun=self._playing)
+        output[n:] = self._silence[: nbytes - n]
+        self._playing = n == nbytes
+        return (self._output_readonly[:nbytes], pyaudio.paContinue)
+
+    def _allocate_output(self, frame_count):
+        """Allocate the output buffer of the callback and the silence it is
+        filled with, so that the callback does not have to allocate them."""
+        nbytes = frame_count * self.sample_width * self.channels
+        self._output = bytearray(nbytes)
+        self._output_view = memoryview(self._output)
+        self._output_readonly = self._output_view.toreadonly()
+        self._silence = silence_view(nbytes)
 
-    def __init__(self, chunk_size, rate=44100, sample_width=2, **kwargs):
+    def __init__(
+        self, chunk_size, rate=44100, sample_width=2, channels=CHANNELS, **kwargs
+    ):
         """Initialize the streaming speaker module.
 
         Args:
@@ -214,27 +484,50 @@ class StreamingSpeakerModule(abstract.AbstractConsumingModule):
                 should have.
             rate (int): The frame rate of the audio. Defaults to 44100.
             sample_width (int): The sample width of the audio. Defaults to 2.
+            channels (int): The number of interleaved channels of the audio.
+                Defaults to 1.
         """
         super().__init__(**kwargs)
         self.chunk_size = chunk_size
         self.rate = rate
         self.sample_width = sample_width
+        self.channels = channels
 
         self._p = pyaudio.PyAudio()
 
-        self.audio_buffer = queue.Queue()
+        self.audio_buffer = RingBuffer(
+            RING_BUFFER_LENGTH * self.rate * self.sample_width * self.channels
+        )
+        self._allocate_output(self.chunk_size)
+        self._playing = False
         self.stream = None
 
     def process_iu(self, input_iu):
-        self.audio_buffer.put(input_iu.raw_audio)
+        self.audio_buffer.write(input_iu.audio_view())
         return None
 
+    def stats(self):
+        """Return the overrun and underrun counters of the ring buffer of the
+        speaker.
+
+        Returns:
+            dict: The counters of the ring buffer.
+        """
+        return self.audio_buffer.stats()
+
+    def reset(self):
+        super().reset()
+        self.audio_buffer.clear()
+        self._playing = False
+
     def setup(self):
         """Set up the speaker for speaking...?"""
+        if len(self._output) < self.chunk_size * self.sample_width * self.channels:
+            self._allocate_output(self.chunk_size)
         p = self._p
         self.stream = p.open(
             format=p.get_format_from_width(self.sample_width),
-            channels=CHANNELS,
+            channels=self.channels,
             rate=self.rate,
             input=False,
             output=True,
@@ -250,7 +543,188 @@ class StreamingSpeakerModule(abstract.AbstractConsumingModule):
         self.stream.stop_stream()
         self.stream.close()
         self.stream = None
-        self.audio_buffer = queue.Queue()
+        self.audio_buffer.clear()
+        self._playing = False
+
+
+class VirtualSpeakerModule(abstract.AbstractConsumingModule):
+    """A module that consumes AudioIUs like an audio device would, without
+    playing them.
+
+    The module models an output device that plays [speed] times real time
+    from the moment the first IU arrives. An IU is appended to the device
+    buffer and blocks while the buffer contains more than [buffer_size] frames,
+    so that upstream modules are paced like by a real device. If the buffer ran
+    empty before an IU arrived, the device played silence in the meantime and
+    an underrun is counted (this includes the gaps between utterances that are
+    not dispatched continuously). Silence spans are appended to the device
+    buffer like audio, but they are not reported as heard. An IU after a long
+    span waits until the span is almost played.
+
+    For every IU, the time it would have been heard (the time its first frame
+    leaves the device buffer plus the output latency) is reported with the
+    event EVENT_AUDIO_HEARD. The latency is measured from the start time of
+    the IU on its sample timeline or, if the IU has none, from its creation.
+
+    Attributes:
+        rate (int): The frame rate of the audio.
+        sample_width (int): The sample width of the audio.
+        channels (int): The number of channels of the audio.
+        buffer_size (int): The depth of the device buffer in frames.
+        output_latency (float): The latency of the device after the buffer in
+            seconds.
+        speed (float): The speed of the device. 1.0 means real time.
+    """
+
+    EVENT_AUDIO_HEARD = "audio_heard"
+    """Event that is called for every IU with the time it would be heard."""
+
+    @staticmethod
+    def name():
+        return "Virtual Speaker Module"
+
+    @staticmethod
+    def description():
+        return "A consuming module that simulates the playback of audio."
+
+    @staticmethod
+    def input_ius():
+        return [AudioIU]
+
+    @staticmethod
+    def output_iu():
+        return None
+
+    @staticmethod
+    def from_speaker(speaker):
+        """Replace a speaker module in a network with a virtual speaker.
+
+        The virtual speaker has the rate and sample width of the speaker and is
+        subscribed to every module the speaker was subscribed to. The speaker
+        is removed from the network.
+
+        Args:
+            speaker (AbstractModule): A SpeakerModule or StreamingSpeakerModule.
+
+        Returns:
+            VirtualSpeakerModule: The virtual speaker.
+        """
+        virtual_speaker = VirtualSpeakerModule(
+            rate=speaker.rate,
+            sample_width=speaker.sample_width,
+            channels=getattr(speaker, "channels", CHANNELS),
+            buffer_size=getattr(speaker, "chunk_size", 4096),
+        )
+        for buffer in speaker.left_buffers():
+            buffer.provider.subscribe(virtual_speaker)
+        speaker.remove()
+        return virtual_speaker
+
+    def __init__(
+        self,
+        rate=44100,
+        sample_width=2,
+        channels=CHANNELS,
+        buffer_size=4096,
+        output_latency=0.02,
+        speed=1.0,
+        **kwargs
+    ):
+        """Initialize the virtual speaker module.
+
+        Args:
+            rate (int): The frame rate of the audio. Defaults to 44100.
+            sample_width (int): The sample width of the audio. Defaults to 2.
+            channels (int): The number of channels of the audio. Defaults to 1.
+            buffer_size (int): The depth of the device buffer in frames.
+            output_latency (float): The latency of the device after the buffer
+                in seconds.
+            speed (float): The speed of the device. 1.0 means real time.
+        """
+        super().__init__(**kwargs)
+        self.rate = rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.buffer_size = buffer_size
+        self.output_latency = output_latency
+        self.speed = speed
+        self._reset_device()
+
+    def _reset_device(self):
+        self._start = None
+        self._start_time = None
+        self._write_pos = 0
+        self._chunks = 0
+        self._underruns = 0
+        self._underrun_frames = 0
+        self._latency_sum = 0.0
+        self._max_latency = None
+        self._buffered = 0
+        self.last_heard_at = None
+
+    def process_iu(self, input_iu):
+        frame_rate = self.rate * self.speed
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now
+            self._start_time = time.time()
+        device_pos = (now - self._start) * frame_rate
+        if self._write_pos < device_pos:
+            if self._chunks:
+                self._underruns += 1
+                self._underrun_frames += device_pos - self._write_pos
+            self._write_pos = int(device_pos)
+        if input_iu.is_silence:
+            self._write_pos += input_iu.nframes
+            return None
+        excess = self._write_pos - device_pos - self.buffer_size
+        if excess > 0:
+            time.sleep(excess / frame_rate)
+            device_pos += excess
+        self._buffered = self._write_pos - device_pos
+        heard_at = self._start_time + self._write_pos / frame_rate
+        heard_at += self.output_latency
+        self._write_pos += input_iu.nframes
+        self._chunks += 1
+
+        produced_at = input_iu.start_time()
+        if produced_at is None:
+            produced_at = input_iu.created_at
+        latency = heard_at - produced_at
+        self._latency_sum += latency
+        if self._max_latency is None or latency > self._max_latency:
+            self._max_latency = latency
+        self.last_heard_at = heard_at
+        self.event_call(
+            self.EVENT_AUDIO_HEARD,
+            {"iu": input_iu, "heard_at": heard_at, "latency": latency},
+        )
+        return None
+
+    def stats(self):
+        """Return statistics about the simulated playback.
+
+        Returns:
+            dict: A dictionary containing the number of played IUs, the number
+            of underruns, the duration of silence played during underruns in
+            seconds, the mean and maximum latency in seconds and the audio in
+            the device buffer (in seconds) when the last IU arrived.
+        """
+        frame_rate = self.rate * self.speed
+        return {
+            "chunks": self._chunks,
+            "underruns": self._underruns,
+            "underrun_time": self._underrun_frames / frame_rate,
+            "mean_latency": (
+                self._latency_sum / self._chunks if self._chunks else None
+            ),
+            "max_latency": self._max_latency,
+            "buffered": self._buffered / frame_rate,
+        }
+
+    def reset(self):
+        super().reset()
+        self._reset_device()
 
 
 class AudioDispatcherModule(abstract.AbstractModule):
@@ -276,11 +750,15 @@ class AudioDispatcherModule(abstract.AbstractModule):
         speed (float): The speed of the dispatching. 1.0 means realtime.
         dispatching_mutex (threading.Lock): The mutex if an input IU is
             currently being dispatched.
-        audio_buffer (list): The current audio buffer containing the output IUs
-            that are currently dispatched.
+        audio_buffer (collections.deque): The input IUs whose audio is
+            currently dispatched or waiting to be dispatched. The output IUs are
+            created lazily from a cursor into the first IU of the buffer.
         run_loop (bool): Whether or not the dispatching loop is running.
         interrupt (bool): Whether or not incoming IUs interrupt the old
             dispatching
+        silence_span (int): The number of silent chunks that are dispatched
+            together as one silence span IU during continuous dispatching. If
+            1, every silent chunk is dispatched on its own.
     """
 
     @staticmethod
@@ -310,6 +788,7 @@ class AudioDispatcherModule(abstract.AbstractModule):
         continuous=True,
         silence=None,
         interrupt=True,
+        silence_span=1,
         **kwargs
     ):
         """Initialize the AudioDispatcherModule with the given arguments.
@@ -331,6 +810,14 @@ class AudioDispatcherModule(abstract.AbstractModule):
                 False, the "old" dispatching will be finished before the new one
                 is started. If the new input IU has the dispatching flag set to
                 False, dispatching will always be stopped.
+            silence_span (int): The number of silent chunks that are
+                dispatched together. If greater than 1, only the first chunk of
+                a pause is dispatched on its own. The following silence is
+                dispatched in silence span IUs of [silence_span] chunks of
+                digital silence, so that consumers handle long pauses in a few
+                IUs. Each span is dispatched when it starts, and audio that
+                arrives during a span is dispatched after the span, so the start
+                of speech may be delayed by up to [silence_span] - 1 chunks.
         """
         super().__init__(**kwargs)
         self.target_chunk_size = target_chunk_size
@@ -343,10 +830,14 @@ class AudioDispatcherModule(abstract.AbstractModule):
         self.sample_width = sample_width
         self._is_dispatching = False
         self.dispatching_mutex = threading.Lock()
-        self.audio_buffer = []
+        self.audio_buffer = collections.deque()
+        self._cursor = 0
         self.run_loop = False
+        self._dispatch_thread = None
         self.speed = speed
         self.interrupt = interrupt
+        self.silence_span = silence_span
+        self.timeline = AudioTimeline(self.rate, "dispatcher", speed)
 
     def is_dispatching(self):
         """Return whether or not the audio dispatcher is dispatching a Speech
@@ -368,71 +859,531 @@ class AudioDispatcherModule(abstract.AbstractModule):
             self._is_dispatching = value
 
     def process_iu(self, input_iu):
-        cur_width = self.target_chunk_size * self.sample_width
-        # If the AudioDispatcherModule is set to intterupt mode or if the
-        # incoming IU is set to not dispatch, we stop dispatching and clean the
-        # buffer
-        if self.interrupt or not input_iu.dispatch:
-            self.set_dispatching(False)
-            self.audio_buffer = []
-        if input_iu.dispatch:
-            # Loop over all frames (frame-sized chunks of data) in the input IU
-            # and add them to the buffer to be dispatched by the
-            # _dispatch_audio_loop
-            for i in range(0, input_iu.nframes, self.target_chunk_size):
-                cur_pos = i * self.sample_width
-                data = input_iu.raw_audio[cur_pos : cur_pos + cur_width]
-                distance = cur_width - len(data)
-                data += b"\0" * distance
-
-                completion = float((i + self.target_chunk_size) / input_iu.nframes)
-                if completion > 1:
-                    completion = 1
-
-                current_iu = self.create_iu(input_iu)
-                current_iu.set_dispatching(completion, True)
-                current_iu.set_audio(
-                    data, self.target_chunk_size, self.rate, self.sample_width
-                )
-                self.audio_buffer.append(current_iu)
-            self.set_dispatching(True)
+        with self.dispatching_mutex:
+            # If the AudioDispatcherModule is set to intterupt mode or if the
+            # incoming IU is set to not dispatch, we stop dispatching and clean
+            # the buffer
+            if self.interrupt or not input_iu.dispatch:
+                self._is_dispatching = False
+                self.audio_buffer.clear()
+                self._cursor = 0
+            if input_iu.dispatch:
+                # The chunks of the input IU are created by the
+                # _dispatch_audio_loop when they are due.
+                self.audio_buffer.append(input_iu)
+                self._is_dispatching = True
         return None
 
+    def _next_chunk(self):
+        """Create the next output IU from the audio of the input IUs in the
+        buffer. This method has to be called while holding the
+        dispatching_mutex.
+
+        The output IU contains a view on the audio of the input IU. Only the
+        last chunk of an input IU is copied if it has to be padded with silence.
+
+        Returns:
+            DispatchedAudioIU: The next output IU or None if the audio buffer is
+            empty.
+        """
+        while self.audio_buffer and self._cursor >= self.audio_buffer[0].nframes:
+            self.audio_buffer.popleft()
+            self._cursor = 0
+        if not self.audio_buffer:
+            return None
+        input_iu = self.audio_buffer[0]
+        cur_width = self.target_chunk_size * self.sample_width
+        cur_pos = self._cursor * self.sample_width
+        data = input_iu.audio_view()[cur_pos : cur_pos + cur_width]
+        distance = cur_width - len(data)
+        if distance:
+            data = data.tobytes() + bytes(distance)
+        self._cursor += self.target_chunk_size
+
+        completion = float(self._cursor / input_iu.nframes)
+        if completion > 1:
+            completion = 1
+
+        current_iu = self.create_iu(input_iu)
+        current_iu.set_dispatching(completion, True)
+        current_iu.set_audio(data, self.target_chunk_size, self.rate, self.sample_width)
+        return current_iu
+
+    def reset(self):
+        super().reset()
+        with self.dispatching_mutex:
+            self._is_dispatching = False
+            self.audio_buffer.clear()
+            self._cursor = 0
+        self.timeline = AudioTimeline(self.rate, "dispatcher", self.speed)
+
+    def _dispatch_silence(self, nchunks, sample_offset):
+        """Dispatch silence of the given number of chunks.
+
+        A single chunk contains the silence of the module, multiple chunks are
+        dispatched as one silence span IU.
+
+        Args:
+            nchunks (int): The number of silent chunks.
+            sample_offset (int): The index of the first sample of the silence.
+        """
+        current_iu = self.create_iu(None)
+        if nchunks == 1:
+            current_iu.set_audio(
+                self.silence, self.target_chunk_size, self.rate, self.sample_width
+            )
+        else:
+            current_iu.set_silence(
+                nchunks * self.target_chunk_size, self.rate, self.sample_width
+            )
+        current_iu.set_dispatching(0.0, False)
+        current_iu.set_timeline(self.timeline, sample_offset)
+        self.append(current_iu)
+
     def _dispatch_audio_loop(self):
-        """A method run in a thread that adds IU to the output queue."""
+        """A method run in a thread that adds IU to the output queue.
+
+        The IUs are dispatched on an absolute timeline, so that the time spent
+        creating and appending the IUs does not add up over time. If the loop
+        falls behind, the due IUs are dispatched without waiting.
+
+        The sample timeline of the dispatcher advances with every tick, even if
+        no IU is dispatched during silence. A silence span is dispatched at the
+        tick of its first chunk. The ticks that the span covers dispatch
+        nothing, so audio that arrives during a span starts after the span.
+        """
+        next_tick = time.monotonic()
+        self.timeline.speed = self.speed
+        self.timeline.start()
+        was_silent = False
+        span_remaining = 0
         while self.run_loop:
-            with self.dispatching_mutex:
-                if self._is_dispatching:
-                    if self.audio_buffer:
-                        self.append(self.audio_buffer.pop(0))
-                    else:
-                        self._is_dispatching = False
-                if not self._is_dispatching:  # no else here! bc line above
-                    if self.continuous:
-                        current_iu = self.create_iu(None)
-                        current_iu.set_audio(
-                            self.silence,
-                            self.target_chunk_size,
-                            self.rate,
-                            self.sample_width,
-                        )
-                        current_iu.set_dispatching(0.0, False)
-                        self.append(current_iu)
-            time.sleep((self.target_chunk_size / self.rate) / self.speed)
+            sample_offset = self.timeline.advance(self.target_chunk_size)
+            if span_remaining:
+                span_remaining -= 1
+            else:
+                current_iu = None
+                with self.dispatching_mutex:
+                    if self._is_dispatching:
+                        current_iu = self._next_chunk()
+                        if current_iu is None:
+                            self._is_dispatching = False
+                    silent = self.continuous and not self._is_dispatching
+                if silent and was_silent and self.silence_span > 1:
+                    self._dispatch_silence(self.silence_span, sample_offset)
+                    span_remaining = self.silence_span - 1
+                elif silent:
+                    self._dispatch_silence(1, sample_offset)
+                elif current_iu is not None:
+                    current_iu.set_timeline(self.timeline, sample_offset)
+                    self.append(current_iu)
+                was_silent = silent
+            next_tick += (self.target_chunk_size / self.rate) / self.speed
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
 
     def prepare_run(self):
         self.run_loop = True
-        t = threading.Thread(target=self._dispatch_audio_loop)
-        t.start()
+        self._dispatch_thread = threading.Thread(target=self._dispatch_audio_loop)
+        self._dispatch_thread.start()
 
     def shutdown(self):
         self.run_loop = False
-        self.audio_buffer = []
+        if self._dispatch_thread:
+            self._dispatch_thread.join()
+            self._dispatch_thread = None
+        with self.dispatching_mutex:
+            self.audio_buffer.clear()
+            self._cursor = 0
+
+
+class AudioRechunkerModule(abstract.AbstractModule):
+    """A module that takes AudioIUs of arbitrary size and outputs AudioIUs with
+    exactly [chunk_size] frames.
+
+    The audio of the input IUs is kept as views in a buffer and the output IUs
+    are views on the input audio whenever a chunk lies inside a single input IU.
+    Audio is only copied for chunks that straddle the boundary between two input
+    IUs. An output IU is produced as soon as enough audio for a chunk is
+    buffered, so the module adds no more than one chunk of latency.
+
+    Attributes:
+        chunk_size (int): The number of frames of each output IU.
+        audio_buffer (collections.deque): Tuples of the input IUs and views on
+            their audio that was not yet output.
+    """
+
+    @staticmethod
+    def name():
+        return "Audio Rechunker Module"
+
+    @staticmethod
+    def description():
+        return "A module that splits and joins audio into chunks of a fixed size."
+
+    @staticmethod
+    def input_ius():
+        return [AudioIU]
+
+    @staticmethod
+    def output_iu():
+        return AudioIU
+
+    def __init__(self, chunk_size, **kwargs):
+        """Initialize the audio rechunker module.
+
+        Args:
+            chunk_size (int): The number of frames of each output IU.
+        """
+        super().__init__(**kwargs)
+        self.chunk_size = chunk_size
+        self.audio_buffer = collections.deque()
+        self._buffered_bytes = 0
+        self._sample_offset = None
+
+    def _next_chunk(self, nbytes):
+        """Remove nbytes of audio from the buffer.
+
+        Returns:
+            tuple: The input IU the chunk starts in and the audio of the chunk.
+        """
+        first_iu, view = self.audio_buffer[0]
+        if len(view) >= nbytes:
+            data = view[:nbytes]
+            if len(view) == nbytes:
+                self.audio_buffer.popleft()
+            else:
+                self.audio_buffer[0] = (first_iu, view[nbytes:])
+        else:
+            data = bytearray(nbytes)
+            pos = 0
+            while pos < nbytes:
+                iu, view = self.audio_buffer[0]
+                length = min(len(view), nbytes - pos)
+                data[pos : pos + length] = view[:length]
+                pos += length
+                if length == len(view):
+                    self.audio_buffer.popleft()
+                else:
+                    self.audio_buffer[0] = (iu, view[length:])
+        self._buffered_bytes -= nbytes
+        return first_iu, data
+
+    def process_iu(self, input_iu):
+        view = input_iu.audio_view()
+        if not len(view):
+            return None
+        if not self.audio_buffer:
+            self._sample_offset = input_iu.sample_offset
+        self.audio_buffer.append((input_iu, view))
+        self._buffered_bytes += len(view)
+        nbytes = self.chunk_size * input_iu.sample_width * input_iu.channels
+        while self._buffered_bytes >= nbytes:
+            first_iu, data = self._next_chunk(nbytes)
+            output_iu = self.create_iu(first_iu)
+            output_iu.set_audio(
+                data,
+                self.chunk_size,
+                first_iu.rate,
+                first_iu.sample_width,
+                first_iu.channels,
+            )
+            if self._sample_offset is not None:
+                output_iu.copy_timeline(first_iu)
+                output_iu.sample_offset = self._sample_offset
+                self._sample_offset += self.chunk_size
+            self.append(output_iu)
+        if not self.audio_buffer:
+            self._sample_offset = None
+        return None
+
+    def reset(self):
+        super().reset()
+        self.audio_buffer.clear()
+        self._buffered_bytes = 0
+        self._sample_offset = None
+
+    def shutdown(self):
+        self.audio_buffer.clear()
+        self._buffered_bytes = 0
+        self._sample_offset = None
+
+
+class AudioResampleModule(abstract.AbstractModule):
+    """A module that converts AudioIUs to a given sample rate and sample width.
+
+    The audio is resampled in-process with a streaming polyphase filter, so
+    that there are no artifacts between consecutive IUs. Every channel is
+    resampled by its own filter. If the rate or the number of channels of the
+    input changes, new filters are created. Input IUs that already have the
+    target rate and sample width are passed on without copying the audio.
+
+    Attributes:
+        rate (int): The sample rate of the output IUs.
+        sample_width (int): The sample width of the output IUs.
+    """
+
+    @staticmethod
+    def name():
+        return "Audio Resample Module"
+
+    @staticmethod
+    def description():
+        return "A module that converts the sample rate and width of audio."
+
+    @staticmethod
+    def input_ius():
+        return [AudioIU]
+
+    @staticmethod
+    def output_iu():
+        return AudioIU
+
+    def __init__(self, rate=44100, sample_width=2, **kwargs):
+        """Initialize the audio resample module.
+
+        Args:
+            rate (int): The sample rate of the output IUs. Defaults to 44100.
+            sample_width (int): The sample width of the output IUs. Defaults to
+                2.
+        """
+        super().__init__(**kwargs)
+        self.rate = rate
+        self.sample_width = sample_width
+        self._resamplers = []
+        self._sample_offset = None
+
+    def _resample(self, samples, rate, channels):
+        """Resample interleaved float samples with one resampler per channel."""
+        if (
+            not self._resamplers
+            or self._resamplers[0].from_rate != rate
+            or len(self._resamplers) != channels
+        ):
+            self._resamplers = [dsp.Resampler(rate, self.rate) for _ in range(channels)]
+        if channels == 1:
+            return self._resamplers[0].process(samples)
+        frames = samples.reshape(-1, channels)
+        resampled = [r.process(frames[:, c]) for c, r in enumerate(self._resamplers)]
+        return np.stack(resampled, axis=1).ravel()
+
+    def process_iu(self, input_iu):
+        channels = input_iu.channels
+        if input_iu.rate == self.rate:
+            raw_audio = dsp.convert_sample_width(
+                input_iu.raw_audio, input_iu.sample_width, self.sample_width
+            )
+        else:
+            samples = dsp.to_float(input_iu.raw_audio, input_iu.sample_width)
+            raw_audio = dsp.from_float(
+                self._resample(samples, input_iu.rate, channels), self.sample_width
+            )
+        # The resampled audio is delayed by the filter, so the offset is counted
+        # from the first IU of the stream.
+        if input_iu.sample_offset is not None and self._sample_offset is None:
+            offset = input_iu.sample_offset * self.rate // input_iu.rate
+            self._sample_offset = offset
+        nframes = len(raw_audio) // channels
+        if not nframes:
+            return None
+        output_iu = self.create_iu(input_iu)
+        output_iu.set_audio(raw_audio, nframes, self.rate, self.sample_width, channels)
+        if self._sample_offset is not None:
+            output_iu.copy_timeline(input_iu)
+            output_iu.sample_offset = self._sample_offset
+            self._sample_offset += nframes
+        return output_iu
+
+    def reset(self):
+        super().reset()
+        self._resamplers = []
+        self._sample_offset = None
+
+    def shutdown(self):
+        self._resamplers = []
+        self._sample_offset = None
+
+
+class AudioMixerModule(abstract.AbstractModule):
+    """A module that mixes the AudioIUs of multiple sources into one stream.
+
+    Every module that sends AudioIUs to the mixer is one source. The position of
+    an input IU inside the mix is determined either by the sample index of the
+    IU ("sample", the sample timeline of all sources has to start at the same
+    time) or by the time of its first sample ("time"). IUs without a sample
+    timeline are placed at the time they were created at or directly after the
+    previous IU of their source.
+
+    With one output channel, all sources are summed into a mono mix. With
+    multiple output channels, each source is written to its own channel (in
+    the order the sources are first seen) and the output is interleaved.
+
+    A chunk of [chunk_size] frames is output as soon as all sources have
+    provided audio for it. Sources that fall behind by more than [max_delay]
+    seconds are treated as silent for that chunk, so that a source that stops
+    producing audio does not stall the mix. Audio that arrives after its
+    position was output is dropped.
+
+    All input IUs need to have the same rate as the mixer. Input audio with
+    multiple channels is downmixed to mono. Silence spans are not mixed, they
+    only advance the position of their source.
+
+    Attributes:
+        chunk_size (int): The number of frames of each output IU.
+        rate (int): The sample rate of the input and output IUs.
+        sample_width (int): The sample width of the output IUs.
+        channels (int): The number of channels of the output.
+        align (str): How input IUs are aligned ("sample" or "time").
+        max_delay (float): The time in seconds a source may fall behind before
+            it is treated as silent.
+        sources (list): The sources of the mix in the order they were seen.
+        timeline (AudioTimeline): The sample timeline of the mix.
+    """
+
+    @staticmethod
+    def name():
+        return "Audio Mixer Module"
+
+    @staticmethod
+    def description():
+        return "A module that mixes multiple audio streams into one stream."
+
+    @staticmethod
+    def input_ius():
+        return [AudioIU]
+
+    @staticmethod
+    def output_iu():
+        return AudioIU
+
+    def __init__(
+        self,
+        chunk_size,
+        rate=44100,
+        sample_width=2,
+        channels=CHANNELS,
+        align="sample",
+        max_delay=0.5,
+        **kwargs
+    ):
+        """Initialize the audio mixer module.
+
+        Args:
+            chunk_size (int): The number of frames of each output IU.
+            rate (int): The sample rate of the input and output IUs.
+            sample_width (int): The sample width of the output IUs.
+            channels (int): The number of channels of the output. If 1, all
+                sources are mixed into one channel.
+            align (str): How input IUs are aligned. "sample" uses the sample
+                index of the IUs, "time" uses the time of their first sample.
+            max_delay (float): The time in seconds a source may fall behind
+                before it is treated as silent.
+        """
+        super().__init__(**kwargs)
+        self.chunk_size = chunk_size
+        self.rate = rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.align = align
+        self.max_delay = max_delay
+        self._reset_mix()
+
+    def _reset_mix(self):
+        self.sources = []
+        self.timeline = AudioTimeline(self.rate, "mixer")
+        self._mix = np.zeros((self.chunk_size * 4, self.channels), dtype=np.float32)
+        self._position = 0
+        self._filled = {}
+        self._start_time = None
+
+    def _input_position(self, input_iu, source):
+        """Return the sample index of the first sample of the input IU in the
+        mix."""
+        if self.align == "time":
+            start = input_iu.start_time()
+            if start is None:
+                start = input_iu.created_at
+            if self._start_time is None:
+                self._start_time = start
+                self.timeline.start(start)
+            return int(round((start - self._start_time) * self.rate))
+        self.timeline.start()
+        if input_iu.sample_offset is not None:
+            return input_iu.sample_offset
+        return self._filled.get(source, self._position)
+
+    def _add(self, samples, position, channel):
+        start = position - self._position
+        if start < 0:
+            samples = samples[-start:]
+            start = 0
+        end = start + len(samples)
+        if end > len(self._mix):
+            mix = np.zeros((max(end, 2 * len(self._mix)), self.channels), np.float32)
+            mix[: len(self._mix)] = self._mix
+            self._mix = mix
+        if channel is None:
+            self._mix[start:end] += samples[:, np.newaxis]
+        else:
+            self._mix[start:end, channel] += samples
+
+    def _output_chunks(self):
+        if not self._filled:
+            return
+        filled = self._filled.values()
+        until = max(min(filled), max(filled) - int(self.max_delay * self.rate))
+        while until - self._position >= self.chunk_size:
+            chunk = self._mix[: self.chunk_size]
+            raw_audio = dsp.from_float(chunk.ravel(), self.sample_width)
+            output_iu = self.create_iu(None)
+            output_iu.set_audio(
+                raw_audio, self.chunk_size, self.rate, self.sample_width, self.channels
+            )
+            output_iu.set_timeline(self.timeline, self._position)
+            remaining = len(self._mix) - self.chunk_size
+            self._mix[:remaining] = self._mix[self.chunk_size :]
+            self._mix[remaining:] = 0.0
+            self._position += self.chunk_size
+            self.append(output_iu)
+
+    def process_iu(self, input_iu):
+        source = input_iu.creator
+        if source not in self._filled:
+            self.sources.append(source)
+            self._filled[source] = self._position
+        position = self._input_position(input_iu, source)
+        if not input_iu.is_silence:
+            samples = dsp.to_float(input_iu.raw_audio, input_iu.sample_width)
+            if input_iu.channels > 1:
+                samples = samples.reshape(-1, input_iu.channels).mean(axis=1)
+            channel = None
+            if self.channels > 1:
+                channel = self.sources.index(source) % self.channels
+            self._add(samples, position, channel)
+        end = position + input_iu.nframes
+        self._filled[source] = max(self._filled[source], end)
+        self._output_chunks()
+        return None
+
+    def reset(self):
+        super().reset()
+        self._reset_mix()
+
+    def shutdown(self):
+        self._reset_mix()
 
 
 class AudioRecorderModule(abstract.AbstractConsumingModule):
     """A Module that consumes AudioIUs and saves them as a PCM wave file to
-    disk."""
+    disk.
+
+    If [buffered] is set, the audio is written by a BufferedWaveWriter in a
+    background thread, so that writing to the disk does not delay the module.
+    With more than one track, every source sending audio to the recorder is
+    written to its own track (the channels of the tracks are interleaved in the
+    file). The IUs of each source are placed by their sample index if they
+    carry one."""
 
     @staticmethod
     def name():
@@ -446,7 +1397,16 @@ class AudioRecorderModule(abstract.AbstractConsumingModule):
     def input_ius():
         return [AudioIU]
 
-    def __init__(self, filename, rate=44100, sample_width=2, **kwargs):
+    def __init__(
+        self,
+        filename,
+        rate=44100,
+        sample_width=2,
+        channels=CHANNELS,
+        buffered=False,
+        tracks=1,
+        **kwargs
+    ):
         """Initialize the audio recorder module.
 
         Args:
@@ -455,20 +1415,55 @@ class AudioRecorderModule(abstract.AbstractConsumingModule):
             rate (int): The sample rate of the input and thus of the wave file.
                 Defaults to 44100.
             sample_width (int): The width of one sample. Defaults to 2.
+            channels (int): The number of interleaved channels of the input.
+                Defaults to 1.
+            buffered (bool): Whether the file should be written in a background
+                thread. Defaults to False.
+            tracks (int): The number of sources that are recorded into separate
+                tracks of the file. More than one track implies buffered.
+                Defaults to 1.
         """
         super().__init__(**kwargs)
         self.filename = filename
         self.wavfile = None
         self.rate = rate
         self.sample_width = sample_width
+        self.channels = channels
+        self.buffered = buffered
+        self.tracks = tracks
+        self.sources = []
 
     def process_iu(self, input_iu):
-        self.wavfile.writeframes(input_iu.raw_audio)
+        if not isinstance(self.wavfile, BufferedWaveWriter):
+            self.wavfile.writeframes(input_iu.audio_view())
+            return
+        if self.tracks == 1:
+            self.wavfile.write(input_iu.audio_view())
+            return
+        if input_iu.creator not in self.sources:
+            if len(self.sources) >= self.tracks:
+                return
+            self.sources.append(input_iu.creator)
+        track = self.sources.index(input_iu.creator)
+        self.wavfile.write(input_iu.audio_view(), track, input_iu.sample_offset)
+
+    def reset(self):
+        super().reset()
+        self.sources = []
 
     def setup(self):
+        if self.buffered or self.tracks > 1:
+            self.wavfile = BufferedWaveWriter(
+                self.filename,
+                self.rate,
+                self.sample_width,
+                self.channels,
+                self.tracks,
+            )
+            return
         self.wavfile = wave.open(self.filename, "wb")
         self.wavfile.setframerate(self.rate)
-        self.wavfile.setnchannels(CHANNELS)
+        self.wavfile.setnchannels(self.channels)
         self.wavfile.setsampwidth(self.sample_width)
 
     def shutdown(self):
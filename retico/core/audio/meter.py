@@ -0,0 +1,277 @@
+"""
+A module for measuring the level and the health of audio streams.
+
+The AudioMeterModule is a tap that may be subscribed to any module producing
+AudioIUs next to its other consumers. It measures the level, clipping and the
+runs of digital silence of every IU with a few vectorized reductions and
+aggregates them over a rolling window, so that it can stay enabled in running
+pipelines.
+
+Usage:
+    meter = AudioMeterModule(window=5.0)
+    microphone.subscribe(meter)
+    ...
+    print(meter.stats())
+"""
+
+import collections
+import math
+import threading
+import time
+
+import numpy as np
+
+from retico.core import abstract
+from retico.core.audio.common import AudioIU, SAMPLE_DTYPES
+
+SILENCE_DB = -120.0
+"""The level in dBFS that is reported for digital silence."""
+
+
+def to_db(value):
+    """Convert a linear amplitude relative to full scale into dBFS.
+
+    Args:
+        value (float): The amplitude between 0.0 and 1.0.
+
+    Returns:
+        float: The amplitude in dBFS, at least SILENCE_DB.
+    """
+    if value <= 0:
+        return SILENCE_DB
+    return max(20 * math.log10(value), SILENCE_DB)
+
+
+def zero_runs(is_zero):
+    """Find the runs of consecutive zero frames.
+
+    Args:
+        is_zero (numpy.ndarray): A boolean array that is True for every frame
+            that is digital silence.
+
+    Returns:
+        tuple: The length of the run at the start of the array, an array of the
+        lengths of the runs that lie completely inside the array and the length
+        of the run at the end of the array. If the whole array is silent, the
+        run is returned as the leading run and the trailing run is 0.
+    """
+    n = len(is_zero)
+    padded = np.concatenate(([False], is_zero, [False])).view(np.int8)
+    edges = np.diff(padded)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    lengths = ends - starts
+    if not len(lengths):
+        return 0, lengths, 0
+    leading = int(lengths[0]) if starts[0] == 0 else 0
+    if leading == n:
+        return leading, lengths[:0], 0
+    trailing = int(lengths[-1]) if ends[-1] == n else 0
+    inner = lengths[1 if leading else 0 : len(lengths) - 1 if trailing else None]
+    return leading, inner, trailing
+
+
+def measure(raw_audio, sample_width, channels=1, clip_level=0.999):
+    """Measure the level, clipping and digital silence of PCM audio.
+
+    Args:
+        raw_audio: An object supporting the buffer protocol containing PCM
+            audio or a NumPy array of samples.
+        sample_width (int): The sample width of the audio.
+        channels (int): The number of interleaved channels of the audio.
+        clip_level (float): The amplitude relative to full scale from which a
+            sample counts as clipped.
+
+    Returns:
+        tuple: The sum of the squared samples relative to full scale, the peak
+        amplitude relative to full scale, the number of clipped samples and a
+        boolean array that is True for every frame that is digital silence.
+    """
+    samples = np.frombuffer(raw_audio, dtype=SAMPLE_DTYPES[sample_width])
+    full_scale = float(1 << (8 * sample_width - 1))
+    if sample_width == 1:
+        samples = samples.astype(np.int16) - 128
+    low, high = int(samples.min(initial=0)), int(samples.max(initial=0))
+    peak = max(-low, high) / full_scale
+    limit = clip_level * full_scale
+    clipped = 0
+    if high >= limit or -low >= limit:
+        clipped = int(np.count_nonzero(np.abs(samples) >= limit))
+    floats = samples.astype(np.float32)
+    energy = float(np.dot(floats, floats)) / (full_scale * full_scale)
+    is_zero = samples == 0
+    if channels > 1:
+        is_zero = is_zero.reshape(-1, channels).all(axis=1)
+    return energy, peak, clipped, is_zero
+
+
+class AudioMeterModule(abstract.AbstractConsumingModule):
+    """A module that measures the level, clipping and dropouts of the audio it
+    receives.
+
+    For every IU, the RMS level, the peak level, the number of clipped samples
+    and the runs of digital silence (frames in which all samples are zero) are
+    measured. The measurements are kept for the last [window] seconds of
+    audio. A run of digital silence that is at least [min_dropout] and at most
+    [max_dropout] seconds long and is surrounded by audio counts as a dropout.
+    Longer runs count as silence. Silence spans are counted as digital silence
+    without looking at their samples.
+
+    The module does not produce IUs. It should be subscribed to a single
+    producer, next to the other consumers of that producer.
+
+    Attributes:
+        window (float): The length of the rolling window in seconds of audio.
+        clip_level (float): The amplitude relative to full scale from which a
+            sample counts as clipped.
+        min_dropout (float): The minimum length of a dropout in seconds.
+        max_dropout (float): The maximum length of a dropout in seconds.
+        last (dict): The measurements of the last IU.
+    """
+
+    @staticmethod
+    def name():
+        return "Audio Meter Module"
+
+    @staticmethod
+    def description():
+        return "A module that measures the level, clipping and dropouts of audio."
+
+    @staticmethod
+    def input_ius():
+        return [AudioIU]
+
+    def __init__(
+        self, window=5.0, clip_level=0.999, min_dropout=0.005, max_dropout=0.5, **kwargs
+    ):
+        """Initialize the audio meter module.
+
+        Args:
+            window (float): The length of the rolling window in seconds of
+                audio.
+            clip_level (float): The amplitude relative to full scale from which
+                a sample counts as clipped.
+            min_dropout (float): The minimum length of a dropout in seconds.
+            max_dropout (float): The maximum length of a dropout in seconds.
+        """
+        super().__init__(**kwargs)
+        self.window = window
+        self.clip_level = clip_level
+        self.min_dropout = min_dropout
+        self.max_dropout = max_dropout
+        self._mutex = threading.Lock()
+        self._reset_meter()
+
+    def _reset_meter(self):
+        self.last = None
+        self._entries = collections.deque()
+        self._totals = np.zeros(4)  # frames, samples, energy, clipped
+        self._zero_frames = 0
+        self._run = 0
+        self._after_audio = False
+        self._dropouts = collections.deque()
+        self._total_dropouts = 0
+        self._frames = 0
+        self._ius = 0
+        self._process_time = 0.0
+        self._rate = None
+
+    def _end_run(self, length, position):
+        """Count a completed run of digital silence that is surrounded by
+        audio. The position is the index of the frame after the IU in which the
+        run ended."""
+        duration = length / self._rate
+        if self.min_dropout <= duration <= self.max_dropout:
+            self._dropouts.append((position, duration))
+            self._total_dropouts += 1
+
+    def process_iu(self, input_iu):
+        start = time.perf_counter()
+        nframes = input_iu.nframes
+        nsamples = nframes * input_iu.channels
+        with self._mutex:
+            self._rate = input_iu.rate
+            position = self._frames + nframes
+            if input_iu.is_silence:
+                energy, peak, clipped = 0.0, 0.0, 0
+                zeros = nframes
+                self._run += nframes
+            else:
+                energy, peak, clipped, is_zero = measure(
+                    input_iu.audio_view(),
+                    input_iu.sample_width,
+                    input_iu.channels,
+                    self.clip_level,
+                )
+                zeros = int(np.count_nonzero(is_zero))
+                leading, inner, trailing = zero_runs(is_zero)
+                if leading == nframes:
+                    self._run += nframes
+                else:
+                    if self._after_audio and self._run + leading:
+                        self._end_run(self._run + leading, position)
+                    for length in inner:
+                        self._end_run(length, position)
+                    self._run = trailing
+                    self._after_audio = True
+
+            rms = math.sqrt(energy / nsamples) if nsamples else 0.0
+            self.last = {
+                "rms": to_db(rms),
+                "peak": to_db(peak),
+                "clip_ratio": clipped / nsamples if nsamples else 0.0,
+                "silence_ratio": zeros / nframes if nframes else 0.0,
+            }
+            entry = (nframes, nsamples, energy, clipped, zeros, peak)
+            self._entries.append(entry)
+            self._totals += entry[:4]
+            self._zero_frames += zeros
+            window_frames = self.window * self._rate
+            while self._totals[0] - self._entries[0][0] > window_frames:
+                old = self._entries.popleft()
+                self._totals -= old[:4]
+                self._zero_frames -= old[4]
+            while self._dropouts and self._dropouts[0][0] < position - window_frames:
+                self._dropouts.popleft()
+            self._frames = position
+            self._ius += 1
+            self._process_time += time.perf_counter() - start
+
+    def stats(self):
+        """Return the measurements of the rolling window.
+
+        Returns:
+            dict: A dictionary containing the RMS and peak level in dBFS, the
+            ratio of clipped samples, the ratio of digitally silent frames,
+            the number and total length of the dropouts in the window, the
+            number of dropouts since the start, the length of the current run
+            of digital silence in seconds, the number of IUs and seconds of
+            audio measured since the start, the processing time relative to the
+            length of the measured audio and the measurements of the last IU.
+        """
+        with self._mutex:
+            frames, samples, energy, clipped = (float(v) for v in self._totals)
+            energy = max(energy, 0.0)
+            rate = self._rate or 1
+            peak = max((entry[5] for entry in self._entries), default=0.0)
+            return {
+                "rms": to_db(math.sqrt(energy / samples)) if samples else None,
+                "peak": to_db(peak) if self._entries else None,
+                "clip_ratio": clipped / samples if samples else 0.0,
+                "silence_ratio": self._zero_frames / frames if frames else 0.0,
+                "dropouts": len(self._dropouts),
+                "dropout_time": sum(d for _, d in self._dropouts),
+                "total_dropouts": self._total_dropouts,
+                "silent_run": self._run / rate,
+                "ius": self._ius,
+                "audio_time": self._frames / rate,
+                "load": (
+                    self._process_time / (self._frames / rate) if self._frames else 0.0
+                ),
+                "last": self.last,
+            }
+
+    def reset(self):
+        super().reset()
+        with self._mutex:
+            self._reset_meter()
@@ -0,0 +1,142 @@
+"""
+A module containing a ring buffer for passing audio between an audio device
+callback and a module thread.
+"""
+
+from retico.core.audio.common import as_byte_view
+
+
+class RingBuffer:
+    """A pre-allocated single-producer/single-consumer ring buffer of bytes.
+
+    One thread may write into the buffer while another thread reads from it
+    without any locks: the write position is only changed by the producer and
+    the read position only by the consumer. Writing and reading copy the data
+    into and out of the pre-allocated buffer and never block or allocate audio
+    buffers, so that both may be called inside a PortAudio callback.
+
+    If there is not enough space for a write, the data that does not fit is
+    dropped and counted as an overrun. If a read is not completely satisfied,
+    it is counted as an underrun.
+
+    Attributes:
+        capacity (int): The capacity of the buffer in bytes.
+        overruns (int): The number of writes that did not fit into the buffer.
+        overrun_bytes (int): The number of bytes that were dropped.
+        underruns (int): The number of reads that could not be satisfied.
+        underrun_bytes (int): The number of bytes that were missing.
+    """
+
+    def __init__(self, capacity):
+        """Initialize the ring buffer.
+
+        Args:
+            capacity (int): The capacity of the buffer in bytes.
+        """
+        self.capacity = int(capacity)
+        self._buffer = bytearray(self.capacity)
+        self._view = memoryview(self._buffer)
+        self._write_pos = 0
+        self._read_pos = 0
+        self.overruns = 0
+        self.overrun_bytes = 0
+        self.underruns = 0
+        self.underrun_bytes = 0
+
+    def available(self):
+        """Return the number of bytes that can be read.
+
+        Returns:
+            int: The number of bytes in the buffer.
+        """
+        return self._write_pos - self._read_pos
+
+    def free(self):
+        """Return the number of bytes that can be written.
+
+        Returns:
+            int: The free space of the buffer in bytes.
+        """
+        return self.capacity - self.available()
+
+    def write(self, data):
+        """Copy data into the buffer. This may only be called by the producer.
+
+        Args:
+            data: An object supporting the buffer protocol.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        data = as_byte_view(data)
+        n = min(len(data), self.free())
+        if n < len(data):
+            self.overruns += 1
+            self.overrun_bytes += len(data) - n
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self._view[start : start + first] = data[:first]
+        self._view[: n - first] = data[first:n]
+        self._write_pos += n
+        return n
+
+    def read_into(self, out, count_underrun=True):
+        """Copy data from the buffer into the given buffer. This may only be
+        called by the consumer.
+
+        Args:
+            out: A writable object supporting the buffer protocol. As many bytes
+                as possible (up to its length) are read into it.
+            count_underrun (bool): Whether a read that does not fill the output
+                buffer should be counted as an underrun.
+
+        Returns:
+            int: The number of bytes read.
+        """
+        out = as_byte_view(out)
+        n = min(len(out), self.available())
+        if n < len(out) and count_underrun:
+            self.underruns += 1
+            self.underrun_bytes += len(out) - n
+        start = self._read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._view[start : start + first]
+        out[first:n] = self._view[: n - first]
+        self._read_pos += n
+        return n
+
+    def read(self, nbytes):
+        """Read nbytes from the buffer into a new bytearray. This may only be
+        called by the consumer and only if at least nbytes are available.
+
+        Args:
+            nbytes (int): The number of bytes to read.
+
+        Returns:
+            bytearray: The data that was read or None if not enough data is
+            available.
+        """
+        if self.available() < nbytes:
+            return None
+        out = bytearray(nbytes)
+        self.read_into(out)
+        return out
+
+    def clear(self):
+        """Remove all data from the buffer. This should only be called while
+        neither the producer nor the consumer are running."""
+        self._read_pos = self._write_pos
+
+    def stats(self):
+        """Return the counters of the buffer.
+
+        Returns:
+            dict: A dictionary containing the overruns and underruns and the
+            bytes that were dropped or missing.
+        """
+        return {
+            "overruns": self.overruns,
+            "overrun_bytes": self.overrun_bytes,
+            "underruns": self.underruns,
+            "underrun_bytes": self.underrun_bytes,
+        }
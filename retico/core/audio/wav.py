@@ -0,0 +1,289 @@
+"""
+A module for reading and writing WAVE files.
+
+The WaveFile maps a PCM WAVE file into memory and returns views on its frames,
+so that audio can be read from a file without copying it.
+
+The BufferedWaveWriter copies incoming audio into pre-allocated blocks and
+writes full blocks to disk in a background thread. The header of the file is
+only written when the file is opened and fixed when it is closed, so writing
+audio never waits for the disk. Multiple tracks may be written into one file,
+each track being written to its own channels.
+"""
+
+import mmap
+import queue
+import struct
+import threading
+import wave
+
+import numpy as np
+
+from retico.core.audio.common import SAMPLE_DTYPES, as_byte_view
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WaveFile:
+    """A PCM WAVE file that is mapped into memory.
+
+    The RIFF chunks of the file are parsed directly, so that only the "fmt "
+    and the "data" chunk are needed and other chunks are skipped. If the size
+    of the data chunk is larger than the file (e.g. because the file was not
+    closed properly by its writer), the data is read until the end of the file.
+
+    Views returned by `frames` keep the mapping alive. The mapping is closed by
+    `close` only if no views are left, otherwise it is closed as soon as the
+    last view is garbage collected.
+
+    Attributes:
+        filename (str): The path of the file.
+        rate (int): The sample rate of the file.
+        sample_width (int): The sample width of the file.
+        channels (int): The number of channels of the file.
+        nframes (int): The number of frames of the file.
+        frame_width (int): The number of bytes of one frame.
+    """
+
+    def __init__(self, filename):
+        """Open and parse the WAVE file.
+
+        Args:
+            filename (str): The path of the file.
+
+        Raises:
+            ValueError: If the file is not a PCM WAVE file.
+        """
+        self.filename = filename
+        with open(filename, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except (ValueError, struct.error):
+            self._mmap.close()
+            raise
+
+    def _parse(self):
+        data = self._mmap
+        if len(data) < 12 or data[0:4] != b"RIFF" or data[8:12] != b"WAVE":
+            raise ValueError("%s is not a WAVE file" % self.filename)
+        fmt = None
+        data_chunk = None
+        pos = 12
+        while pos + 8 <= len(data) and data_chunk is None:
+            chunk_id = data[pos : pos + 4]
+            (size,) = struct.unpack_from("<I", data, pos + 4)
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack_from("<HHIIHH", data, pos + 8)
+                if fmt[0] == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                    (subformat,) = struct.unpack_from("<H", data, pos + 32)
+                    fmt = (subformat,) + fmt[1:]
+            elif chunk_id == b"data":
+                data_chunk = (pos + 8, min(size, len(data) - pos - 8))
+            pos += 8 + size + (size % 2)
+        if fmt is None or data_chunk is None:
+            raise ValueError("%s has no fmt or data chunk" % self.filename)
+        audio_format, channels, rate, _, block_align, bits = fmt
+        if audio_format != WAVE_FORMAT_PCM:
+            raise ValueError("%s does not contain PCM audio" % self.filename)
+        self.channels = channels
+        self.rate = rate
+        self.sample_width = bits // 8
+        self.frame_width = block_align
+        self.nframes = data_chunk[1] // block_align
+        offset = data_chunk[0]
+        self._data = memoryview(self._mmap)[
+            offset : offset + self.nframes * block_align
+        ]
+
+    def frames(self, start, count):
+        """Return a view on the given frames of the file without copying them.
+
+        Args:
+            start (int): The index of the first frame.
+            count (int): The number of frames. Fewer frames are returned at the
+                end of the file.
+
+        Returns:
+            memoryview: A read-only view on the frames.
+        """
+        return self._data[start * self.frame_width : (start + count) * self.frame_width]
+
+    def close(self):
+        """Close the mapping of the file if no views on it are left."""
+        try:
+            self._data.release()
+            self._mmap.close()
+        except BufferError:
+            pass
+        self._mmap = None
+
+
+class BufferedWaveWriter:
+    """A WAVE file writer that writes blocks of audio in a background thread.
+
+    The audio of each track is copied into blocks of [block_size] seconds. A
+    block is handed to the background thread as soon as every track has
+    written audio past its end, or if more than [max_blocks] blocks are
+    pending because one of the tracks stopped writing (the missing audio of
+    that track is written as silence). Audio that is written for a block that
+    was already handed to the background thread is dropped.
+
+    Written blocks are zeroed and reused, so that new blocks only have to be
+    allocated if the disk is slower than the audio.
+
+    Attributes:
+        filename (str): The path of the WAVE file.
+        rate (int): The sample rate of the file.
+        sample_width (int): The sample width of the file.
+        channels (int): The number of channels of each track.
+        tracks (int): The number of tracks in the file.
+        block_frames (int): The number of frames of one block.
+        max_blocks (int): The maximum number of pending blocks.
+        frames_written (int): The number of frames written to disk.
+        dropped_frames (int): The number of frames that arrived too late.
+        allocated_blocks (int): The number of blocks that were allocated.
+    """
+
+    def __init__(
+        self,
+        filename,
+        rate=44100,
+        sample_width=2,
+        channels=1,
+        tracks=1,
+        block_size=1.0,
+        max_blocks=4,
+    ):
+        """Open the file and start the background thread.
+
+        Args:
+            filename (str): The path of the WAVE file.
+            rate (int): The sample rate of the file.
+            sample_width (int): The sample width of the file.
+            channels (int): The number of channels of each track.
+            tracks (int): The number of tracks in the file.
+            block_size (float): The length of one block in seconds.
+            max_blocks (int): The maximum number of blocks that are kept while
+                waiting for a track that is behind.
+        """
+        self.filename = filename
+        self.rate = rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.tracks = tracks
+        self.block_frames = max(1, int(rate * block_size))
+        self.max_blocks = max(1, max_blocks)
+        self.frames_written = 0
+        self.dropped_frames = 0
+        self.allocated_blocks = 0
+
+        self._dtype = SAMPLE_DTYPES[sample_width]
+        self._mutex = threading.Lock()
+        self._pool = queue.Queue()
+        self._pending = []
+        self._first_block = 0
+        self._track_frames = [0] * tracks
+        self._closed = False
+        for _ in range(2):
+            self._pool.put(self._allocate())
+
+        self._wavfile = wave.open(filename, "wb")
+        self._wavfile.setframerate(rate)
+        self._wavfile.setnchannels(channels * tracks)
+        self._wavfile.setsampwidth(sample_width)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def _allocate(self):
+        self.allocated_blocks += 1
+        block = np.zeros(
+            (self.block_frames, self.channels * self.tracks), dtype=self._dtype
+        )
+        if self.sample_width == 1:
+            block += 128
+        return block
+
+    def _get_block(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._allocate()
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            block, nframes = item
+            self._wavfile.writeframesraw(as_byte_view(block[:nframes]))
+            self.frames_written += nframes
+            block.fill(128 if self.sample_width == 1 else 0)
+            self._pool.put(block)
+
+    def _release_blocks(self, final=False):
+        """Hand all complete blocks to the background thread. Has to be called
+        while holding the mutex."""
+        while self._pending:
+            block_end = (self._first_block + 1) * self.block_frames
+            complete = min(self._track_frames) >= block_end
+            if not (complete or final or len(self._pending) > self.max_blocks):
+                break
+            nframes = self.block_frames
+            if final and len(self._pending) == 1:
+                nframes = max(self._track_frames) - block_end + self.block_frames
+                nframes = min(max(nframes, 0), self.block_frames)
+            self._queue.put((self._pending.pop(0), nframes))
+            self._first_block += 1
+
+    def write(self, raw_audio, track=0, position=None):
+        """Copy audio of one track into the buffer.
+
+        Args:
+            raw_audio: An object supporting the buffer protocol containing PCM
+                audio with the sample width and channels of the file.
+            track (int): The index of the track.
+            position (int): The index of the first frame of the audio inside the
+                track. If None, the audio is written directly after the audio
+                that was previously written to the track.
+        """
+        samples = np.frombuffer(as_byte_view(raw_audio), dtype=self._dtype)
+        samples = samples.reshape(-1, self.channels)
+        first_channel = track * self.channels
+        with self._mutex:
+            if self._closed:
+                return
+            pos = self._track_frames[track] if position is None else position
+            first_frame = self._first_block * self.block_frames
+            if pos < first_frame:
+                dropped = min(first_frame - pos, len(samples))
+                self.dropped_frames += dropped
+                samples = samples[dropped:]
+                pos += dropped
+            written = 0
+            while written < len(samples):
+                index = pos // self.block_frames - self._first_block
+                while len(self._pending) <= index:
+                    self._pending.append(self._get_block())
+                offset = pos % self.block_frames
+                n = min(self.block_frames - offset, len(samples) - written)
+                self._pending[index][
+                    offset : offset + n, first_channel : first_channel + self.channels
+                ] = samples[written : written + n]
+                written += n
+                pos += n
+            self._track_frames[track] = max(self._track_frames[track], pos)
+            self._release_blocks()
+
+    def close(self):
+        """Write all remaining audio, fix the header and close the file."""
+        with self._mutex:
+            if self._closed:
+                return
+            self._closed = True
+            self._release_blocks(final=True)
+        self._queue.put(None)
+        self._thread.join()
+        self._wavfile.close()
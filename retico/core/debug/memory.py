@@ -0,0 +1,286 @@
+"""
+A module for accounting the memory that is held by incremental units.
+
+The IUMemoryTracker is opt-in. Once it is enabled, every IU that is created is
+registered with the tracker (only weakly, so the tracker does not keep any IU
+alive). The tracker can then count the IUs that are still alive per type and
+creator, estimate the bytes they hold in their payload and meta data and find
+IUs that are reachable from the state of modules and are older than a given
+threshold. Snapshots may be written periodically into a file so that memory
+leaks can be found during long running simulations.
+
+Usage:
+    tracker = IUMemoryTracker()
+    tracker.enable()
+    tracker.start("iu_memory.jsonl", interval=10, modules=modules, max_age=60)
+    ...
+    tracker.stop()
+    tracker.disable()
+"""
+
+import collections
+import json
+import queue
+import sys
+import threading
+import time
+import weakref
+
+from retico.core import abstract
+
+
+def estimate_size(obj, seen=None):
+    """Estimate the number of bytes held by an object.
+
+    Buffers (bytes, bytearrays, memoryviews and arrays) are counted by their
+    number of bytes. Dicts, lists, tuples and sets are traversed. Objects whose
+    id is in the seen set are not counted again, so that buffers that are
+    shared between multiple IUs are only counted once.
+
+    Args:
+        obj: The object to estimate the size of.
+        seen (set): A set of ids of objects that were already counted.
+
+    Returns:
+        int: The estimated number of bytes held by the object.
+    """
+    if seen is None:
+        seen = set()
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, memoryview):
+        return obj.nbytes
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(
+            estimate_size(v, seen) for v in obj.values()
+        )
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_size(v, seen) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def iu_size(iu, seen=None):
+    """Estimate the number of bytes held by the payload and the meta data of an
+    IU.
+
+    Args:
+        iu (IncrementalUnit): The IU to estimate the size of.
+        seen (set): A set of ids of objects that were already counted.
+
+    Returns:
+        int: The estimated number of bytes held by the IU.
+    """
+    if seen is None:
+        seen = set()
+    size = estimate_size(iu.payload, seen)
+    size += estimate_size(getattr(iu, "raw_audio", None), seen)
+    size += estimate_size(iu.meta_data, seen)
+    return size
+
+
+class IUMemoryTracker:
+    """A tracker that keeps weak references to all IUs created while it is
+    enabled.
+
+    Attributes:
+        total_created (int): The number of IUs that were registered.
+    """
+
+    MAX_SEARCH_DEPTH = 8
+    """The maximum depth of nested containers that are searched for IUs inside
+    the state of a module."""
+
+    def __init__(self):
+        self._ius = weakref.WeakSet()
+        self._mutex = threading.Lock()
+        self.total_created = 0
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def enable(self):
+        """Register the tracker so that every new IU is tracked."""
+        abstract.IncrementalUnit.tracker = self
+
+    def disable(self):
+        """Unregister the tracker. IUs that were already tracked stay tracked
+        until they are garbage collected."""
+        if abstract.IncrementalUnit.tracker is self:
+            abstract.IncrementalUnit.tracker = None
+
+    def register(self, iu):
+        """Track the given IU.
+
+        Args:
+            iu (IncrementalUnit): The IU to track.
+        """
+        with self._mutex:
+            self._ius.add(iu)
+            self.total_created += 1
+
+    def live_ius(self):
+        """Return a list of all tracked IUs that are still alive.
+
+        Returns:
+            list: A list of IUs.
+        """
+        with self._mutex:
+            return list(self._ius)
+
+    def snapshot(self, modules=None, max_age=None):
+        """Create a snapshot of the live IUs.
+
+        The bytes of buffers that are shared between multiple IUs are only
+        attributed to the first IU they are found in.
+
+        Args:
+            modules (list): An optional list of modules that are searched for
+                stale IUs.
+            max_age (float): The age in seconds after which an IU that is
+                reachable from a module counts as stale.
+
+        Returns:
+            dict: A dictionary containing the time of the snapshot, the number
+            of live and created IUs, the total estimated bytes and the count and
+            bytes per type and per creator of the IUs. If modules and max_age
+            are given it also contains the stale IUs.
+        """
+        ius = self.live_ius()
+        seen = set()
+        per_type = collections.defaultdict(lambda: {"count": 0, "bytes": 0})
+        per_creator = collections.defaultdict(lambda: {"count": 0, "bytes": 0})
+        total_bytes = 0
+        for iu in ius:
+            size = iu_size(iu, seen)
+            total_bytes += size
+            for key, stats in (
+                (iu.__class__.__name__, per_type),
+                (str(iu.creator), per_creator),
+            ):
+                stats[key]["count"] += 1
+                stats[key]["bytes"] += size
+        result = {
+            "time": time.time(),
+            "live": len(ius),
+            "created": self.total_created,
+            "bytes": total_bytes,
+            "per_type": dict(per_type),
+            "per_creator": dict(per_creator),
+        }
+        if modules is not None and max_age is not None:
+            result["stale"] = [
+                {
+                    "module": str(module),
+                    "path": path,
+                    "type": iu.__class__.__name__,
+                    "age": iu.age(),
+                }
+                for module, path, iu in self.find_stale(modules, max_age)
+            ]
+        return result
+
+    def find_stale(self, modules, max_age):
+        """Find IUs that are reachable from the state of the given modules and
+        that are older than max_age seconds.
+
+        The attributes of every module are searched recursively (including
+        lists, dicts, queues and the previous and grounded IUs of every IU that
+        is found). Other modules that are referenced are not searched.
+
+        Args:
+            modules (list): The modules to search.
+            max_age (float): The age in seconds after which an IU is stale.
+
+        Returns:
+            list: A list of tuples of the module, the path to the IU inside the
+            module (e.g. "audio_buffer[3].grounded_in") and the IU.
+        """
+        stale = []
+        for module in modules:
+            seen = set()
+            for name, value in vars(module).items():
+                self._search(module, name, value, max_age, seen, stale, 0)
+        return stale
+
+    def _search(self, module, path, obj, max_age, seen, stale, depth):
+        if obj is None or depth > self.MAX_SEARCH_DEPTH or id(obj) in seen:
+            return
+        if isinstance(obj, (str, bytes, bytearray, memoryview, int, float)):
+            return
+        if isinstance(obj, abstract.AbstractModule):
+            return
+        seen.add(id(obj))
+        if isinstance(obj, abstract.IncrementalUnit):
+            if obj.older_than(max_age):
+                stale.append((module, path, obj))
+            for attr in ("previous_iu", "grounded_in"):
+                self._search(
+                    module,
+                    "%s.%s" % (path, attr),
+                    getattr(obj, attr),
+                    max_age,
+                    seen,
+                    stale,
+                    depth + 1,
+                )
+            return
+        if isinstance(obj, abstract.UpdateMessage):
+            self._search(module, path, obj.iu, max_age, seen, stale, depth)
+            return
+        if isinstance(obj, queue.Queue):
+            obj = list(obj.queue)
+        if isinstance(obj, dict):
+            items = obj.items()
+        elif isinstance(obj, (list, tuple, set, frozenset, collections.deque)):
+            items = enumerate(list(obj))
+        else:
+            return
+        for key, value in items:
+            self._search(
+                module,
+                "%s[%r]" % (path, key),
+                value,
+                max_age,
+                seen,
+                stale,
+                depth + 1,
+            )
+
+    def _snapshot_loop(self, filename, interval, modules, max_age):
+        with open(filename, "a") as f:
+            while not self._stop_event.wait(interval):
+                f.write(json.dumps(self.snapshot(modules, max_age)))
+                f.write("\n")
+                f.flush()
+
+    def start(self, filename, interval=10.0, modules=None, max_age=None):
+        """Start writing snapshots periodically into a file.
+
+        Every snapshot is written as one line of JSON.
+
+        Args:
+            filename (str): The path of the file the snapshots are appended to.
+            interval (float): The time between two snapshots in seconds.
+            modules (list): An optional list of modules that are searched for
+                stale IUs.
+            max_age (float): The age in seconds after which an IU that is
+                reachable from a module counts as stale.
+        """
+        self.stop()
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._snapshot_loop, args=(filename, interval, modules, max_age)
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop writing snapshots."""
+        if self._thread:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
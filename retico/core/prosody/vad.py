@@ -0,0 +1,214 @@
+"""
+A module for voice activity detection on real audio.
+"""
+
+import numpy as np
+
+from retico.core import abstract
+from retico.core.audio import dsp
+from retico.core.audio.common import AudioIU
+from retico.core.prosody.common import EndOfTurnIU
+
+
+def frame_features(samples, frame_size):
+    """Compute the energy and the zero crossing rate of consecutive frames.
+
+    Args:
+        samples (numpy.ndarray): An array of float samples. Its length has to be
+            a multiple of frame_size.
+        frame_size (int): The number of samples of one frame.
+
+    Returns:
+        tuple: An array of the energy of each frame in dBFS and an array of the
+        zero crossing rate of each frame (the ratio of consecutive samples with
+        different signs).
+    """
+    frames = samples.reshape(-1, frame_size)
+    power = np.einsum("ij,ij->i", frames, frames) / frame_size
+    energy = 10 * np.log10(power + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_size
+    return energy, zcr
+
+
+class EnergyVADModule(abstract.AbstractModule):
+    """A module that detects whether an interlocutor is speaking based on the
+    energy and the zero crossing rate of the incoming audio.
+
+    The audio is split into frames of [frame_length] seconds. A frame counts as
+    speech if its energy is above the energy threshold and its zero crossing
+    rate is below the maximum zero crossing rate (which rejects broadband
+    noise). The interlocutor starts speaking after [onset] seconds of speech and
+    stops speaking after [hangover] seconds without speech. During the hangover,
+    the end-of-turn probability rises linearly from 0 to 1.
+
+    For every input IU, an EndOfTurnIU is produced. Like with the
+    SimulatedEoTModule, the probability is 1.0 only in the IU in which the end
+    of the turn was detected. The frames of silence spans are not analyzed, the
+    whole span counts as silence at once. Audio with multiple channels is mixed
+    down to mono before it is analyzed.
+
+    Attributes:
+        frame_length (float): The length of one analysis frame in seconds.
+        energy_threshold (float): The minimum energy of a speech frame in dBFS.
+        max_zcr (float): The maximum zero crossing rate of a speech frame.
+        onset (float): The duration of speech in seconds after which the
+            interlocutor counts as speaking.
+        hangover (float): The duration of silence in seconds after which the
+            turn of the interlocutor ends.
+        is_speaking (bool): Whether the interlocutor is currently speaking.
+        energy (float): The energy of the last frame in dBFS.
+        zcr (float): The zero crossing rate of the last frame.
+    """
+
+    @staticmethod
+    def name():
+        return "Energy VAD Module"
+
+    @staticmethod
+    def description():
+        return (
+            "A module that detects speech and the end of turns based on the "
+            "energy of audio."
+        )
+
+    @staticmethod
+    def input_ius():
+        return [AudioIU]
+
+    @staticmethod
+    def output_iu():
+        return EndOfTurnIU
+
+    def __init__(
+        self,
+        frame_length=0.02,
+        energy_threshold=-40.0,
+        max_zcr=0.5,
+        onset=0.06,
+        hangover=0.5,
+        **kwargs
+    ):
+        """Initialize the energy VAD module.
+
+        Args:
+            frame_length (float): The length of one analysis frame in seconds.
+            energy_threshold (float): The minimum energy of a speech frame in
+                dBFS.
+            max_zcr (float): The maximum zero crossing rate of a speech frame.
+            onset (float): The duration of speech in seconds after which the
+                interlocutor counts as speaking.
+            hangover (float): The duration of silence in seconds after which the
+                turn of the interlocutor ends.
+        """
+        super().__init__(**kwargs)
+        self.frame_length = frame_length
+        self.energy_threshold = energy_threshold
+        self.max_zcr = max_zcr
+        self.onset = onset
+        self.hangover = hangover
+        self.is_speaking = False
+        self.energy = None
+        self.zcr = None
+        self._reset_state()
+
+    def _reset_state(self):
+        self._rest = np.zeros(0, dtype=np.float32)
+        self._rate = None
+        self._speech_time = 0.0
+        self._silence_time = 0.0
+        self.is_speaking = False
+
+    def _process_frames(self, is_speech, frame_duration):
+        """Update the speaking state with the given frames and return whether
+        the turn ended."""
+        ended = False
+        for speech in is_speech:
+            if speech:
+                self._speech_time += frame_duration
+                self._silence_time = 0.0
+                if not self.is_speaking and self._speech_time >= self.onset:
+                    self.is_speaking = True
+            else:
+                self._speech_time = 0.0
+                if self.is_speaking:
+                    self._silence_time += frame_duration
+                    if self._silence_time >= self.hangover:
+                        self.is_speaking = False
+                        ended = True
+        return ended
+
+    def _process_samples(self, samples, frame_size, frame_duration):
+        samples = np.concatenate((self._rest, samples))
+        usable = len(samples) - len(samples) % frame_size
+        self._rest = samples[usable:]
+        if not usable:
+            return False
+        energy, zcr = frame_features(samples[:usable], frame_size)
+        self.energy = float(energy[-1])
+        self.zcr = float(zcr[-1])
+        is_speech = (energy >= self.energy_threshold) & (zcr <= self.max_zcr)
+        return self._process_frames(is_speech, frame_duration)
+
+    def _process_silence(self, nframes, frame_size, frame_duration):
+        """Process a silence span without computing the features of each of its
+        frames. Only the frame that completes the rest of the previous IU is
+        analyzed."""
+        ended = False
+        if len(self._rest):
+            fill = min(frame_size - len(self._rest), nframes)
+            silence = np.zeros(fill, dtype=np.float32)
+            ended = self._process_samples(silence, frame_size, frame_duration)
+            nframes -= fill
+            if not nframes:
+                # The span did not complete the frame and is part of the rest
+                return ended
+        count = nframes // frame_size
+        self._rest = np.zeros(nframes % frame_size, dtype=np.float32)
+        if count:
+            self.energy, self.zcr = 10 * np.log10(1e-10), 0.0
+            self._speech_time = 0.0
+            if self.is_speaking:
+                # The turn ends in the first frame that completes the hangover
+                missing = self.hangover - self._silence_time
+                count = min(count, max(1, int(np.ceil(missing / frame_duration))))
+                self._silence_time += count * frame_duration
+                if self._silence_time >= self.hangover:
+                    self.is_speaking = False
+                    ended = True
+        return ended
+
+    def process_iu(self, input_iu):
+        if input_iu.rate != self._rate:
+            self._rest = np.zeros(0, dtype=np.float32)
+            self._rate = input_iu.rate
+        frame_size = max(1, int(self._rate * self.frame_length))
+        frame_duration = frame_size / self._rate
+        if input_iu.is_silence:
+            ended = self._process_silence(
+                input_iu.nframes, frame_size, frame_duration
+            )
+        else:
+            samples = dsp.to_float(input_iu.raw_audio, input_iu.sample_width)
+            if input_iu.channels > 1:
+                samples = samples.reshape(-1, input_iu.channels).mean(axis=1)
+            ended = self._process_samples(samples, frame_size, frame_duration)
+
+        if ended:
+            probability = 1.0
+        elif self.is_speaking and self.hangover > 0:
+            probability = min(self._silence_time / self.hangover, 0.99)
+        else:
+            probability = 0.0
+        output_iu = self.create_iu(input_iu)
+        output_iu.set_eot(probability, self.is_speaking)
+        return output_iu
+
+    def reset(self):
+        super().reset()
+        self._reset_state()
+        self.energy = None
+        self.zcr = None
+
+    def shutdown(self):
+        self._reset_state()
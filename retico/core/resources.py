@@ -0,0 +1,60 @@
+"""
+A module that provides a process wide cache for read-only resources.
+
+Modules like the SimulatedNLGModule or the dialogue manager modules load large
+resources (corpora, n-gram models, agenda files) during their setup. When many
+copies of the same network are run in one process, these resources only have to
+be loaded once and can be shared between all copies, as long as they are not
+modified by the modules using them.
+"""
+
+import threading
+
+_resources = {}
+_resource_locks = {}
+_mutex = threading.Lock()
+
+
+def shared_resource(key, factory):
+    """Return the resource that is stored under the given key.
+
+    If the resource was not yet loaded, the factory function is called to
+    create it. The factory is only called once per key, even if multiple
+    threads request the same resource at the same time. Resources with
+    different keys may be loaded in parallel.
+
+    The returned resource is shared with every other caller using the same key
+    and thus should never be modified.
+
+    Args:
+        key (hashable): A unique key for the resource (e.g. a tuple of the
+            resource type and the path of the file it is loaded from).
+        factory (function): A function without arguments that creates the
+            resource.
+
+    Returns:
+        object: The shared resource.
+    """
+    with _mutex:
+        if key in _resources:
+            return _resources[key]
+        lock = _resource_locks.setdefault(key, threading.Lock())
+    with lock:
+        with _mutex:
+            if key in _resources:
+                return _resources[key]
+        resource = factory()
+        with _mutex:
+            _resources[key] = resource
+            _resource_locks.pop(key, None)
+        return resource
+
+
+def clear_resources():
+    """Remove all resources from the cache.
+
+    Modules that already hold a reference to a resource keep using it, but new
+    requests will load the resource again.
+    """
+    with _mutex:
+        _resources.clear()
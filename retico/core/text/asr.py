@@ -68,16 +68,22 @@ class IncrementalizeASRModule(abstract.AbstractModule):
         self.last_ius = []
         self.threshold = threshold
 
+    def reset(self):
+        super().reset()
+        self.last_ius = []
+
     def get_increment(self, new_text):
         """Compares the full text given by the asr with the IUs that are already
         produced and returns only the increment from the last update. It revokes all
         previously produced IUs that do not match."""
+        kept_ius = []
         for iu in self.last_ius:
             if new_text.startswith(iu.text):
                 new_text = new_text[len(iu.text) :]
+                kept_ius.append(iu)
             else:
-                iu.revoked = True
-        self.last_ius = [iu for iu in self.last_ius if not iu.revoked]
+                self.revoke(iu)
+        self.last_ius = kept_ius
         return new_text
 
     def process_iu(self, input_iu):
@@ -103,7 +109,9 @@ class IncrementalizeASRModule(abstract.AbstractModule):
 
         if output_iu.final:
             self.last_ius = []
-            output_iu.committed = True
+            self.append(output_iu)
+            self.commit(output_iu)
+            return None
 
         return output_iu
 
@@ -34,3 +34,12 @@ class AbstractDialogueManager():
             dictionary containing all concepts in the form of key-value-pairs.
         """
         raise NotImplementedError
+
+    def reset(self):
+        """Reset the state of the dialogue manager to the beginning of a new
+        dialogue.
+
+        Resources that were loaded by the dialogue manager (like models or
+        agenda files) are kept.
+        """
+        raise NotImplementedError
@@ -35,6 +35,7 @@ import configparser
 import collections
 import random
 
+from retico.core.resources import shared_resource
 from retico.dialogue.common import AbstractDialogueManager
 
 
@@ -88,8 +89,9 @@ class Agenda:
         Args:
             agendafile (str): Path to the ini-file to load.
         """
-        self.config = configparser.ConfigParser(allow_no_value=True)
-        self.config.read(agendafile)
+        self.config = shared_resource(
+            ("agenda", agendafile), lambda: self.read_config(agendafile)
+        )
         if not self.config:
             raise FileNotFoundError("Could not find '%s' or it is empty!")
 
@@ -116,6 +118,30 @@ class Agenda:
                         self.agenda[section].append(f)
                         self.fields[field_name] = f
 
+    @staticmethod
+    def read_config(agendafile):
+        """Read the ini-file of an agenda.
+
+        The returned config is shared between all agendas created from the same
+        file and is thus only read and never modified.
+
+        Args:
+            agendafile (str): Path to the ini-file to load.
+
+        Returns:
+            configparser.ConfigParser: The parsed ini-file.
+        """
+        config = configparser.ConfigParser(allow_no_value=True)
+        config.read(agendafile)
+        return config
+
+    def reset(self):
+        """Resets the mentioned and confirmed flags of all fields of the
+        agenda."""
+        for field in self.fields.values():
+            field.mentioned = False
+            field.confirmed = False
+
     def print_agenda(self):
         """
         Prints the current agenda with all sections fields and their status.
@@ -435,7 +461,9 @@ class AgendaDialogueManager(AbstractDialogueManager):
     a given incoming dialogue act."""
 
     def __init__(self, aa_file, agenda_file, starts_dialogue=True):
-        self.act_guider = ActGuider(aa_file)
+        self.act_guider = shared_resource(
+            ("act_guider", aa_file), lambda: ActGuider(aa_file)
+        )
         self.agenda = Agenda(agenda_file)
         self.stack = []
         self.starts_dialogue = starts_dialogue
@@ -444,6 +472,14 @@ class AgendaDialogueManager(AbstractDialogueManager):
         self.provided_entities = None
         self.thanked = False
 
+    def reset(self):
+        self.agenda.reset()
+        self.stack = []
+        self.dialogue_started = False
+        self.dialogue_finished = False
+        self.provided_entities = None
+        self.thanked = False
+
     def create_next_act(self):
         """
         Creates the next dialogue act. This dialogue act may not conform to a
@@ -22,6 +22,11 @@ class ConvSimDialogueManager(AbstractDialogueManager):
         message.MessageData.init_message_data(self.conv_folder)
         self.agent = self.agent_class(self.agenda_file, play_audio=False)
 
+    def reset(self):
+        # The state of a ConvSim agent can not be reset, so a new agent is
+        # created. The message data is kept.
+        self.agent = self.agent_class(self.agenda_file, play_audio=False)
+
     def process_act(self, act, concepts):
         d = "%s:%s" % (act, ",".join(concepts.keys()))
         msg_data = message.MessageData(message.MessageData.NO_DATA, d)
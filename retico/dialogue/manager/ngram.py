@@ -5,16 +5,22 @@ A simple n-gram dialogue manager
 import pickle
 import random
 
+from retico.core.resources import shared_resource
 from retico.dialogue.common import AbstractDialogueManager
 
 N = 5
 
 
+def _load_model(model_file):
+    with open(model_file, "rb") as f:
+        return pickle.load(f)
+
+
 class NGramDialogueManager(AbstractDialogueManager):
     """A simple n-gram dialogue manager."""
 
     def __init__(self, model_file, name):
-        thing = pickle.load(open(model_file, "rb"))
+        thing = shared_resource(("ngram", model_file), lambda: _load_model(model_file))
         self.map = thing["%s_map" % name]
         self.name = name
         if self.name == "caller":
@@ -24,6 +30,10 @@ class NGramDialogueManager(AbstractDialogueManager):
         self.dialogue_finished = False
         self.dialogue_log = []
 
+    def reset(self):
+        self.dialogue_finished = False
+        self.dialogue_log = []
+
     def process_act(self, act, concepts):
         if concepts.keys():
             act_str = "%s:%s" % (act, ",".join(concepts.keys()))
@@ -85,6 +85,10 @@ class RasaDialogueManager(AbstractDialogueManager):
         self.acts = []
         self.dialogue_started = False
 
+    def reset(self):
+        self.acts = []
+        self.dialogue_started = False
+
     def process_act(self, act, concepts):
         # if act == "stalling":
         #     return
@@ -1,9 +1,28 @@
 """A Module that allows for saving and loading networks from and to file."""
 
 import sys
+import copy
 import pickle
 
 
+def load_template(filename: str):
+    """Loads the description of a network from file without creating any
+    module.
+
+    The template can be used to create multiple independent copies of the same
+    network with the `build` function.
+
+    Args:
+        filename (str): The path to the .rtc file containing a network.
+
+    Returns:
+        list: A list containing the module descriptions and the connections
+            between the modules.
+    """
+    with open(filename, "rb") as f:
+        return pickle.load(f)
+
+
 def load(filename: str):
     """Loads a network from file and returns a list of modules in that network.
 
@@ -16,13 +35,34 @@ def load(filename: str):
         (list, list): A list of Modules that are connected and ready to be run
             and a list of connections between those modules.
     """
-    mc_list = pickle.load(open(filename, "rb"))
+    return build(load_template(filename))
+
+
+def build(mc_list, args_hook=None):
+    """Creates the modules of a network template and connects them.
+
+    Every call creates new modules, so that the networks created from the same
+    template do not share any state.
+
+    Args:
+        mc_list (list): A network template as returned by `load_template`.
+        args_hook (function): An optional function that takes the class of a
+            module and a copy of its arguments and returns the arguments that
+            should be used to create the module.
+
+    Returns:
+        (list, list): A list of Modules that are connected and ready to be run
+            and a list of connections between those modules.
+    """
     module_dict = {}
     module_list = []
     connection_list = []
 
     for m in mc_list[0]:
-        mod = m["retico_class"](**m["args"])
+        args = copy.deepcopy(m["args"])
+        if args_hook:
+            args = args_hook(m["retico_class"], args)
+        mod = m["retico_class"](**args)
         module_dict[m["id"]] = mod
         module_list.append(mod)
     for ida, idb in mc_list[1]:
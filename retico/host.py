@@ -0,0 +1,291 @@
+"""
+A module that allows for hosting many independent copies of a network inside a
+single process.
+
+Every copy of the network is created from the same .rtc file but consists of its
+own modules, so that incremental units and events of one copy never reach
+another copy. Read-only resources that are loaded during the setup of the
+modules (like the SimulatioDB, n-gram models and agenda files) are loaded once
+and shared between all copies via `retico.core.resources`.
+
+Usage:
+    $ python -m retico.host save/simulation.rtc -n 100
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+from retico import headless
+from retico.core.audio.io import (
+    SpeakerModule,
+    StreamingSpeakerModule,
+    VirtualSpeakerModule,
+)
+
+
+class NetworkInstance:
+    """One copy of a network that is hosted by the MultiNetworkHost.
+
+    Attributes:
+        index (int): The index of the copy inside the host.
+        folder (str): The folder that all files of this copy are written to.
+        modules (list): The modules of this copy.
+        connections (list): The connections between the modules of this copy.
+        finished (bool): Whether the end event was called by this copy.
+        start_time (float): The UNIX timestamp of when the copy was started.
+        end_time (float): The UNIX timestamp of when the copy finished.
+    """
+
+    def __init__(self, index, folder, modules, connections):
+        self.index = index
+        self.folder = folder
+        self.modules = modules
+        self.connections = connections
+        self.finished = False
+        self.start_time = None
+        self.end_time = None
+        self.finished_event = threading.Event()
+
+    def end(self, module, event_name, data):
+        """Callback for the end event of the network.
+
+        Args:
+            module (AbstractModule): The module that called the event.
+            event_name (str): The name of the event.
+            data (dict): The data of the event.
+        """
+        if not self.finished:
+            self.finished = True
+            self.end_time = time.time()
+            self.finished_event.set()
+
+    def setup(self):
+        """Set up all modules of the copy."""
+        for module in self.modules:
+            module.setup()
+
+    def reset(self):
+        """Reset all modules of the copy so that it can be run again."""
+        for module in self.modules:
+            module.reset()
+        self.finished = False
+        self.start_time = None
+        self.end_time = None
+        self.finished_event.clear()
+
+    def run(self):
+        """Run all modules of the copy."""
+        self.start_time = time.time()
+        for module in self.modules:
+            module.run(run_setup=False)
+
+    def stop(self):
+        """Stop all modules of the copy."""
+        for module in self.modules:
+            module.stop()
+
+    def result(self):
+        """Return the result of this copy.
+
+        Returns:
+            dict: A dictionary containing the index, the folder, whether the
+            copy finished and the duration of the conversation in seconds.
+        """
+        duration = None
+        if self.start_time is not None:
+            end_time = self.end_time if self.end_time else time.time()
+            duration = end_time - self.start_time
+        return {
+            "instance": self.index,
+            "folder": self.folder,
+            "finished": self.finished,
+            "duration": duration,
+        }
+
+    def write_result(self):
+        """Write the result of this copy into its folder as result.json."""
+        with open(os.path.join(self.folder, "result.json"), "w") as f:
+            json.dump(self.result(), f, indent=2)
+
+
+class MultiNetworkHost:
+    """A host that instantiates many copies of a network template and runs
+    them concurrently inside the same process.
+
+    Arguments of modules that name a file (by default the argument "filename"
+    of recorder modules) are rewritten so that every copy writes into its own
+    folder inside the output folder.
+
+    Attributes:
+        filename (str): The path to the .rtc file containing the network.
+        num_instances (int): The number of copies of the network.
+        output_folder (str): The folder the copies write their files to.
+        end_event (str): The event that marks the end of a copy.
+        audio_output (bool): Whether speaker modules should be kept. If not,
+            they are replaced by virtual speakers.
+        file_args (list): The names of module arguments that contain a path
+            to a file that should be written per copy.
+        instances (list): The NetworkInstances of the host.
+    """
+
+    def __init__(
+        self,
+        filename,
+        num_instances,
+        output_folder="sims/multi_sims",
+        end_event="dialogue_end",
+        audio_output=False,
+        file_args=("filename",),
+    ):
+        self.filename = filename
+        self.num_instances = num_instances
+        self.output_folder = output_folder
+        self.end_event = end_event
+        self.audio_output = audio_output
+        self.file_args = list(file_args)
+        self.instances = []
+        self._template = headless.load_template(filename)
+
+    def _args_hook(self, folder):
+        def hook(retico_class, args):
+            for arg in self.file_args:
+                if isinstance(args.get(arg), str):
+                    args[arg] = os.path.join(folder, os.path.basename(args[arg]))
+            return args
+
+        return hook
+
+    def create_instance(self, index):
+        """Create a new copy of the network.
+
+        Args:
+            index (int): The index of the new copy.
+
+        Returns:
+            NetworkInstance: The new copy of the network.
+        """
+        folder = os.path.join(self.output_folder, "instance%d" % index)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        modules, connections = headless.build(
+            self._template, args_hook=self._args_hook(folder)
+        )
+        instance = NetworkInstance(index, folder, [], connections)
+        for module in modules:
+            if (
+                isinstance(module, (SpeakerModule, StreamingSpeakerModule))
+                and not self.audio_output
+            ):
+                module = VirtualSpeakerModule.from_speaker(module)
+            module.event_subscribe(self.end_event, instance.end)
+            instance.modules.append(module)
+        return instance
+
+    def setup(self):
+        """Create and set up all copies of the network.
+
+        Shared resources are only loaded by the first copy that needs them.
+        """
+        self.instances = [
+            self.create_instance(i) for i in range(self.num_instances)
+        ]
+        for instance in self.instances:
+            instance.setup()
+
+    def reset(self):
+        """Reset and set up all copies of the network so that they can be run
+        again. The modules and their loaded resources are reused."""
+        for instance in self.instances:
+            instance.reset()
+            instance.setup()
+
+    def run(self, timeout=None):
+        """Run all copies of the network until every copy has finished or the
+        timeout is reached.
+
+        Every copy is stopped as soon as it called the end event. The results of
+        each copy are written into their folder.
+
+        Args:
+            timeout (float): The maximum time in seconds the copies may run. If
+                None, the host waits until all copies have finished.
+
+        Returns:
+            list: A list of the results of all copies.
+        """
+        if not self.instances:
+            self.setup()
+        for instance in self.instances:
+            instance.run()
+        start = time.time()
+        running = list(self.instances)
+        while running:
+            for instance in list(running):
+                if instance.finished:
+                    instance.stop()
+                    running.remove(instance)
+            if timeout is not None and time.time() - start > timeout:
+                break
+            time.sleep(0.1)
+        for instance in running:
+            instance.stop()
+        results = []
+        for instance in self.instances:
+            instance.write_result()
+            results.append(instance.result())
+        return results
+
+
+def parse_arguments():
+    p = argparse.ArgumentParser(
+        description="Runs many copies of a network concurrently in one process."
+    )
+    p.add_argument("file", type=str, help="The file that should be loaded")
+    p.add_argument(
+        "-n",
+        "--num-instances",
+        type=int,
+        default=10,
+        help="Number of copies of the network that should be run",
+    )
+    p.add_argument(
+        "-e",
+        "--event",
+        type=str,
+        default="dialogue_end",
+        help="The event that should trigger the end of a copy",
+    )
+    p.add_argument(
+        "-o",
+        "--output-folder",
+        type=str,
+        default="sims/multi_sims",
+        help="The folder where the copies should save their files",
+    )
+    p.add_argument(
+        "-t",
+        "--timeout",
+        type=float,
+        default=None,
+        help="Maximum time in seconds the copies are allowed to run",
+    )
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    host = MultiNetworkHost(
+        arguments.file,
+        arguments.num_instances,
+        output_folder=arguments.output_folder,
+        end_event=arguments.event,
+    )
+    host.setup()
+    for r in host.run(timeout=arguments.timeout):
+        print(
+            "Instance %d: finished=%s duration=%s"
+            % (r["instance"], r["finished"], r["duration"])
+        )
@@ -52,11 +52,16 @@ class GoogleASRModule(abstract.AbstractModule):
         return SpeechRecognitionIU
 
     def process_iu(self, input_iu):
-        self.audio_buffer.put(input_iu.raw_audio)
+        self.audio_buffer.put(input_iu.audio_bytes())
         if not self.latest_input_iu:
             self.latest_input_iu = input_iu
         return None
 
+    def reset(self):
+        super().reset()
+        self.audio_buffer = queue.Queue()
+        self.latest_input_iu = None
+
     @staticmethod
     def _extract_results(response):
         predictions = []
@@ -112,9 +117,9 @@ class GoogleASRModule(abstract.AbstractModule):
                 output_iu = self.create_iu(self.latest_input_iu)
                 self.latest_input_iu = None
                 output_iu.set_asr_results(p, t, s, c, f)
-                if f:
-                    output_iu.committed = True
                 self.append(output_iu)
+                if f:
+                    self.commit(output_iu)
 
     def setup(self):
         self.client = gspeech.SpeechClient()
@@ -6,11 +6,10 @@ import json
 import os
 import subprocess
 import base64
-import random
-import wave
 from hashlib import blake2b
 
 from retico.core import abstract, text, audio
+from retico.core.audio import dsp
 
 # Helper functions ==============
 
@@ -32,12 +31,10 @@ class GoogleTTS:
     """
     A google TTS class that is able to return the audio as pcm.
 
-    This class relies on gcloud and ffmpeg to be installed and available.
+    This class relies on gcloud to be installed and available.
     """
 
     CACHING_DIR = "data/gtts_cache/"
-    TEMP_DIR = "/tmp"
-    TEMP_NAME = "tmp_tts_%s" % random.randint(1000,10000)
 
     def __init__(self, language_code="en-US", voice_name="en-US-Wavenet-A", speaking_rate=1.4, caching=True):
         """
@@ -56,8 +53,8 @@ class GoogleTTS:
         self._gcloud_token = None
         self.speaking_rate = speaking_rate
 
-        self.wav_sample_rate = 44100 # 44100 sample rate / See ffmpeg
-        self.wav_codec = "pcm_s16le" # 16-bit little endian codec / See ffmpeg
+        self.wav_sample_rate = 44100 # 44100 sample rate
+        self.wav_codec = "pcm_s16le" # 16-bit little endian codec
 
         # Create caching directory if it not already exists
         if not os.path.exists(self.CACHING_DIR):
@@ -116,8 +113,8 @@ class GoogleTTS:
             with open(cache_path, 'rb') as cfile:
                 wav_audio = cfile.read()
         else:
-            mp3_audio = self.google_tts_call(text)
-            wav_audio = self.convert_audio(mp3_audio)
+            linear_audio = self.google_tts_call(text)
+            wav_audio = self.convert_audio(linear_audio)
             with open(cache_path, 'wb') as cfile:
                 cfile.write(wav_audio)
 
@@ -125,11 +122,11 @@ class GoogleTTS:
 
     def google_tts_call(self, text):
         """
-        This method does a Google TTS call and returns the response (audio data in MP3 format) as bytes
+        This method does a Google TTS call and returns the response (audio data in WAVE format) as bytes
         Args:
             text (str): The string to be synthesized
 
-        Returns (bytes): Audio data in MP3 format as bytes.
+        Returns (bytes): Audio data in WAVE format (LINEAR16) as bytes.
 
         """
         request_data = {'input': {
@@ -140,8 +137,9 @@ class GoogleTTS:
                 'ssmlGender': self.ssml_gender},
             'audioConfig': {
                 'speakingRate': self.speaking_rate,
-                'audioEncoding': 'MP3'} # We always use MP3 audio encoding, because it is fast to download.
-        }                               # We convert that later on to the format we want
+                'sampleRateHertz': self.wav_sample_rate,
+                'audioEncoding': 'LINEAR16'} # Uncompressed PCM with a wave header, so no decoder
+        }                                    # is needed to convert it to the format we want
 
         json_data = json.dumps(request_data)
 
@@ -159,38 +157,16 @@ class GoogleTTS:
 
     def convert_audio(self, audio):
         """
-        Converts the given mp3 audio to the respecitve pcm data through ffmpeg.
-        This function assumes ffmpeg is installed and readily available.
+        Converts the given wave audio to the respecitve pcm data in-process.
 
         Args:
-            audio (bytes): The mp3 audio data as given by Google TTS
+            audio (bytes): The LINEAR16 wave audio data as given by Google TTS
 
         Returns (bytes): The pcm data as specified by wav_codec and wav_sample_rate. Note that this byte array does not
             contain the wave header (or any other header) but is just the raw audio data.
 
         """
-        tmp_mp3_name = self.TEMP_NAME + ".mp3"
-        tmp_wav_name = self.TEMP_NAME + ".wav"
-        tmp_mp3_path = os.path.join(self.TEMP_DIR, tmp_mp3_name)
-        tmp_wav_path = os.path.join(self.TEMP_DIR, tmp_wav_name)
-
-        with open(tmp_mp3_path, 'wb') as f:
-            f.write(audio)
-
-        subprocess.call(["ffmpeg", "-i", tmp_mp3_path, "-acodec", self.wav_codec, "-ar", str(self.wav_sample_rate), tmp_wav_path, "-y"],
-                        stdout=subprocess.DEVNULL,
-                        stderr=subprocess.DEVNULL)
-
-        wav_audio = None
-        with wave.open(tmp_wav_path, 'rb') as wav_file:
-            w_length = wav_file.getnframes()
-            wav_audio = wav_file.readframes(w_length)
-
-        # Cleanup
-        os.remove(tmp_mp3_path)
-        os.remove(tmp_wav_path)
-
-        return wav_audio
+        return dsp.convert_wav(audio, self.wav_sample_rate, 2)
 
 class GoogleTTSModule(abstract.AbstractModule):
     """A Google TTS Module that uses Googles TTS service to synthesize audio."""
@@ -1,25 +1,20 @@
 import http.client
 import os
-import subprocess
-import wave
 import urllib
-import random
 from hashlib import blake2b
 
 from retico.core import abstract, text, audio
+from retico.core.audio import dsp
 
 
 class MaryTTS:
     """
     A mary TTS class that is able to return the audio as pcm.
 
-    This class relies on a mary tts server rinning and ffmpeg to be installed
-    and available.
+    This class relies on a mary tts server rinning.
     """
 
     CACHING_DIR = "data/mtts_cache/"
-    TEMP_DIR = "/tmp"
-    TEMP_NAME = "tmp_tts_%s" % random.randint(1000, 10000)
 
     def __init__(
         self,
@@ -46,8 +41,8 @@ class MaryTTS:
         self.server_port = server_port
         self.caching = caching
 
-        self.wav_sample_rate = 44100  # 44100 sample rate / See ffmpeg
-        self.wav_codec = "pcm_s16le"  # 16-bit little endian codec / See ffmpeg
+        self.wav_sample_rate = 44100  # 44100 sample rate
+        self.wav_codec = "pcm_s16le"  # 16-bit little endian codec
 
         # Create caching directory if it not already exists
         if not os.path.exists(self.CACHING_DIR):
@@ -121,8 +116,7 @@ class MaryTTS:
 
     def convert_audio(self, audio):
         """
-        Converts the given wav audio to the respecitve pcm data through ffmpeg.
-        This function assumes ffmpeg is installed and readily available.
+        Converts the given wav audio to the respecitve pcm data in-process.
 
         Args:
             audio (bytes): The wav audio data as given by Mary TTS
@@ -131,40 +125,7 @@ class MaryTTS:
             contain the wave header (or any other header) but is just the raw audio data.
 
         """
-        tmp_mary_name = self.TEMP_NAME + "_mtts.wav"
-        tmp_wav_name = self.TEMP_NAME + ".wav"
-        tmp_mary_path = os.path.join(self.TEMP_DIR, tmp_mary_name)
-        tmp_wav_path = os.path.join(self.TEMP_DIR, tmp_wav_name)
-
-        with open(tmp_mary_path, "wb") as f:
-            f.write(audio)
-
-        subprocess.call(
-            [
-                "ffmpeg",
-                "-i",
-                tmp_mary_path,
-                "-acodec",
-                self.wav_codec,
-                "-ar",
-                str(self.wav_sample_rate),
-                tmp_wav_path,
-                "-y",
-            ],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
-
-        wav_audio = None
-        with wave.open(tmp_wav_path, "rb") as wav_file:
-            w_length = wav_file.getnframes()
-            wav_audio = wav_file.readframes(w_length)
-
-        # Cleanup
-        os.remove(tmp_mary_path)
-        os.remove(tmp_wav_path)
-
-        return wav_audio
+        return dsp.convert_wav(audio, self.wav_sample_rate, 2)
 
 
 class MaryTTSModule(abstract.AbstractModule):
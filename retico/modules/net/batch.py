@@ -0,0 +1,509 @@
+"""
+A module for applying network degradations to recorded audio files offline.
+
+The audio of a WAVE file (e.g. recorded by the AudioRecorderModule) is split
+into packets of a fixed length that are all degraded at once by a chain of
+degradations (see `Degradation.degrade_batch`), without playing the audio in
+real time. The degraded audio is written into a new WAVE file and the delay,
+loss and other meta data of every packet into a CSV file. Multiple files are
+processed in parallel.
+
+The packets are written at their original position, so the delay of a packet
+does not shift the audio. If a playout delay is given, packets that are
+released later than the playout delay after they were sent are treated as
+lost (like by a receiver with a fixed jitter buffer). Lost and dropped packets
+are silent unless a degradation concealed them.
+
+A degradation chain is given as a list of specifications of the form
+"name:argument=value,argument=value", for example:
+
+    $ python -m retico.modules.net.batch recordings/ -o degraded/ \\
+        -d "link:bandwidth=256000,buffer_size=4000" \\
+        -d "delay:delay=0.1,jitter=0.02,seed=1" \\
+        -d "packetloss:ppl=0.05,burstr=2,concealment=lpc,seed=1" -p 0.2
+
+Usage:
+    chain = parse_chain(["delay:delay=0.1", "packetloss:ppl=0.1,burstr=2"])
+    degrade_files(["a.wav", "b.wav"], "degraded", chain)
+"""
+
+import argparse
+import csv
+import glob
+import multiprocessing
+import os
+import wave
+
+import numpy as np
+
+from retico.core.audio.common import DispatchedAudioIU, SAMPLE_DTYPES, as_byte_view
+from retico.core.audio.wav import WaveFile
+from retico.modules.net.degradations import (
+    Codec,
+    Delay,
+    Link,
+    PacketLoss,
+    TraceDegradation,
+    load_trace,
+)
+
+DEGRADATIONS = {
+    "delay": Delay,
+    "packetloss": PacketLoss,
+    "codec": Codec,
+    "link": Link,
+    "trace": TraceDegradation,
+}
+"""The degradations that may be used in a chain, by the name used in their
+specification."""
+
+
+class PacketBatch:
+    """The packets of an audio file that are degraded together.
+
+    Attributes:
+        rate (int): The sample rate of the audio.
+        sample_width (int): The sample width of the audio.
+        channels (int): The number of channels of the audio.
+        chunk_size (int): The number of frames of each packet.
+        nframes (int): The number of frames of the audio without the padding of
+            the last packet.
+        samples (numpy.ndarray): The samples of each packet (one packet per
+            row, the channels are interleaved).
+        send_times (numpy.ndarray): The time each packet was sent in seconds.
+        release_times (numpy.ndarray): The time each packet is released in
+            seconds or NaN if it is released when it is sent.
+        dropped (numpy.ndarray): Whether each packet was dropped.
+        meta (dict): The meta data of the packets by name. Each value is a list
+            or an array with one entry per packet.
+    """
+
+    def __init__(self, raw_audio, rate, sample_width, channels, chunk_size):
+        """Split the audio into packets.
+
+        Args:
+            raw_audio: An object supporting the buffer protocol containing PCM
+                audio.
+            rate (int): The sample rate of the audio.
+            sample_width (int): The sample width of the audio.
+            channels (int): The number of channels of the audio.
+            chunk_size (int): The number of frames of each packet.
+        """
+        self.rate = rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.chunk_size = chunk_size
+        data = np.frombuffer(as_byte_view(raw_audio), dtype=SAMPLE_DTYPES[sample_width])
+        self.nframes = len(data) // channels
+        npackets = -(-self.nframes // chunk_size)
+        self.samples = np.zeros((npackets, chunk_size * channels), data.dtype)
+        self.samples.ravel()[: len(data)] = data
+        self.send_times = np.arange(npackets) * (chunk_size / rate)
+        self.release_times = np.full(npackets, np.nan)
+        self.dropped = np.zeros(npackets, dtype=bool)
+        self.meta = {}
+
+    def __len__(self):
+        return len(self.samples)
+
+    def release_time(self, index):
+        """Return the release time of a packet.
+
+        Args:
+            index (int): The index of the packet.
+
+        Returns:
+            float: The release time in seconds or None if the packet is
+            released when it is sent.
+        """
+        release_at = self.release_times[index]
+        return None if np.isnan(release_at) else float(release_at)
+
+    def set_meta(self, key, values):
+        """Set the meta data of all packets.
+
+        Args:
+            key (str): The name of the meta data.
+            values: A list or an array with one value per packet.
+        """
+        self.meta[key] = values
+
+    def mark_lost(self, lost):
+        """Mark packets as lost in the meta data "packet-loss". Packets that
+        were marked as lost by a previous degradation stay lost.
+
+        Args:
+            lost (numpy.ndarray): A boolean array that is True for every packet
+                that was lost.
+        """
+        previous = self.meta.get("packet-loss")
+        if previous is not None:
+            lost = lost | np.array(previous, dtype=bool)
+        self.set_meta("packet-loss", lost)
+
+    def silence(self, packets):
+        """Replace the audio of packets with silence.
+
+        Args:
+            packets: The index of a packet, an array of indices or a boolean
+                mask of the packets.
+        """
+        self.samples[packets] = 128 if self.sample_width == 1 else 0
+
+    def packet_iu(self, index):
+        """Create an IU containing a packet.
+
+        Args:
+            index (int): The index of the packet.
+
+        Returns:
+            DispatchedAudioIU: An IU with the audio of the packet that was
+            created at the send time of the packet.
+        """
+        iu = DispatchedAudioIU()
+        iu.set_audio(
+            self.samples[index],
+            self.chunk_size,
+            self.rate,
+            self.sample_width,
+            self.channels,
+        )
+        iu.created_at = self.send_times[index]
+        iu.sample_offset = index * self.chunk_size
+        return iu
+
+    def update(self, index, iu, release_at):
+        """Store the result of degrading the IU of a packet.
+
+        Args:
+            index (int): The index of the packet.
+            iu (DispatchedAudioIU): The degraded IU.
+            release_at (float): The release time returned by the degradation.
+        """
+        self.samples[index] = np.frombuffer(iu.audio_view(), dtype=self.samples.dtype)
+        for key, value in iu.meta_data.items():
+            self.meta.setdefault(key, [None] * len(self))[index] = value
+        if release_at == np.inf:
+            self.dropped[index] = True
+        elif release_at is not None:
+            self.release_times[index] = release_at
+
+    def audio(self):
+        """Return the audio of all packets without the padding of the last
+        packet.
+
+        Returns:
+            numpy.ndarray: The interleaved samples.
+        """
+        return self.samples.ravel()[: self.nframes * self.channels]
+
+
+def parse_value(value):
+    """Convert an argument of a degradation specification into a Python value.
+
+    Args:
+        value (str): The value of the argument.
+
+    Returns:
+        The value as bool, None, int, float or str.
+    """
+    lowered = value.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if lowered == "none":
+        return None
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+
+def parse_chain(specifications):
+    """Parse the specifications of a degradation chain.
+
+    Args:
+        specifications (list): A list of strings of the form
+            "name:argument=value,argument=value".
+
+    Returns:
+        list: A list of tuples of the name and the keyword arguments of each
+        degradation.
+
+    Raises:
+        ValueError: If a degradation is unknown.
+    """
+    chain = []
+    for specification in specifications:
+        name, _, arguments = specification.partition(":")
+        name = name.strip().lower()
+        if name not in DEGRADATIONS:
+            raise ValueError("Unknown degradation %s" % name)
+        kwargs = {}
+        for argument in filter(None, arguments.split(",")):
+            key, _, value = argument.partition("=")
+            kwargs[key.strip()] = parse_value(value.strip())
+        chain.append((name, kwargs))
+    return chain
+
+
+def create_chain(chain, seed_offset=0):
+    """Create the degradations of a chain.
+
+    Args:
+        chain (list): The chain as returned by `parse_chain`.
+        seed_offset (int): A number that is added to the seeds of the
+            degradations, so that every file gets different random numbers.
+
+    Returns:
+        list: A list of degradations.
+    """
+    degradations = []
+    for name, kwargs in chain:
+        kwargs = dict(kwargs)
+        if kwargs.get("seed") is not None:
+            kwargs["seed"] += seed_offset
+        if name == "trace":
+            kwargs["trace"] = load_trace(kwargs["trace"])
+        degradations.append(DEGRADATIONS[name](**kwargs))
+    return degradations
+
+
+def write_metadata(batch, path, playout_delay=None):
+    """Write the meta data of every packet into a CSV file.
+
+    Args:
+        batch (PacketBatch): The degraded packets.
+        path (str): The path of the CSV file.
+        playout_delay (float): The playout delay that was applied or None.
+    """
+    transit = np.where(
+        np.isnan(batch.release_times), 0.0, batch.release_times - batch.send_times
+    )
+    keys = sorted(batch.meta)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["packet", "send_time", "transit", "dropped", "late"] + keys)
+        for index in range(len(batch)):
+            late = playout_delay is not None and transit[index] > playout_delay
+            writer.writerow(
+                [
+                    index,
+                    "%.6f" % batch.send_times[index],
+                    "%.6f" % transit[index],
+                    int(batch.dropped[index]),
+                    int(late),
+                ]
+                + [_csv_value(batch.meta[key][index]) for key in keys]
+            )
+
+
+def _csv_value(value):
+    if isinstance(value, (bool, np.bool_)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return "%.6f" % value
+    return "" if value is None else value
+
+
+def degrade_file(
+    path,
+    output_path,
+    degradations,
+    packet_length=0.02,
+    playout_delay=None,
+    metadata_path=None,
+):
+    """Apply a chain of degradations to a WAVE file.
+
+    Args:
+        path (str): The path of the WAVE file.
+        output_path (str): The path of the degraded WAVE file.
+        degradations (list): The degradations that are applied in order.
+        packet_length (float): The length of each packet in seconds.
+        playout_delay (float): The time in seconds after which a packet that
+            was not released counts as lost or None to keep all packets.
+        metadata_path (str): The path of the CSV file of the meta data of the
+            packets or None to not write the meta data.
+
+    Returns:
+        PacketBatch: The degraded packets.
+    """
+    wav = WaveFile(path)
+    try:
+        chunk_size = max(1, int(round(packet_length * wav.rate)))
+        batch = PacketBatch(
+            wav.frames(0, wav.nframes),
+            wav.rate,
+            wav.sample_width,
+            wav.channels,
+            chunk_size,
+        )
+    finally:
+        wav.close()
+    for degradation in degradations:
+        degradation.degrade_batch(batch)
+
+    silent = batch.dropped.copy()
+    if playout_delay is not None:
+        transit = batch.release_times - batch.send_times
+        silent |= transit > playout_delay
+    batch.silence(silent)
+
+    with wave.open(output_path, "wb") as output:
+        output.setnchannels(batch.channels)
+        output.setsampwidth(batch.sample_width)
+        output.setframerate(batch.rate)
+        output.writeframes(as_byte_view(batch.audio()))
+    if metadata_path is not None:
+        write_metadata(batch, metadata_path, playout_delay)
+    return batch
+
+
+def _degrade_job(job):
+    index, path, name, output_folder, chain, packet_length, playout_delay = job
+    output_path = os.path.join(output_folder, name + ".wav")
+    metadata_path = os.path.join(output_folder, name + ".csv")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    degradations = create_chain(chain, seed_offset=index)
+    degrade_file(
+        path, output_path, degradations, packet_length, playout_delay, metadata_path
+    )
+    return output_path
+
+
+def find_files(paths):
+    """Expand the given paths into a list of WAVE files. Directories are
+    searched recursively.
+
+    Args:
+        paths (list): Paths of WAVE files or directories.
+
+    Returns:
+        list: The sorted paths of the WAVE files. Every file is only listed
+        once.
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            pattern = os.path.join(path, "**", "*.wav")
+            files.update(os.path.abspath(f) for f in glob.glob(pattern, recursive=True))
+        else:
+            files.add(os.path.abspath(path))
+    return sorted(files)
+
+
+def output_names(files):
+    """Return the names of the output files of the given files without
+    extension. The names are the paths of the files relative to the folder
+    that contains all of them, so files with the same name in different
+    folders (like the conversations of different corpora) do not overwrite
+    each other.
+
+    Args:
+        files (list): The absolute paths of the files.
+
+    Returns:
+        list: The relative paths of the files without extension.
+    """
+    if not files:
+        return []
+    root = os.path.commonpath([os.path.dirname(f) for f in files])
+    return [os.path.splitext(os.path.relpath(f, root))[0] for f in files]
+
+
+def degrade_files(
+    paths, output_folder, chain, packet_length=0.02, playout_delay=None, processes=None
+):
+    """Apply a degradation chain to many WAVE files in parallel.
+
+    For every file, the degraded audio and the meta data of the packets are
+    written into the output folder with the extensions .wav and .csv. The
+    folder structure of the files below the folder that contains all of them
+    is kept (see `output_names`). Seeds of the degradations are increased by the
+    index of the file, so that the files are degraded differently but
+    reproducibly.
+
+    Args:
+        paths (list): Paths of WAVE files or directories containing them.
+        output_folder (str): The folder the degraded files are written to.
+        chain (list): The degradation chain as returned by `parse_chain`.
+        packet_length (float): The length of each packet in seconds.
+        playout_delay (float): The time in seconds after which a packet that
+            was not released counts as lost or None to keep all packets.
+        processes (int): The number of worker processes or None for one per
+            CPU.
+
+    Returns:
+        list: The paths of the degraded WAVE files.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    files = find_files(paths)
+    jobs = [
+        (index, path, name, output_folder, chain, packet_length, playout_delay)
+        for index, (path, name) in enumerate(zip(files, output_names(files)))
+    ]
+    if processes == 1 or len(jobs) <= 1:
+        return [_degrade_job(job) for job in jobs]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(_degrade_job, jobs)
+
+
+def parse_arguments():
+    p = argparse.ArgumentParser(
+        description="Applies network degradations to recorded WAVE files."
+    )
+    p.add_argument(
+        "files", type=str, nargs="+", help="WAVE files or folders containing them"
+    )
+    p.add_argument(
+        "-o",
+        "--output-folder",
+        type=str,
+        default="degraded",
+        help="The folder where the degraded files should be saved",
+    )
+    p.add_argument(
+        "-d",
+        "--degradation",
+        type=str,
+        action="append",
+        default=[],
+        help='A degradation of the chain, e.g. "delay:delay=0.1,jitter=0.02"',
+    )
+    p.add_argument(
+        "-l",
+        "--packet-length",
+        type=float,
+        default=0.02,
+        help="The length of each packet in seconds",
+    )
+    p.add_argument(
+        "-p",
+        "--playout-delay",
+        type=float,
+        default=None,
+        help="The delay in seconds after which a packet counts as lost",
+    )
+    p.add_argument(
+        "-j",
+        "--processes",
+        type=int,
+        default=None,
+        help="The number of worker processes",
+    )
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    outputs = degrade_files(
+        arguments.files,
+        arguments.output_folder,
+        parse_chain(arguments.degradation),
+        arguments.packet_length,
+        arguments.playout_delay,
+        arguments.processes,
+    )
+    print("Degraded %d files into %s" % (len(outputs), arguments.output_folder))
@@ -2,9 +2,121 @@
 A module of degradations for a network.
 """
 
+import collections
+import math
+import os
 import time
 import random
 
+import numpy as np
+
+from retico.core.audio import dsp, g711
+from retico.core.audio.common import silence_view
+from retico.core.resources import shared_resource
+
+LPC_ORDER = 16
+"""The order of the linear predictor used for the "lpc" concealment."""
+
+
+def lpc_coefficients(samples, order=LPC_ORDER):
+    """Estimate the coefficients of a linear predictor with the autocorrelation
+    method.
+
+    Args:
+        samples (numpy.ndarray): An array of float samples.
+        order (int): The order of the predictor.
+
+    Returns:
+        numpy.ndarray: The coefficients a, so that a sample is predicted as
+        sum(a[k] * x[n - 1 - k]). All coefficients are zero if the samples are
+        too short or silent.
+    """
+    if len(samples) <= order:
+        return np.zeros(order)
+    samples = samples.astype(np.float64)
+    window = samples * np.hanning(len(samples))
+    r = np.correlate(window, window, "full")[len(window) - 1 : len(window) + order]
+    if r[0] <= 0:
+        return np.zeros(order)
+    r[0] *= 1.0 + 1e-4  # White noise correction for a stable solution
+    lags = np.abs(np.subtract.outer(np.arange(order), np.arange(order)))
+    try:
+        return np.linalg.solve(r[lags], r[1:])
+    except np.linalg.LinAlgError:
+        return np.zeros(order)
+
+
+def lpc_extrapolate(history, coefficients, count):
+    """Continue a signal with a linear predictor.
+
+    The predictor is applied to blocks of [order] samples at once: the samples
+    of a block depend linearly on the last [order] samples before the block,
+    so every block is computed with a single matrix product.
+
+    Args:
+        history (numpy.ndarray): The samples before the extrapolation. At least
+            [order] samples are needed.
+        coefficients (numpy.ndarray): The coefficients of the predictor.
+        count (int): The number of samples to extrapolate.
+
+    Returns:
+        numpy.ndarray: The extrapolated float samples.
+    """
+    order = len(coefficients)
+    # The companion matrix maps the state (the last samples, newest first) to
+    # the next state.
+    companion = np.zeros((order, order))
+    companion[0] = coefficients
+    companion[1:, :-1] = np.eye(order - 1)
+    rows = []
+    power = np.eye(order)
+    for _ in range(order):
+        power = companion @ power
+        rows.append(power[0])
+    block = np.array(rows)  # The next [order] samples from the state
+    state = history[-order:][::-1].astype(np.float64)
+    output = np.empty(-(-count // order) * order)
+    for start in range(0, count, order):
+        values = block @ state
+        output[start : start + order] = values
+        state = values[::-1]
+    return output[:count]
+
+
+def conceal(previous, nframes, channels, method, first=True):
+    """Create the audio that replaces a lost packet.
+
+    Args:
+        previous (numpy.ndarray): The float samples of the last packet that was
+            received (frames x channels) or None.
+        nframes (int): The number of frames of the lost packet.
+        channels (int): The number of channels of the lost packet.
+        method (str): The concealment method (see PacketLoss.CONCEALMENTS).
+        first (bool): Whether the packet is the first lost packet of a burst.
+
+    Returns:
+        numpy.ndarray: The float samples of the concealment (frames x channels)
+        or None if the packet should be replaced by silence.
+    """
+    if method == "zero" or previous is None or not len(previous):
+        return None
+    if method == "repeat":
+        return np.resize(previous, (nframes, channels))
+    if not first:
+        return None
+    fade = np.linspace(1.0, 0.0, nframes, dtype=np.float32)[:, np.newaxis]
+    if method == "fade":
+        return np.resize(previous, (nframes, channels)) * fade
+    # lpc
+    if len(previous) <= LPC_ORDER:
+        return None
+    output = np.empty((nframes, channels), dtype=np.float32)
+    for channel in range(channels):
+        history = previous[:, channel]
+        coefficients = lpc_coefficients(history)
+        output[:, channel] = lpc_extrapolate(history, coefficients, nframes)
+    return np.clip(output, -1.0, 1.0) * fade
+
 
 class Degradation:
     """An abstract degradation class"""
@@ -34,61 +146,197 @@ class Degradation:
         """
         raise NotImplementedError
 
+    def schedule(self, iu, original_iu, release_at):
+        """Return the time at which the degraded IU should be released.
+
+        The network module calls this method after `degrade` and passes the
+        release time determined by the previous degradations. Degradations that
+        do not delay IUs return it unchanged.
+
+        Args:
+            iu (IncrementalUnit): The degraded IU
+            original_iu (IncrementalUnit): The original IU
+            release_at (float): The UNIX timestamp at which the IU would be
+                released by the previous degradations or None if it would be
+                released immediately.
+
+        Returns:
+            float: The UNIX timestamp at which the IU should be released, None
+            if it should be released immediately or math.inf if the IU is
+            dropped and never released.
+        """
+        return release_at
+
+    def degrade_batch(self, batch):
+        """Degrade all packets of a batch (see
+        `retico.modules.net.batch.PacketBatch`) at once.
+
+        The default implementation calls `degrade` and `schedule` for every
+        packet. Degradations override this method to process the whole batch
+        with vectorized operations.
+
+        Args:
+            batch (PacketBatch): The packets of an audio file.
+        """
+        for index in range(len(batch)):
+            iu = batch.packet_iu(index)
+            self.degrade(iu, iu)
+            release_at = self.schedule(iu, iu, batch.release_time(index))
+            batch.update(index, iu, release_at)
+
+    def _schedule_batch(self, batch, delays, reorder):
+        """Add the given delays to the release times of a batch. Without
+        reordering, no packet is released before the packet before it.
+
+        Args:
+            batch (PacketBatch): The packets of an audio file.
+            delays (numpy.ndarray): The delay of every packet in seconds.
+            reorder (bool): Whether packets may overtake each other.
+        """
+        release = np.where(
+            np.isnan(batch.release_times), batch.send_times, batch.release_times
+        )
+        release = release + delays
+        if not reorder and len(release):
+            release = np.maximum.accumulate(np.maximum(release, self._last_release))
+            self._last_release = float(release[-1])
+        batch.release_times[:] = release
+        batch.set_meta("delay", release - batch.send_times)
+
 
 class Delay(Degradation):
-    """A delay degradation that waits for a specified amount of time before returning
-    the IU - effectively delaying the submission of the packet."""
+    """A delay degradation that schedules the release of each IU a specified
+    amount of time after the original IU was created - effectively delaying the
+    submission of the packet.
+
+    The delay of each packet may vary by a random jitter. Without reordering,
+    a packet is never released before the packet that was sent before it, so
+    the jitter only delays packets further. With reordering, every packet is
+    released exactly at its own target time.
+
+    The delay is not waited for inside the degradation. The network module
+    releases the IU at the scheduled time while it keeps processing input."""
+
+    DISTRIBUTIONS = ("uniform", "normal", "exponential")
+    """The distributions of the jitter. "uniform" varies the delay uniformly by
+    up to [jitter] seconds in both directions, "normal" with a standard
+    deviation of [jitter] seconds and "exponential" adds an exponentially
+    distributed delay with a mean of [jitter] seconds."""
 
     @staticmethod
     def name():
         return "Delay"
 
-    def __init__(self, delay):
+    def __init__(
+        self, delay, jitter=0.0, distribution="uniform", reorder=False, seed=None
+    ):
         """Initialize the Degradation with the given delay in seconds
 
         Args:
             delay (float): Delay in seconds
+            jitter (float): The variation of the delay in seconds
+            distribution (str): The distribution of the jitter (see
+                DISTRIBUTIONS)
+            reorder (bool): Whether packets may overtake each other
+            seed (int): The seed of the random jitter
         """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError("Unknown jitter distribution %s" % distribution)
         self.delay = delay
+        self.jitter = jitter
+        self.distribution = distribution
+        self.reorder = reorder
+        self._random = random.Random(seed)
+        self._last_release = 0.0
+
+    def sample_delay(self):
+        """Return the delay of the next packet including its jitter.
+
+        Returns:
+            float: The delay in seconds (at least 0).
+        """
+        jitter = 0.0
+        if self.jitter > 0:
+            if self.distribution == "uniform":
+                jitter = self._random.uniform(-self.jitter, self.jitter)
+            elif self.distribution == "normal":
+                jitter = self._random.gauss(0.0, self.jitter)
+            else:
+                jitter = self._random.expovariate(1.0 / self.jitter)
+        return max(self.delay + jitter, 0.0)
 
     def degrade(self, iu, original_iu):
-        d = self.delay - original_iu.age()
-        iu.meta_data["delay"] = d  # Add delay as meta data to IU
-        if d > 0:
-            time.sleep(d)
         return iu
 
+    def schedule(self, iu, original_iu, release_at):
+        if release_at is None:
+            release_at = original_iu.created_at
+        release_at += self.sample_delay()
+        if not self.reorder:
+            release_at = max(release_at, self._last_release)
+            self._last_release = release_at
+        iu.meta_data["delay"] = release_at - time.time()  # Add delay as meta data
+        return release_at
+
+    def degrade_batch(self, batch):
+        delays = np.array([self.sample_delay() for _ in range(len(batch))])
+        self._schedule_batch(batch, delays, self.reorder)
+
 
 class PacketLoss(Degradation):
-    """A packet loss degradation that overwrites the content of the IU with zeros.
-    The packet-loss is decided by a two-state markov chain as described in:
+    """A packet loss degradation that replaces the content of lost IUs. The
+    packet-loss is decided by a two-state markov chain as described in:
 
         - Narrowband E-model (ITU-T G.107)
-        - Raake et al. 2006 - Short- and Long-Term Packet Loss Behavior"""
+        - Raake et al. 2006 - Short- and Long-Term Packet Loss Behavior
+
+    The states of the markov chain are generated in batches from a seeded
+    random number generator: the lengths of the runs of found and lost packets
+    are drawn from geometric distributions (see `loss_pattern`).
+
+    The audio of a lost IU is concealed with one of the CONCEALMENTS."""
 
     LOST_STATE = 1
     """The markov chain state denoting the packet was lost."""
     FOUND_STATE = 0
     """The markov chain state denoting the packet was found (i.e., not lost)."""
 
+    CONCEALMENTS = ("zero", "repeat", "fade", "lpc")
+    """The concealment methods. "zero" inserts silence, "repeat" repeats the
+    last received packet, "fade" repeats the last received packet once with a
+    linear fade-out and "lpc" continues the last received packet with a linear
+    predictor and fades it out. With "fade" and "lpc", further lost packets of
+    a burst are silent."""
+
+    BATCH_SIZE = 1024
+    """The number of markov chain states that are generated at once."""
+
     @staticmethod
     def name():
-        "Packet loss"
+        return "Packet loss"
 
-    def __init__(self, ppl, burstr):
+    def __init__(self, ppl, burstr, concealment="zero", seed=None):
         """Initialize the Degradation with the gvien packet loss probability (ppl) and
         burst ratio (burstr).
 
         Args:
             ppl (float): The overall packet loss probability ranging from 0.0 to 1.0
             burstr (float): The burst ratio with 1.0 being uniformly distributed
+            concealment (str): The concealment method (see CONCEALMENTS)
+            seed (int): The seed of the random number generator
         """
-        self.set_packetloss(ppl, burstr)
+        if concealment not in self.CONCEALMENTS:
+            raise ValueError("Unknown concealment %s" % concealment)
+        self.concealment = concealment
+        self._rng = np.random.default_rng(seed)
         self.pl_state = self.FOUND_STATE  # Initially we are always in found state
+        self.set_packetloss(ppl, burstr)
+        self._previous = None
 
     def set_packetloss(self, ppl, burstr):
         """Sets the packet loss and burst ratio of the Degradation. This updates
-        internal variables.
+        internal variables and discards the states that were generated with the
+        old values.
         """
         self._ppl = ppl
         self._burstr = burstr
@@ -96,6 +344,52 @@ class PacketLoss(Degradation):
         # Calculating p and q from the two-state markov chain
         self._q = (1 - ppl) / burstr  # transition probability from "lost" to "found"
         self._p = (ppl * self._q) / (1 - ppl)  # transition from "found" to "lost"
+        self._states = np.zeros(0, dtype=np.int8)
+        self._index = 0
+        self._chain_state = self.pl_state
+
+    def _run_lengths(self, probability, count, limit):
+        if probability <= 0:
+            return np.full(count, limit)
+        return self._rng.geometric(min(probability, 1.0), count)
+
+    def loss_pattern(self, count):
+        """Generate the packet loss states of the next packets.
+
+        Because the markov chain leaves each state with a fixed probability,
+        the runs of found and lost packets have geometric lengths. The runs are
+        drawn in batches and expanded into the states of the packets, so no
+        random number is drawn per packet.
+
+        This advances the markov chain independently of `determine_packetloss`.
+
+        Args:
+            count (int): The number of packets.
+
+        Returns:
+            numpy.ndarray: An int8 array of the states of the packets with 0
+            indicating found and 1 indicating lost.
+        """
+        state = self._chain_state
+        other = 1 - state
+        probability = {self.FOUND_STATE: self._p, self.LOST_STATE: self._q}
+        expected = count * (self._p + self._q) / 2
+        nruns = int(expected * 1.5) + 8
+        lengths = np.zeros(0, dtype=np.int64)
+        while lengths.sum() < count + 1:
+            runs = np.empty(2 * nruns, dtype=np.int64)
+            runs[0::2] = self._run_lengths(probability[state], nruns, count + 1)
+            runs[1::2] = self._run_lengths(probability[other], nruns, count + 1)
+            lengths = np.concatenate((lengths, runs))
+        # The current run has already started, so its remaining length is one
+        # shorter than a complete run.
+        lengths[0] -= 1
+        np.minimum(lengths, count, out=lengths)
+        states = np.tile(np.array([state, other], dtype=np.int8), len(lengths) // 2)
+        states = np.repeat(states, lengths)[:count]
+        if count:
+            self._chain_state = int(states[-1])
+        return states
 
     def determine_packetloss(self):
         """Calculates the new packet loss state based on the p and q values (i.e. on ppl
@@ -104,23 +398,441 @@ class PacketLoss(Degradation):
         Returns:
             int: The new packet loss state with 0 indicating found and 1 indicating lost
         """
-        if self.pl_state == self.FOUND_STATE:  # Found state
-            if random.random() < self._p:
-                self.pl_state = 1
-        elif self.pl_state == self.LOST_STATE:  # Lost state
-            if random.random() < self._q:
-                self.pl_state = 0
+        if self._index >= len(self._states):
+            self._states = self.loss_pattern(self.BATCH_SIZE)
+            self._index = 0
+        self.pl_state = int(self._states[self._index])
+        self._index += 1
         return self.pl_state
 
     def degrade(self, iu, original_iu):
         # Calculate new PL state
-        if self.determine_packetloss() == self.LOST_STATE:
-            # PL
-            iu.meta_data["packet-loss"] = True
-            iu.raw_audio = ("\x00" * len(iu.raw_audio)).encode()
-        else:
-            # NO PL
-            iu.meta_data["packet-loss"] = False
+        first = self.pl_state == self.FOUND_STATE
+        lost = self.determine_packetloss() == self.LOST_STATE
+        iu.meta_data["packet-loss"] = lost
         iu.meta_data["ppl"] = self._ppl
         iu.meta_data["burstr"] = self._burstr
+        if iu.is_silence:
+            self._previous = None
+            return iu
+        if not lost:
+            if self.concealment != "zero":
+                samples = dsp.to_float(iu.raw_audio, iu.sample_width)
+                self._previous = samples.reshape(-1, iu.channels)
+            return iu
+        iu.meta_data["concealment"] = self.concealment
+        samples = conceal(
+            self._previous, iu.nframes, iu.channels, self.concealment, first
+        )
+        if samples is None:
+            iu.raw_audio = silence_view(len(iu.audio_view()))
+        else:
+            iu.raw_audio = dsp.from_float(samples.ravel(), iu.sample_width)
+        iu.payload = iu.raw_audio
+        return iu
+
+    def degrade_batch(self, batch):
+        first = self.pl_state == self.FOUND_STATE
+        lost = self.loss_pattern(len(batch)) == self.LOST_STATE
+        if len(lost):
+            self.pl_state = int(lost[-1])
+        batch.mark_lost(lost)
+        if self.concealment == "zero" or not lost.any():
+            batch.silence(lost)
+            return
+        # The index of the last received packet before (or at) every packet
+        received = np.maximum.accumulate(np.where(lost, -1, np.arange(len(lost))))
+        for index in np.flatnonzero(lost):
+            previous = None
+            source = received[index]
+            if source >= 0:
+                samples = dsp.to_float(batch.samples[source], batch.sample_width)
+                previous = samples.reshape(-1, batch.channels)
+            elif self._previous is not None:
+                previous = self._previous
+            burst_start = not lost[index - 1] if index else first
+            samples = conceal(
+                previous,
+                batch.chunk_size,
+                batch.channels,
+                self.concealment,
+                burst_start,
+            )
+            if samples is None:
+                batch.silence(index)
+            else:
+                batch.samples[index] = dsp.from_float(
+                    samples.ravel(), batch.sample_width
+                )
+        if received[-1] >= 0:
+            samples = dsp.to_float(batch.samples[received[-1]], batch.sample_width)
+            self._previous = samples.reshape(-1, batch.channels)
+
+
+class NetworkTrace:
+    """A per-packet trace of the delay and the loss of a recorded network
+    connection.
+
+    A trace may be loaded from
+        - a CSV file with a header containing a "delay" column (in seconds) and
+          an optional "lost" column (0 or 1),
+        - a NumPy file (.npy) containing either a one-dimensional array of
+          delays or a two-dimensional array with the columns delay and lost,
+        - or a raw binary file of little-endian 32 bit floats (.f32 or .bin)
+          containing the delays.
+    A delay that is NaN or negative marks the packet as lost. Binary traces
+    are memory-mapped, so that large traces are not read into memory.
+
+    Attributes:
+        path (str): The path of the trace file.
+        delays (numpy.ndarray): The delay of each packet in seconds.
+        lost (numpy.ndarray): Whether each packet was lost.
+    """
+
+    def __init__(self, path):
+        """Load the trace.
+
+        Args:
+            path (str): The path of the trace file.
+
+        Raises:
+            ValueError: If the format of the trace is not supported.
+        """
+        self.path = path
+        extension = os.path.splitext(path)[1].lower()
+        lost = None
+        if extension == ".npy":
+            data = np.load(path, mmap_mode="r")
+            if data.ndim == 2:
+                delays, lost = data[:, 0], data[:, 1] != 0
+            else:
+                delays = data
+        elif extension in (".f32", ".bin"):
+            delays = np.memmap(path, dtype="<f4", mode="r")
+        elif extension == ".csv":
+            data = np.genfromtxt(path, delimiter=",", names=True)
+            delays = np.atleast_1d(data["delay"])
+            if "lost" in data.dtype.names:
+                lost = np.atleast_1d(data["lost"]) != 0
+        else:
+            raise ValueError("Unsupported trace format %s" % path)
+        invalid = ~(delays >= 0)
+        self.lost = invalid if lost is None else lost | invalid
+        self.delays = delays
+
+    def __len__(self):
+        return len(self.delays)
+
+    def lookup(self, index):
+        """Return the delay and the loss of a packet.
+
+        Args:
+            index (int): The index of the packet inside the trace.
+
+        Returns:
+            tuple: The delay of the packet in seconds (0.0 if it was lost) and
+            whether it was lost.
+        """
+        if self.lost[index]:
+            return 0.0, True
+        return float(self.delays[index]), False
+
+
+def load_trace(path):
+    """Load a network trace that is shared by all users of the same file.
+
+    Args:
+        path (str): The path of the trace file.
+
+    Returns:
+        NetworkTrace: The shared trace.
+    """
+    path = os.path.abspath(path)
+    return shared_resource(("NetworkTrace", path), lambda: NetworkTrace(path))
+
+
+class TraceDegradation(Degradation):
+    """A degradation that replays the delay and the loss of a recorded network
+    trace. The n-th packet gets the delay and the loss of the n-th entry of the
+    trace.
+
+    The replay may start at a time offset into the trace, which is converted
+    into a packet offset with the length of the first packet. If [loop] is set,
+    the trace is repeated, otherwise packets after the end of the trace are
+    neither delayed nor lost. Lost packets are replaced by silence."""
+
+    @staticmethod
+    def name():
+        return "Trace"
+
+    def __init__(self, trace, offset=0.0, loop=True, reorder=False):
+        """Initialize the trace degradation.
+
+        Args:
+            trace (NetworkTrace): The trace to replay (see `load_trace`).
+            offset (float): The time offset into the trace in seconds.
+            loop (bool): Whether the trace is repeated.
+            reorder (bool): Whether packets may overtake each other.
+        """
+        self.trace = trace
+        self.offset = offset
+        self.loop = loop
+        self.reorder = reorder
+        self._index = None
+        self._delay = 0.0
+        self._last_release = 0.0
+
+    def _next_entry(self, iu):
+        if self._index is None:
+            length = iu.audio_length()
+            self._index = int(round(self.offset / length)) if length > 0 else 0
+        index = self._index
+        self._index += 1
+        if self.loop and len(self.trace):
+            index %= len(self.trace)
+        elif index >= len(self.trace):
+            return 0.0, False
+        return self.trace.lookup(index)
+
+    def degrade(self, iu, original_iu):
+        self._delay, lost = self._next_entry(iu)
+        iu.meta_data["packet-loss"] = lost
+        if lost:
+            iu.raw_audio = silence_view(len(iu.audio_view()))
+            iu.payload = iu.raw_audio
+        return iu
+
+    def schedule(self, iu, original_iu, release_at):
+        if release_at is None:
+            release_at = original_iu.created_at
+        release_at += self._delay
+        if not self.reorder:
+            release_at = max(release_at, self._last_release)
+            self._last_release = release_at
+        iu.meta_data["delay"] = release_at - time.time()
+        return release_at
+
+    def degrade_batch(self, batch):
+        if self._index is None:
+            self._index = int(round(self.offset * batch.rate / batch.chunk_size))
+        indices = self._index + np.arange(len(batch))
+        self._index += len(batch)
+        if self.loop and len(self.trace):
+            indices %= len(self.trace)
+        valid = indices < len(self.trace)
+        delays = np.zeros(len(batch))
+        lost = np.zeros(len(batch), dtype=bool)
+        delays[valid] = self.trace.delays[indices[valid]]
+        lost[valid] = self.trace.lost[indices[valid]]
+        delays[lost] = 0.0
+        batch.silence(lost)
+        batch.mark_lost(lost)
+        self._schedule_batch(batch, delays, self.reorder)
+
+
+class Codec(Degradation):
+    """A degradation that passes the audio through a telephony codec.
+
+    The audio is band limited to the narrowband telephone band with a FIR
+    filter, encoded and decoded with G.711 μ-law or A-law and its bit depth is
+    reduced. Each step is optional. The codec works at the sample rate of the
+    audio, the band limiting emulates the lower sample rate of narrowband
+    telephony. The state of the filter is carried from one IU to the next, so
+    the audio of consecutive IUs is filtered continuously."""
+
+    @staticmethod
+    def name():
+        return "Codec"
+
+    def __init__(self, law="ulaw", band_limit=True, bits=None, low=300.0, high=3400.0):
+        """Initialize the codec degradation.
+
+        Args:
+            law (str): The companding law ("ulaw" or "alaw") or None for no
+                companding.
+            band_limit (bool): Whether the audio is band limited.
+            bits (int): The number of bits the samples are reduced to or None
+                to keep 16 bits.
+            low (float): The lower cutoff frequency of the band in Hz.
+            high (float): The upper cutoff frequency of the band in Hz.
+        """
+        if law is not None and law not in g711.LAWS:
+            raise ValueError("Unknown companding law %s" % law)
+        self.law = law
+        self.band_limit = band_limit
+        self.bits = bits
+        self.low = low
+        self.high = high
+        self._filters = []
+        self._rate = None
+
+    def _filter(self, raw_audio, rate, sample_width, channels):
+        """Band limit the audio and return it as 16 bit samples."""
+        if self._rate != rate or len(self._filters) != channels:
+            taps = dsp.bandpass_filter(rate, self.low, self.high)
+            self._filters = [dsp.FIRFilter(taps) for _ in range(channels)]
+            self._rate = rate
+        samples = dsp.to_float(raw_audio, sample_width)
+        samples = samples.reshape(-1, channels)
+        for channel, fir in enumerate(self._filters):
+            samples[:, channel] = fir.process(samples[:, channel])
+        return dsp.from_float(samples.ravel(), 2)
+
+    def apply(self, raw_audio, rate, sample_width, channels=1):
+        """Pass audio through the codec. The state of the filter is kept for
+        the next call.
+
+        Args:
+            raw_audio: An object supporting the buffer protocol containing PCM
+                audio or a NumPy array of samples.
+            rate (int): The sample rate of the audio.
+            sample_width (int): The sample width of the audio.
+            channels (int): The number of interleaved channels of the audio.
+
+        Returns:
+            numpy.ndarray: An array of the PCM samples after the codec.
+        """
+        if self.band_limit:
+            samples = self._filter(raw_audio, rate, sample_width, channels)
+        else:
+            samples = dsp.convert_sample_width(raw_audio, sample_width, 2)
+        if self.law is not None:
+            samples = g711.roundtrip(samples, self.law)
+        if self.bits:
+            samples = samples & np.int16(~((1 << (16 - self.bits)) - 1))
+        return dsp.convert_sample_width(samples, 2, sample_width)
+
+    def degrade(self, iu, original_iu):
+        if iu.is_silence:
+            for fir in self._filters:
+                fir.reset()
+            return iu
+        iu.raw_audio = self.apply(
+            iu.raw_audio, iu.rate, iu.sample_width, iu.channels
+        )
+        iu.payload = iu.raw_audio
+        iu.meta_data["codec"] = self.law
         return iu
+
+    def degrade_batch(self, batch):
+        samples = self.apply(
+            batch.samples, batch.rate, batch.sample_width, batch.channels
+        )
+        batch.samples[:] = samples.reshape(batch.samples.shape)
+
+
+class Link(Degradation):
+    """A degradation that models a link with a limited bandwidth.
+
+    Packets are sent in the order they arrive at the link. A token bucket is
+    filled at the rate of the bandwidth up to [burst] bytes (but at least the
+    size of the packet that waits). A packet is sent as soon as the bucket
+    holds enough tokens for it and the previous packet has left the wire. The
+    time a packet waits is its queuing delay. Every packet is additionally
+    delayed by the time its bits take to be serialized at the bandwidth of the
+    link, so a burst is sent back to back and never faster than the bandwidth.
+
+    If the packets waiting in the queue of the link would exceed [buffer_size]
+    bytes, the arriving packet is dropped (tail drop).
+
+    The size of a packet is the size of its audio plus [overhead] bytes for the
+    headers. Silence spans are sent without audio, like with discontinuous
+    transmission."""
+
+    @staticmethod
+    def name():
+        return "Link"
+
+    def __init__(self, bandwidth, burst=0, buffer_size=None, overhead=40):
+        """Initialize the link degradation.
+
+        Args:
+            bandwidth (float): The bandwidth of the link in bits per second.
+            burst (int): The size of the token bucket in bytes.
+            buffer_size (int): The size of the queue of the link in bytes or
+                None for an unlimited queue.
+            overhead (int): The number of header bytes of each packet.
+        """
+        self.bandwidth = bandwidth
+        self.burst = burst
+        self.buffer_size = buffer_size
+        self.overhead = overhead
+        self._tokens = math.inf  # The bucket is full at the start
+        self._last_send = None
+        self._wire_free = -math.inf  # The time the last packet left the wire
+        self._queue = collections.deque()  # send time and size of queued packets
+        self._queued_bytes = 0
+        self.sent = 0
+        self.dropped = 0
+        self._queuing_delay = 0.0
+
+    def packet_size(self, iu):
+        """Return the size of the packet of an IU in bytes.
+
+        Args:
+            iu (AudioIU): The IU.
+
+        Returns:
+            int: The size of the packet including its headers.
+        """
+        if iu.is_silence:
+            return self.overhead
+        return len(iu.audio_view()) + self.overhead
+
+    def degrade(self, iu, original_iu):
+        return iu
+
+    def schedule(self, iu, original_iu, release_at):
+        arrival = original_iu.created_at if release_at is None else release_at
+        size = self.packet_size(iu)
+        byte_rate = self.bandwidth / 8
+
+        while self._queue and self._queue[0][0] <= arrival:
+            self._queued_bytes -= self._queue.popleft()[1]
+        if self.buffer_size is not None and (
+            self._queued_bytes + size > self.buffer_size
+        ):
+            self.dropped += 1
+            iu.meta_data["link-drop"] = True
+            return math.inf
+
+        send = arrival
+        depth = max(self.burst, size)
+        tokens = self._tokens
+        if self._last_send is not None:
+            send = max(send, self._last_send, self._wire_free)
+            tokens += (send - self._last_send) * byte_rate
+        tokens = min(tokens, depth)
+        if tokens < size:
+            send += (size - tokens) / byte_rate
+            tokens = size
+        self._tokens = tokens - size
+        self._last_send = send
+        self._wire_free = send + size / byte_rate
+        if send > arrival:
+            self._queue.append((send, size))
+            self._queued_bytes += size
+
+        self.sent += 1
+        self._queuing_delay += send - arrival
+        iu.meta_data["link-drop"] = False
+        iu.meta_data["queuing-delay"] = send - arrival
+        iu.meta_data["serialization-delay"] = size / byte_rate
+        return self._wire_free
+
+    def stats(self):
+        """Return statistics about the link.
+
+        Returns:
+            dict: A dictionary containing the number of sent and dropped
+            packets, the mean queuing delay of the sent packets in seconds and
+            the bytes waiting in the queue when the last packet arrived.
+        """
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "mean_queuing_delay": (
+                self._queuing_delay / self.sent if self.sent else None
+            ),
+            "queued_bytes": self._queued_bytes,
+        }
@@ -2,14 +2,35 @@
 A network module that may apply different types of degradations.
 """
 
+import heapq
+import itertools
+import math
+import threading
+import time
+
 from retico.core.abstract import AbstractModule
-from retico.core.audio.common import DispatchedAudioIU
-from retico.modules.net.degradations import Delay, PacketLoss
+from retico.core.audio import dsp
+from retico.core.audio.common import DispatchedAudioIU, silence_view
+from retico.modules.net.degradations import (
+    Codec,
+    Delay,
+    Link,
+    PacketLoss,
+    TraceDegradation,
+    conceal,
+    load_trace,
+)
 
 
 class NetworkModule(AbstractModule):
     """A network module that takes Audio IUs, adds degradations to them and
-    outputs them."""
+    outputs them.
+
+    Degradations may schedule the release of an IU at a later time (see
+    `Degradation.schedule`). Scheduled IUs are kept in a heap ordered by their
+    release time and are released by a separate thread, so that the module
+    keeps processing incoming IUs while others are delayed. IUs that a
+    degradation drops are not released."""
 
     @staticmethod
     def name():
@@ -30,6 +51,11 @@ class NetworkModule(AbstractModule):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.degradations = []
+        self._scheduled = []
+        self._sequence = itertools.count()
+        self._release_cond = threading.Condition()
+        self._releasing = False
+        self._release_thread = None
 
     def add_degradation(self, degradation):
         """Append a degradation to the list of applied degradations
@@ -46,12 +72,82 @@ class NetworkModule(AbstractModule):
     def process_iu(self, input_iu):
         output_iu = self.create_iu(input_iu)
         output_iu.set_audio(
-            input_iu.raw_audio, input_iu.nframes, input_iu.rate, input_iu.sample_width
+            input_iu.raw_audio,
+            input_iu.nframes,
+            input_iu.rate,
+            input_iu.sample_width,
+            input_iu.channels,
         )
+        output_iu.is_silence = input_iu.is_silence
         output_iu.set_dispatching(input_iu.completion, input_iu.is_dispatching)
+        output_iu.copy_timeline(input_iu)
+        release_at = None
         for degradation in self.degradations:
             degradation.degrade(output_iu, input_iu)
-        self.append(output_iu)
+            release_at = degradation.schedule(output_iu, input_iu, release_at)
+            if release_at == math.inf:
+                return
+        if release_at is None:
+            self.append(output_iu)
+            return
+        with self._release_cond:
+            heapq.heappush(
+                self._scheduled, (release_at, next(self._sequence), output_iu)
+            )
+            self._release_cond.notify()
+
+    def pending(self):
+        """Return the number of IUs that are scheduled but not yet released.
+
+        Returns:
+            int: The number of scheduled IUs.
+        """
+        with self._release_cond:
+            return len(self._scheduled)
+
+    def _release_loop(self):
+        """A method run in a thread that releases the scheduled IUs when they
+        are due. IUs with the same release time are released in the order they
+        were scheduled."""
+        with self._release_cond:
+            while self._releasing:
+                if not self._scheduled:
+                    self._release_cond.wait()
+                    continue
+                wait = self._scheduled[0][0] - time.time()
+                if wait > 0:
+                    self._release_cond.wait(wait)
+                    continue
+                due = []
+                while self._scheduled and self._scheduled[0][0] <= time.time():
+                    due.append(heapq.heappop(self._scheduled)[2])
+                self._release_cond.release()
+                try:
+                    for output_iu in due:
+                        self.append(output_iu)
+                finally:
+                    self._release_cond.acquire()
+
+    def prepare_run(self):
+        with self._release_cond:
+            self._releasing = True
+        self._release_thread = threading.Thread(target=self._release_loop)
+        self._release_thread.daemon = True
+        self._release_thread.start()
+
+    def shutdown(self):
+        with self._release_cond:
+            self._releasing = False
+            self._scheduled.clear()
+            self._release_cond.notify_all()
+        if self._release_thread:
+            self._release_thread.join()
+            self._release_thread = None
+
+    def reset(self):
+        super().reset()
+        with self._release_cond:
+            self._scheduled.clear()
 
 
 class DelayedNetworkModule(NetworkModule):
@@ -65,24 +161,35 @@ class DelayedNetworkModule(NetworkModule):
     def description():
         return "A Module that applies delay to Audio IUs"
 
-    def __init__(self, delay, **kwargs):
+    def __init__(self, delay, jitter=0.0, reorder=False, **kwargs):
+        """Initialize the delayed network module.
+
+        Args:
+            delay (float): The delay in seconds.
+            jitter (float): The uniform variation of the delay in seconds.
+            reorder (bool): Whether packets may overtake each other.
+        """
         super().__init__(**kwargs)
         self.delay = delay
+        self.jitter = jitter
+        self.reorder = reorder
 
     def setup(self):
-        delay = Delay(self.delay)
+        delay = Delay(self.delay, self.jitter, reorder=self.reorder)
         self.add_degradation(delay)
 
     def shutdown(self):
+        super().shutdown()
         self.clear_degradations()
 
 
 class PacketLossNetworkModule(NetworkModule):
-    """A network module that adds zero-insertion packet loss to the audio IUs. This is
-    done with a two-state markov model as described by ITU-T G.107.
+    """A network module that adds packet loss to the audio IUs. This is done with a
+    two-state markov model as described by ITU-T G.107.
 
     Based on the probability and burst ratio given, a number of packets are replaced
-    with zeros (silence) and the "lost"-flag in the meta_data of the IU is set to true.
+    with zeros (silence) or another concealment and the "lost"-flag in the meta_data
+    of the IU is set to true.
     """
 
     @staticmethod
@@ -93,16 +200,26 @@ class PacketLossNetworkModule(NetworkModule):
     def description():
         return "A Module that applies zero-insetion packet loss to certain Audio IUs"
 
-    def __init__(self, ppl, burstr, **kwargs):
+    def __init__(self, ppl, burstr, concealment="zero", **kwargs):
+        """Initialize the packet loss network module.
+
+        Args:
+            ppl (float): The overall packet loss probability.
+            burstr (float): The burst ratio of the packet loss.
+            concealment (str): The concealment of lost packets (see
+                PacketLoss.CONCEALMENTS).
+        """
         super().__init__(**kwargs)
         self.ppl = ppl
         self.burstr = burstr
+        self.concealment = concealment
 
     def setup(self):
-        packetloss = PacketLoss(self.ppl, self.burstr)
+        packetloss = PacketLoss(self.ppl, self.burstr, self.concealment)
         self.add_degradation(packetloss)
 
     def shutdown(self):
+        super().shutdown()
         self.clear_degradations()
 
 
@@ -120,17 +237,446 @@ class DelayPacketLossNetworkModule(NetworkModule):
     def description():
         return "A Module that applied packet loss and delay to the AudioIUs"
 
-    def __init__(self, delay, ppl, burstr, **kwargs):
+    def __init__(
+        self,
+        delay,
+        ppl,
+        burstr,
+        jitter=0.0,
+        reorder=False,
+        concealment="zero",
+        **kwargs
+    ):
         super().__init__(**kwargs)
         self.delay = delay
         self.ppl = ppl
         self.burstr = burstr
+        self.jitter = jitter
+        self.reorder = reorder
+        self.concealment = concealment
 
     def setup(self):
-        packetloss = PacketLoss(self.ppl, self.burstr)
+        packetloss = PacketLoss(self.ppl, self.burstr, self.concealment)
         self.add_degradation(packetloss)
-        delay = Delay(self.delay)
+        delay = Delay(self.delay, self.jitter, reorder=self.reorder)
         self.add_degradation(delay)
 
     def shutdown(self):
+        super().shutdown()
+        self.clear_degradations()
+
+
+class TraceNetworkModule(NetworkModule):
+    """A network module that replays the delay and the loss of a recorded
+    network trace (see `NetworkTrace` for the supported formats). The trace is
+    loaded once per process and shared between all modules replaying it."""
+
+    @staticmethod
+    def name():
+        return "Trace Network Module"
+
+    @staticmethod
+    def description():
+        return "A Module that replays recorded delay and loss on Audio IUs"
+
+    def __init__(self, trace, offset=0.0, loop=True, reorder=False, **kwargs):
+        """Initialize the trace network module.
+
+        Args:
+            trace (str): The path of the trace file.
+            offset (float): The time offset into the trace in seconds.
+            loop (bool): Whether the trace is repeated.
+            reorder (bool): Whether packets may overtake each other.
+        """
+        super().__init__(**kwargs)
+        self.trace = trace
+        self.offset = offset
+        self.loop = loop
+        self.reorder = reorder
+
+    def setup(self):
+        degradation = TraceDegradation(
+            load_trace(self.trace), self.offset, self.loop, self.reorder
+        )
+        self.add_degradation(degradation)
+
+    def shutdown(self):
+        super().shutdown()
         self.clear_degradations()
+
+
+class CodecNetworkModule(NetworkModule):
+    """A network module that passes the audio through a telephony codec (see
+    `Codec`). It may be combined with other degradations by adding them with
+    `add_degradation`."""
+
+    @staticmethod
+    def name():
+        return "Codec Network Module"
+
+    @staticmethod
+    def description():
+        return "A Module that applies a telephony codec to Audio IUs"
+
+    def __init__(self, law="ulaw", band_limit=True, bits=0, **kwargs):
+        """Initialize the codec network module.
+
+        Args:
+            law (str): The companding law ("ulaw", "alaw" or "none").
+            band_limit (bool): Whether the audio is band limited to 300-3400 Hz.
+            bits (int): The number of bits the samples are reduced to or 0 to
+                keep 16 bits.
+        """
+        super().__init__(**kwargs)
+        self.law = law
+        self.band_limit = band_limit
+        self.bits = bits
+
+    def setup(self):
+        law = None if self.law == "none" else self.law
+        self.add_degradation(Codec(law, self.band_limit, self.bits or None))
+
+    def shutdown(self):
+        super().shutdown()
+        self.clear_degradations()
+
+
+class LinkNetworkModule(NetworkModule):
+    """A network module that sends the audio over a link with a limited
+    bandwidth (see `Link`) followed by a constant propagation delay."""
+
+    @staticmethod
+    def name():
+        return "Link Network Module"
+
+    @staticmethod
+    def description():
+        return "A Module that sends Audio IUs over a link with limited bandwidth"
+
+    def __init__(
+        self, bandwidth, burst=0, buffer_size=0, overhead=40, delay=0.0, **kwargs
+    ):
+        """Initialize the link network module.
+
+        Args:
+            bandwidth (float): The bandwidth of the link in bits per second.
+            burst (int): The size of the token bucket in bytes.
+            buffer_size (int): The size of the queue of the link in bytes or 0
+                for an unlimited queue.
+            overhead (int): The number of header bytes of each packet.
+            delay (float): The propagation delay after the link in seconds.
+        """
+        super().__init__(**kwargs)
+        self.bandwidth = bandwidth
+        self.burst = burst
+        self.buffer_size = buffer_size
+        self.overhead = overhead
+        self.delay = delay
+        self.link = None
+
+    def setup(self):
+        self.link = Link(
+            self.bandwidth, self.burst, self.buffer_size or None, self.overhead
+        )
+        self.add_degradation(self.link)
+        if self.delay > 0:
+            self.add_degradation(Delay(self.delay))
+
+    def shutdown(self):
+        super().shutdown()
+        self.clear_degradations()
+
+
+class JitterBufferModule(AbstractModule):
+    """A receiver-side jitter buffer that plays out a degraded audio stream at a
+    steady rate.
+
+    The IUs are ordered by their index on the sample timeline of their stream,
+    which serves as their sequence number. The audio at a sample index is
+    played out [playout delay] seconds after it was produced by the sender.
+    An IU that has not arrived when it is due is concealed (see
+    PacketLoss.CONCEALMENTS) and counted as lost. An IU that arrives after it
+    was due is discarded and counted as late.
+
+    If [adaptive] is set, the playout delay follows the transit time of the
+    IUs: the transit time and its variation are smoothed exponentially and the
+    playout delay is set to the smoothed transit time plus four times its
+    variation (limited to [min_delay] and [max_delay]). The new playout delay
+    is only applied when a silent IU (one that is not dispatching) is played,
+    so that utterances are not stretched or cut.
+
+    IUs without a sample timeline are passed on immediately. If the buffer is
+    empty and no IU arrived for longer than the playout delay, the sender is
+    assumed to have stopped and the playout pauses until the next IU arrives.
+
+    Attributes:
+        delay (float): The initial (or fixed) playout delay in seconds.
+        adaptive (bool): Whether the playout delay adapts to the transit time.
+        min_delay (float): The minimum adaptive playout delay in seconds.
+        max_delay (float): The maximum adaptive playout delay in seconds.
+        concealment (str): The concealment of lost IUs.
+        playout_delay (float): The current playout delay in seconds.
+    """
+
+    SMOOTHING = 0.99
+    """The weight of the previous estimate when the transit time and its
+    variation are smoothed."""
+
+    VARIATION_FACTOR = 4.0
+    """The factor of the transit time variation that is added to the smoothed
+    transit time to get the adaptive playout delay."""
+
+    @staticmethod
+    def name():
+        return "Jitter Buffer Module"
+
+    @staticmethod
+    def description():
+        return "A module that reorders, buffers and plays out degraded audio."
+
+    @staticmethod
+    def input_ius():
+        return [DispatchedAudioIU]
+
+    @staticmethod
+    def output_iu():
+        return DispatchedAudioIU
+
+    def __init__(
+        self,
+        delay=0.1,
+        adaptive=True,
+        min_delay=0.02,
+        max_delay=1.0,
+        concealment="zero",
+        **kwargs
+    ):
+        """Initialize the jitter buffer module.
+
+        Args:
+            delay (float): The initial (or fixed) playout delay in seconds,
+                measured from the time the audio was produced by the sender.
+            adaptive (bool): Whether the playout delay adapts to the transit
+                time of the IUs.
+            min_delay (float): The minimum adaptive playout delay in seconds.
+            max_delay (float): The maximum adaptive playout delay in seconds.
+            concealment (str): The concealment of lost IUs (see
+                PacketLoss.CONCEALMENTS).
+        """
+        super().__init__(**kwargs)
+        if concealment not in PacketLoss.CONCEALMENTS:
+            raise ValueError("Unknown concealment %s" % concealment)
+        self.delay = delay
+        self.adaptive = adaptive
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.concealment = concealment
+        self._cond = threading.Condition()
+        self._playing = False
+        self._thread = None
+        self._reset_buffer()
+
+    def _reset_buffer(self):
+        self.playout_delay = self.delay
+        self._packets = {}
+        self._stream = None
+        self._next_offset = None
+        self._idle = False
+        self._last_arrival = None
+        self._transit = 0.0
+        self._variation = 0.0
+        self._previous = None
+        self._last_played = None
+        self._concealing = False
+        self._received = 0
+        self._played = 0
+        self._late = 0
+        self._lost = 0
+        self._buffer_delay = 0.0
+
+    def _send_time(self, offset):
+        """Return the UNIX timestamp at which the sample with the given index
+        was produced by the sender."""
+        stream = self._stream
+        return stream.stream_start + offset / (stream.rate * stream.stream_speed)
+
+    def process_iu(self, input_iu):
+        arrival = time.time()
+        if input_iu.sample_offset is None or input_iu.stream_start is None:
+            return self._create_output(input_iu, arrival)
+        with self._cond:
+            if self._stream is None or input_iu.stream_id != self._stream.stream_id:
+                self._packets.clear()
+                self._stream = input_iu
+                self._next_offset = input_iu.sample_offset
+                self._idle = False
+            elif self._idle:
+                self._next_offset = input_iu.sample_offset
+                self._idle = False
+            self._received += 1
+            self._last_arrival = arrival
+
+            # The estimates are averaged over all IUs until there are enough IUs
+            # for the exponential smoothing.
+            transit = arrival - input_iu.start_time()
+            w = min(self.SMOOTHING, 1 - 1 / self._received)
+            self._transit = w * self._transit + (1 - w) * transit
+            deviation = abs(transit - self._transit)
+            self._variation = w * self._variation + (1 - w) * deviation
+
+            if input_iu.sample_offset < self._next_offset:
+                self._late += 1
+                return None
+            self._packets[input_iu.sample_offset] = (input_iu, arrival)
+            self._cond.notify()
+        return None
+
+    def _create_output(self, input_iu, arrival):
+        output_iu = self.create_iu(input_iu)
+        output_iu.set_audio(
+            input_iu.raw_audio,
+            input_iu.nframes,
+            input_iu.rate,
+            input_iu.sample_width,
+            input_iu.channels,
+        )
+        output_iu.is_silence = input_iu.is_silence
+        output_iu.set_dispatching(input_iu.completion, input_iu.is_dispatching)
+        output_iu.copy_timeline(input_iu)
+        output_iu.meta_data["buffer-delay"] = time.time() - arrival
+        return output_iu
+
+    def _conceal_output(self, offset):
+        """Create the output IU for a missing IU, based on the last IU that was
+        played."""
+        last = self._last_played
+        samples = conceal(
+            self._previous,
+            last.nframes,
+            last.channels,
+            self.concealment,
+            not self._concealing,
+        )
+        output_iu = self.create_iu(None)
+        if samples is None:
+            nbytes = last.nframes * last.sample_width * last.channels
+            raw_audio = silence_view(nbytes)
+        else:
+            raw_audio = dsp.from_float(samples.ravel(), last.sample_width)
+        output_iu.set_audio(
+            raw_audio, last.nframes, last.rate, last.sample_width, last.channels
+        )
+        output_iu.set_dispatching(last.completion, last.is_dispatching)
+        output_iu.copy_timeline(last)
+        output_iu.sample_offset = offset
+        output_iu.meta_data["concealed"] = True
+        return output_iu
+
+    def _next_output(self):
+        """Create the output IU at the next sample index. This method has to be
+        called while holding the condition.
+
+        Returns:
+            DispatchedAudioIU: The output IU or None if there is nothing to
+            play.
+        """
+        entry = self._packets.pop(self._next_offset, None)
+        if entry is None:
+            idle_time = time.time() - self._last_arrival
+            if not self._packets and (
+                self._last_played is None or idle_time > self.playout_delay
+            ):
+                self._idle = True
+                return None
+            if self._last_played is None:
+                # There is no audio to conceal with yet, so skip the gap
+                self._next_offset = min(self._packets)
+                return None
+            output_iu = self._conceal_output(self._next_offset)
+            self._concealing = True
+            self._lost += 1
+            self._next_offset += output_iu.nframes
+            return output_iu
+
+        input_iu, arrival = entry
+        output_iu = self._create_output(input_iu, arrival)
+        self._concealing = False
+        self._played += 1
+        self._buffer_delay += output_iu.meta_data["buffer-delay"]
+        self._next_offset += input_iu.nframes
+        if not input_iu.is_silence:
+            self._last_played = input_iu
+            if self.concealment != "zero":
+                samples = dsp.to_float(input_iu.raw_audio, input_iu.sample_width)
+                self._previous = samples.reshape(-1, input_iu.channels)
+        if self.adaptive and not input_iu.is_dispatching:
+            target = self._transit + self.VARIATION_FACTOR * self._variation
+            self.playout_delay = min(max(target, self.min_delay), self.max_delay)
+        return output_iu
+
+    def _playout_loop(self):
+        """A method run in a thread that plays out the buffered IUs when they
+        are due."""
+        with self._cond:
+            while self._playing:
+                if self._next_offset is None or self._idle:
+                    self._cond.wait()
+                    continue
+                due = self._send_time(self._next_offset) + self.playout_delay
+                wait = due - time.time()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                output_iu = self._next_output()
+                if output_iu is None:
+                    continue
+                self._cond.release()
+                try:
+                    self.append(output_iu)
+                finally:
+                    self._cond.acquire()
+
+    def stats(self):
+        """Return statistics about the jitter buffer.
+
+        Returns:
+            dict: A dictionary containing the current playout delay, the mean
+            time the played IUs spent in the buffer (the delay added by the
+            buffer), the number of received, played, late and lost IUs and the
+            late loss rate (the ratio of received IUs that arrived too late).
+        """
+        with self._cond:
+            return {
+                "playout_delay": self.playout_delay,
+                "buffer_delay": (
+                    self._buffer_delay / self._played if self._played else None
+                ),
+                "received": self._received,
+                "played": self._played,
+                "late": self._late,
+                "lost": self._lost,
+                "late_loss_rate": (
+                    self._late / self._received if self._received else 0.0
+                ),
+            }
+
+    def prepare_run(self):
+        with self._cond:
+            self._playing = True
+        self._thread = threading.Thread(target=self._playout_loop)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def shutdown(self):
+        with self._cond:
+            self._playing = False
+            self._packets.clear()
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        super().reset()
+        with self._cond:
+            self._reset_buffer()
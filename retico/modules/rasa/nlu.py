@@ -1,6 +1,9 @@
 """A module for Natural Language Understanding provided by rasa_nlu"""
 
+import collections
+
 from retico.core import abstract
+from retico.core.resources import shared_resource
 from retico.core.text.common import TextIU
 from retico.core.dialogue.common import DialogueActIU
 
@@ -15,6 +18,9 @@ class RasaNLUModule(abstract.AbstractModule):
             rasa_nlu.train.
         config_file (str): The path to the json file containing the rasa nlu
             configuration.
+        lb_hypotheses (OrderedDict): The text of the current incremental input
+            IUs, keyed by the IU, so that a revoked IU can be removed in
+            constant time.
     """
 
     @staticmethod
@@ -44,7 +50,13 @@ class RasaNLUModule(abstract.AbstractModule):
         self.model_dir = model_dir
         self.interpreter = None
         self.incremental = incremental
-        self.lb_hypotheses = []
+        self.lb_hypotheses = collections.OrderedDict()
+        self.cache = None
+        self.started_prediction = False
+
+    def reset(self):
+        super().reset()
+        self.lb_hypotheses = collections.OrderedDict()
         self.cache = None
         self.started_prediction = False
 
@@ -56,14 +68,19 @@ class RasaNLUModule(abstract.AbstractModule):
             self.cache = txt
             return txt
         else:
-            self.lb_hypotheses.append(input_iu)
-            self.lb_hypotheses = [iu for iu in self.lb_hypotheses if not iu.revoked]
-            txt = ""
-            for iu in self.lb_hypotheses:
-                txt += iu.get_text()
-            if input_iu.committed:
-                self.lb_hypotheses = []
-            return txt
+            self.lb_hypotheses[input_iu] = input_iu.get_text()
+            return "".join(self.lb_hypotheses.values())
+
+    def process_revoke(self, revoked_iu):
+        self.lb_hypotheses.pop(revoked_iu, None)
+
+    def process_commit(self, committed_iu):
+        if committed_iu in self.lb_hypotheses:
+            self.lb_hypotheses.clear()
+        self.started_prediction = False
+        output_iu = self.latest_iu()
+        if output_iu is not None and output_iu.grounded_in is committed_iu:
+            self.commit(output_iu)
 
     def process_iu(self, input_iu):
         current_text = self.get_current_text(input_iu)
@@ -81,14 +98,12 @@ class RasaNLUModule(abstract.AbstractModule):
         piu = output_iu.previous_iu
         if piu:
             if piu.act != output_iu.act or piu.concepts != output_iu.concepts:
-                piu.revoked = True
-        if input_iu.committed:
-            output_iu.committed = True
-            self.started_prediction = False
-        else:
-            self.started_prediction = True
+                self.revoke(piu)
+        self.started_prediction = True
         return output_iu
 
     def setup(self):
         if self.interpreter is None:
-            self.interpreter = Interpreter.load(self.model_dir)
+            self.interpreter = shared_resource(
+                ("rasa_nlu", self.model_dir), lambda: Interpreter.load(self.model_dir)
+            )
@@ -212,6 +212,26 @@ class TurnTakingDialogueManagerModule(abstract.AbstractModule):
         self.misunderstanding = False
         self.misunderstood_concepts = {}
 
+    def reset(self):
+        """Resets the turn taking state of the agent and the state of the
+        dialogue manager, so that a new dialogue can be started.
+
+        The dialogue manager itself is kept so that its resources do not have
+        to be loaded again.
+        """
+        super().reset()
+        self.dialogue_finished = False
+        self.dialogue_started = False
+        self.me = DialogueState()
+        self.other = DialogueState()
+        self.suspended = False
+        self.tt_delay = 0.0
+        self.reset_random()
+        self.misunderstanding = False
+        self.misunderstood_concepts = {}
+        if self.dialogue_manager is not None:
+            self.dialogue_manager.reset()
+
     def reset_random(self):
         """Resets the internal random variable to a new random value between 0
         and 1.
@@ -690,7 +710,10 @@ class TurnTakingDialogueManagerModule(abstract.AbstractModule):
 
     def setup(self):
         """Sets the dialogue_finished flag to false. This may be overwritten
-        by a class to setup the dialogue manager."""
+        by a class to setup the dialogue manager.
+
+        The dialogue manager should only be created if it does not exist yet.
+        Its state is reset by the `reset` method."""
         self.dialogue_finished = False
 
     def prepare_run(self):
@@ -735,9 +758,10 @@ class AgendaDialogueManagerModule(TurnTakingDialogueManagerModule):
 
     def setup(self):
         super().setup()
-        self.dialogue_manager = AgendaDialogueManager(
-            self.aa_file, self.agenda_file, self.first_utterance
-        )
+        if self.dialogue_manager is None:
+            self.dialogue_manager = AgendaDialogueManager(
+                self.aa_file, self.agenda_file, self.first_utterance
+            )
 
 
 class NGramDialogueManagerModule(TurnTakingDialogueManagerModule):
@@ -759,6 +783,8 @@ class NGramDialogueManagerModule(TurnTakingDialogueManagerModule):
 
     def setup(self):
         super().setup()
+        if self.dialogue_manager is not None:
+            return
         if self.first_utterance:
             self.dialogue_manager = NGramDialogueManager(self.ngram_model, "callee")
         else:
@@ -35,6 +35,7 @@ class ConvSimDialogueManagerModule(dm.TurnTakingDialogueManagerModule):
 
     def setup(self):
         super().setup()
-        self.dialogue_manager = ConvSimDialogueManager(self.agenda_file,
-                                                       self.conv_folder,
-                                                       self.agent_class)
+        if self.dialogue_manager is None:
+            self.dialogue_manager = ConvSimDialogueManager(self.agenda_file,
+                                                           self.conv_folder,
+                                                           self.agent_class)
@@ -30,4 +30,5 @@ class RasaDialogueManagerModule(dm.TurnTakingDialogueManagerModule):
 
     def setup(self):
         super().setup()
-        self.dialogue_manager = RasaDialogueManager(self.model_dir)
+        if self.dialogue_manager is None:
+            self.dialogue_manager = RasaDialogueManager(self.model_dir)
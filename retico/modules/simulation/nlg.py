@@ -10,6 +10,7 @@ by taking in dialogue acts and concepts and producing a text.
 import random
 
 from retico.core import abstract
+from retico.core.resources import shared_resource
 from retico.core.text.common import GeneratedTextIU
 from retico.core.dialogue.common import DispatchableActIU
 from retico.modules.simulation.database.simulation import SimulatioDB
@@ -74,7 +75,12 @@ class SimulatedNLGModule(abstract.AbstractModule):
         return output_iu
 
     def setup(self):
-        self.db = SimulatioDB(self.data_directory, self.agent_type)
+        if self.db is not None:
+            return
+        self.db = shared_resource(
+            ("SimulatioDB", self.data_directory, self.agent_type),
+            lambda: SimulatioDB(self.data_directory, self.agent_type),
+        )
 
     def shutdown(self):
         pass
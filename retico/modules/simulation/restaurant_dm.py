@@ -72,6 +72,13 @@ class RestaurantDialogueManager(abstract.AbstractModule):
             out.payload = self.generateText(self.current_da)
             return out
 
+    def reset(self):
+        super().reset()
+        self.food_type = None
+        self.area = None
+        self.price = None
+        self.current_da = None
+
     def shutdown(self):
         self.area = None
         self.price = None
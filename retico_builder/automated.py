@@ -4,7 +4,8 @@ import shutil
 import argparse
 
 from retico.headless import load
-from retico.core.audio.io import SpeakerModule, StreamingSpeakerModule
+from retico.core.audio.io import SpeakerModule, StreamingSpeakerModule, \
+    VirtualSpeakerModule
 
 class AutomatedExecution():
 
@@ -24,25 +25,30 @@ class AutomatedExecution():
         print("SIMULATION ENDS HERE")
         self.is_running = False
 
+    def load_network(self):
+        """Loads the network once so that it can be reused for all runs."""
+        modules, _ = load(self.file)
+
+        new_modules = []
+        for module in modules:
+            if isinstance(module, (SpeakerModule, StreamingSpeakerModule)) \
+             and not self.audio_output:
+                print("Replaced speaker %s with a virtual speaker" % module)
+                module = VirtualSpeakerModule.from_speaker(module)
+            module.event_subscribe(self.end_sim_event, self.end_sim)
+            new_modules.append(module)
+        return new_modules
+
     def run_sims(self):
         if not os.path.exists(self.output_folder):
             os.mkdir(self.output_folder)
         print("Running %d simulations..." % self.num_runs)
+        modules = self.load_network()
         for i in range(self.num_runs):
             print("Running simulation %d" % i)
-            modules, _ = load(self.file)
-
-            new_modules = []
             for module in modules:
-                if isinstance(module, (SpeakerModule, StreamingSpeakerModule)) \
-                 and not self.audio_output:
-                    print("Removed speaker %s" % module)
-                    module.remove()
-                    continue
-                module.event_subscribe(self.end_sim_event, self.end_sim)
+                module.reset()
                 module.setup()
-                new_modules.append(module)
-            modules = new_modules
 
             self.is_running = True
             for module in modules:
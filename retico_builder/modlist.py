@@ -1,7 +1,7 @@
 import inspect
 
 from retico_builder.modules import audio, abstract, google, rasa, simulation, \
-    mary, net, text, trigger, convsim
+    mary, net, text, trigger, convsim, prosody
 
 INSPECT_MODULES = {
     "Audio": audio,
@@ -12,7 +12,8 @@ INSPECT_MODULES = {
     "Mary": mary,
     "Network": net,
     "Trigger": trigger,
-    "ConvSim": convsim
+    "ConvSim": convsim,
+    "Prosody": prosody
 }
 
 # MODULE_LIST = {
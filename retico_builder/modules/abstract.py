@@ -64,6 +64,7 @@ class AbstractModule(flx.PyComponent):
             return
         self.gui.setup()
         time.sleep(0.01)
+        self.retico_module.reset()
         self.retico_module.setup()
         time.sleep(0.01)
         self.gui.highlight(True, "border")
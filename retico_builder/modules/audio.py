@@ -1,19 +1,28 @@
 from flexx import flx
 from retico_builder.modules.abstract import AbstractModule
 
-from retico.core.audio import io
+from retico.core.audio import io, meter
 
 
 class AudioRecorderModule(AbstractModule):
 
     MODULE = io.AudioRecorderModule
-    PARAMETERS = {"filename": "recorded_audio.wav", "rate": 44100, "sample_width": 2}
+    PARAMETERS = {
+        "filename": "recorded_audio.wav",
+        "rate": 44100,
+        "sample_width": 2,
+        "channels": 1,
+        "buffered": False,
+        "tracks": 1,
+    }
 
     def set_content(self):
         self.gui.clear_content()
         self.gui.add_info("Filename: %s" % self.retico_module.filename)
         self.gui.add_info("Rate: %d" % self.retico_module.rate)
         self.gui.add_info("Sample Width: %d" % self.retico_module.sample_width)
+        self.gui.add_info("Channels: %d" % self.retico_module.channels)
+        self.gui.add_info("Tracks: %d" % self.retico_module.tracks)
 
 
 class AudioDispatcherModule(AbstractModule):
@@ -27,6 +36,7 @@ class AudioDispatcherModule(AbstractModule):
         "continuous": True,
         "silence": None,
         "interrupt": True,
+        "silence_span": 1,
     }
 
     def set_content(self):
@@ -39,6 +49,7 @@ class AudioDispatcherModule(AbstractModule):
         self.gui.add_info("Speed: %f" % self.retico_module.speed)
         self.gui.add_info("Continuous: %s" % self.retico_module.continuous)
         self.gui.add_info("Silence: %d" % len(self.retico_module.silence))
+        self.gui.add_info("Silence span: %d" % self.retico_module.silence_span)
 
 
 class SpeakerModule(AbstractModule):
@@ -56,13 +67,14 @@ class SpeakerModule(AbstractModule):
 class StreamingSpeakerModule(AbstractModule):
 
     MODULE = io.StreamingSpeakerModule
-    PARAMETERS = {"chunk_size": 5000, "rate": 44100, "sample_width": 2}
+    PARAMETERS = {"chunk_size": 5000, "rate": 44100, "sample_width": 2, "channels": 1}
 
     def set_content(self):
         self.gui.clear_content()
         self.gui.add_info("Chunk Size: %d" % self.retico_module.chunk_size)
         self.gui.add_info("Rate: %d" % self.retico_module.rate)
         self.gui.add_info("Sample Width: %d" % self.retico_module.sample_width)
+        self.gui.add_info("Channels: %d" % self.retico_module.channels)
 
 
 class MicrophoneModule(AbstractModule):
@@ -75,3 +87,113 @@ class MicrophoneModule(AbstractModule):
         self.gui.add_info("Chunk Size: %d" % self.retico_module.chunk_size)
         self.gui.add_info("Rate: %d" % self.retico_module.rate)
         self.gui.add_info("Sample Width: %d" % self.retico_module.sample_width)
+
+
+class AudioRechunkerModule(AbstractModule):
+
+    MODULE = io.AudioRechunkerModule
+    PARAMETERS = {"chunk_size": 5000}
+
+    def set_content(self):
+        self.gui.clear_content()
+        self.gui.add_info("Chunk Size: %d" % self.retico_module.chunk_size)
+
+
+class AudioResampleModule(AbstractModule):
+
+    MODULE = io.AudioResampleModule
+    PARAMETERS = {"rate": 44100, "sample_width": 2}
+
+    def set_content(self):
+        self.gui.clear_content()
+        self.gui.add_info("Rate: %d" % self.retico_module.rate)
+        self.gui.add_info("Sample Width: %d" % self.retico_module.sample_width)
+
+
+class AudioMixerModule(AbstractModule):
+
+    MODULE = io.AudioMixerModule
+    PARAMETERS = {
+        "chunk_size": 5000,
+        "rate": 44100,
+        "sample_width": 2,
+        "channels": 2,
+        "align": "sample",
+        "max_delay": 0.5,
+    }
+
+    def set_content(self):
+        self.gui.clear_content()
+        self.gui.add_info("Chunk Size: %d" % self.retico_module.chunk_size)
+        self.gui.add_info("Rate: %d" % self.retico_module.rate)
+        self.gui.add_info("Channels: %d" % self.retico_module.channels)
+        self.gui.add_info("Alignment: %s" % self.retico_module.align)
+
+    def update_running_info(self):
+        self.gui.update_info("Sources: %d" % len(self.retico_module.sources))
+
+
+class WaveFileSourceModule(AbstractModule):
+
+    MODULE = io.WaveFileSourceModule
+    PARAMETERS = {"files": "audio.wav", "chunk_size": 5000, "speed": 1.0, "loop": False}
+
+    def set_content(self):
+        self.gui.clear_content()
+        self.gui.add_info("Files: %s" % self.retico_module.files)
+        self.gui.add_info("Chunk Size: %d" % self.retico_module.chunk_size)
+        self.gui.add_info("Speed: %.1f" % self.retico_module.speed)
+        self.gui.add_info("Loop: %s" % self.retico_module.loop)
+
+
+class VirtualSpeakerModule(AbstractModule):
+
+    MODULE = io.VirtualSpeakerModule
+    PARAMETERS = {
+        "rate": 44100,
+        "sample_width": 2,
+        "buffer_size": 4096,
+        "output_latency": 0.02,
+    }
+
+    def set_content(self):
+        self.gui.clear_content()
+        self.gui.add_info("Rate: %d" % self.retico_module.rate)
+        self.gui.add_info("Buffer Size: %d" % self.retico_module.buffer_size)
+        self.gui.add_info("Output Latency: %.3f" % self.retico_module.output_latency)
+
+    def update_running_info(self):
+        stats = self.retico_module.stats()
+        if stats["chunks"]:
+            self.gui.update_info(
+                "Underruns: %d<br>Mean latency: %.3f s"
+                % (stats["underruns"], stats["mean_latency"])
+            )
+
+
+class AudioMeterModule(AbstractModule):
+
+    MODULE = meter.AudioMeterModule
+    PARAMETERS = {
+        "window": 5.0,
+        "clip_level": 0.999,
+        "min_dropout": 0.005,
+        "max_dropout": 0.5,
+    }
+
+    def set_content(self):
+        self.gui.clear_content()
+        self.gui.add_info("Window: %.1f s" % self.retico_module.window)
+
+    def update_running_info(self):
+        stats = self.retico_module.stats()
+        if stats["rms"] is not None:
+            self.gui.update_info(
+                "RMS: %.1f dBFS, Peak: %.1f dBFS<br>Clipping: %.2f%%, Dropouts: %d"
+                % (
+                    stats["rms"],
+                    stats["peak"],
+                    100 * stats["clip_ratio"],
+                    stats["dropouts"],
+                )
+            )
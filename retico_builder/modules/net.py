@@ -7,11 +7,12 @@ try:
     class DelayedNetworkModule(AbstractModule):
 
         MODULE = network.DelayedNetworkModule
-        PARAMETERS = {"delay": 0.5}
+        PARAMETERS = {"delay": 0.5, "jitter": 0.0, "reorder": False}
 
         def set_content(self):
             self.gui.clear_content()
             self.gui.add_info("Delay: %.2f" % self.retico_module.delay)
+            self.gui.add_info("Jitter: %.3f" % self.retico_module.jitter)
 
         def update_running_info(self):
             latest_iu = self.retico_module.latest_iu()
@@ -21,12 +22,13 @@ try:
     class PacketLossNetworkModule(AbstractModule):
 
         MODULE = network.PacketLossNetworkModule
-        PARAMETERS = {"ppl": 0.1, "burstr": 2.0}
+        PARAMETERS = {"ppl": 0.1, "burstr": 2.0, "concealment": "zero"}
 
         def set_content(self):
             self.gui.clear_content()
             self.gui.add_info("Ppl: %.2f" % self.retico_module.ppl)
             self.gui.add_info("Burstr: %.2f" % self.retico_module.burstr)
+            self.gui.add_info("Concealment: %s" % self.retico_module.concealment)
 
         def update_running_info(self):
             latest_iu = self.retico_module.latest_iu()
@@ -36,19 +38,110 @@ try:
     class DelayPacketLossNetworkModule(AbstractModule):
 
         MODULE = network.DelayPacketLossNetworkModule
-        PARAMETERS = {"delay": 0.5, "ppl": 0.1, "burstr": 2.0}
+        PARAMETERS = {
+            "delay": 0.5,
+            "ppl": 0.1,
+            "burstr": 2.0,
+            "jitter": 0.0,
+            "reorder": False,
+            "concealment": "zero",
+        }
 
         def set_content(self):
             self.gui.clear_content()
             self.gui.add_info("Delay: %.2f" % self.retico_module.delay)
+            self.gui.add_info("Jitter: %.3f" % self.retico_module.jitter)
             self.gui.add_info("Ppl: %.2f" % self.retico_module.ppl)
             self.gui.add_info("Burstr: %.2f" % self.retico_module.burstr)
+            self.gui.add_info("Concealment: %s" % self.retico_module.concealment)
 
         def update_running_info(self):
             latest_iu = self.retico_module.latest_iu()
             if latest_iu:
                 self.gui.update_info("Dum dee doo")
 
+    class TraceNetworkModule(AbstractModule):
+
+        MODULE = network.TraceNetworkModule
+        PARAMETERS = {
+            "trace": "trace.csv",
+            "offset": 0.0,
+            "loop": True,
+            "reorder": False,
+        }
+
+        def set_content(self):
+            self.gui.clear_content()
+            self.gui.add_info("Trace: %s" % self.retico_module.trace)
+            self.gui.add_info("Offset: %.2f" % self.retico_module.offset)
+            self.gui.add_info("Loop: %s" % self.retico_module.loop)
+
+    class CodecNetworkModule(AbstractModule):
+
+        MODULE = network.CodecNetworkModule
+        PARAMETERS = {"law": "ulaw", "band_limit": True, "bits": 0}
+
+        def set_content(self):
+            self.gui.clear_content()
+            self.gui.add_info("Law: %s" % self.retico_module.law)
+            self.gui.add_info("Band limit: %s" % self.retico_module.band_limit)
+            self.gui.add_info("Bits: %d" % self.retico_module.bits)
+
+    class LinkNetworkModule(AbstractModule):
+
+        MODULE = network.LinkNetworkModule
+        PARAMETERS = {
+            "bandwidth": 64000.0,
+            "burst": 0,
+            "buffer_size": 0,
+            "overhead": 40,
+            "delay": 0.0,
+        }
+
+        def set_content(self):
+            self.gui.clear_content()
+            self.gui.add_info("Bandwidth: %d bit/s" % self.retico_module.bandwidth)
+            self.gui.add_info("Buffer: %d bytes" % self.retico_module.buffer_size)
+            self.gui.add_info("Delay: %.2f" % self.retico_module.delay)
+
+        def update_running_info(self):
+            if self.retico_module.link is not None:
+                stats = self.retico_module.link.stats()
+                if stats["sent"]:
+                    self.gui.update_info(
+                        "Queuing delay: %.3f s<br>Dropped: %d"
+                        % (stats["mean_queuing_delay"], stats["dropped"])
+                    )
+
+    class JitterBufferModule(AbstractModule):
+
+        MODULE = network.JitterBufferModule
+        PARAMETERS = {
+            "delay": 0.1,
+            "adaptive": True,
+            "min_delay": 0.02,
+            "max_delay": 1.0,
+            "concealment": "zero",
+        }
+
+        def set_content(self):
+            self.gui.clear_content()
+            self.gui.add_info("Delay: %.2f" % self.retico_module.delay)
+            self.gui.add_info("Adaptive: %s" % self.retico_module.adaptive)
+            self.gui.add_info("Concealment: %s" % self.retico_module.concealment)
+
+        def update_running_info(self):
+            stats = self.retico_module.stats()
+            if stats["received"]:
+                self.gui.update_info(
+                    "Playout delay: %.3f s<br>Late: %.1f%%, Lost: %d"
+                    % (
+                        stats["playout_delay"],
+                        100 * stats["late_loss_rate"],
+                        stats["lost"],
+                    )
+                )
+
 
 except ImportError:
     pass
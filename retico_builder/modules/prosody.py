@@ -0,0 +1,35 @@
+from retico_builder.modules.abstract import AbstractModule
+
+from retico.core.prosody import vad
+
+
+class EnergyVADModule(AbstractModule):
+
+    MODULE = vad.EnergyVADModule
+    PARAMETERS = {
+        "frame_length": 0.02,
+        "energy_threshold": -40.0,
+        "max_zcr": 0.5,
+        "onset": 0.06,
+        "hangover": 0.5,
+    }
+
+    def set_content(self):
+        self.gui.clear_content()
+        self.gui.add_info(
+            "Energy Threshold: %.1f dBFS" % self.retico_module.energy_threshold
+        )
+        self.gui.add_info("Hangover: %.2f s" % self.retico_module.hangover)
+
+    def update_running_info(self):
+        latest_iu = self.retico_module.latest_iu()
+        if latest_iu and self.retico_module.energy is not None:
+            self.gui.update_info(
+                "Speaking: %s (EoT: %.2f)<br>Energy: %.1f dBFS, ZCR: %.2f"
+                % (
+                    latest_iu.is_speaking,
+                    latest_iu.probability,
+                    self.retico_module.energy,
+                    self.retico_module.zcr,
+                )
+            )
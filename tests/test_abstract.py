@@ -0,0 +1,153 @@
+import threading
+import time
+import wave
+
+from retico.core import abstract
+from retico.core.audio import io
+
+
+class SlowShutdownModule(abstract.AbstractConsumingModule):
+    @staticmethod
+    def name():
+        return "Slow Shutdown Module"
+
+    @staticmethod
+    def description():
+        return "A module that takes a while to shut down."
+
+    @staticmethod
+    def input_ius():
+        return [abstract.IncrementalUnit]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = []
+
+    def process_iu(self, input_iu):
+        return None
+
+    def setup(self):
+        self.calls.append("setup")
+
+    def shutdown(self):
+        time.sleep(0.05)
+        self.calls.append("shutdown")
+
+
+class CountingProducingModule(abstract.AbstractProducingModule):
+    @staticmethod
+    def name():
+        return "Counting Producing Module"
+
+    @staticmethod
+    def description():
+        return "A module that produces an IU whenever it is notified."
+
+    @staticmethod
+    def output_iu():
+        return abstract.IncrementalUnit
+
+    def process_iu(self, input_iu):
+        return self.create_iu()
+
+
+def test_stop_waits_for_shutdown():
+    module = SlowShutdownModule()
+    module.run()
+    module.stop()
+    assert module.calls == ["setup", "shutdown"]
+
+
+def test_reset_and_setup_after_stop_keep_order():
+    module = SlowShutdownModule()
+    for _ in range(3):
+        module.reset()
+        module.setup()
+        module.run(run_setup=False)
+        module.stop()
+    assert module.calls == ["setup", "shutdown"] * 3
+
+
+def test_stop_right_after_run():
+    module = SlowShutdownModule()
+    module.run()
+    stopper = threading.Thread(target=module.stop)
+    stopper.start()
+    stopper.join(timeout=2)
+    assert not stopper.is_alive()
+    assert module.calls[-1] == "shutdown"
+
+
+def test_stop_wakes_waiting_producing_module():
+    module = CountingProducingModule()
+    consumer = SlowShutdownModule()
+    module.subscribe(consumer)
+    module.run()
+    module.notify(2)
+    time.sleep(0.05)
+    module.stop()
+    assert module.iu_counter == 2
+
+
+def live_threads(target):
+    return [t for t in threading.enumerate() if getattr(t, "_target", None) == target]
+
+
+def reset_and_run_twice(module):
+    module.run()
+    time.sleep(0.05)
+    module.stop()
+    module.reset()
+    module.setup()
+    module.run(run_setup=False)
+    time.sleep(0.25)
+
+
+def test_reset_and_run_starts_a_single_dispatch_loop():
+    module = io.AudioDispatcherModule(1600, rate=16000)
+    reset_and_run_twice(module)
+    assert len(live_threads(module._dispatch_audio_loop)) == 1
+    module.stop()
+    assert not live_threads(module._dispatch_audio_loop)
+
+
+def test_reset_and_run_starts_a_single_pacing_loop(tmp_path):
+    path = str(tmp_path / "silence.wav")
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(16000)
+        wav_file.writeframes(bytes(2 * 32000))
+    module = io.WaveFileSourceModule(path, chunk_size=1600)
+    reset_and_run_twice(module)
+    assert len(live_threads(module._pacing_loop)) == 1
+    module.stop()
+    assert not live_threads(module._pacing_loop)
+    assert module.wave_files == []
+
+
+def test_signal_does_not_take_the_lock_of_the_module():
+    module = CountingProducingModule()
+    consumer = SlowShutdownModule()
+    module.subscribe(consumer)
+    module.run()
+    with module._ready:
+        signaller = threading.Thread(target=module.signal)
+        signaller.start()
+        signaller.join(timeout=1)
+        assert not signaller.is_alive()
+    time.sleep(0.05)
+    module.stop()
+    assert module.iu_counter == 1
+
+
+def test_microphone_callback_does_not_block():
+    module = io.MicrophoneModule(160, rate=16000)
+    with module._ready:
+        callback = threading.Thread(
+            target=module.callback, args=(bytes(320), 160, None, None)
+        )
+        callback.start()
+        callback.join(timeout=1)
+        assert not callback.is_alive()
+    assert module._pending()
@@ -0,0 +1,69 @@
+from retico.core import abstract
+from retico.core.text.asr import IncrementalizeASRModule
+from retico.core.text.common import SpeechRecognitionIU
+
+
+def recognition_iu(text, final):
+    iu = SpeechRecognitionIU(creator=None, iuid=0)
+    iu.set_asr_results([(text, 1.0, 1.0, final)], text, 1.0, 1.0, final)
+    return iu
+
+
+def drain(q):
+    messages = []
+    while not q.empty():
+        message = q.get()
+        messages.append((message.update_type, message.iu.get_text()))
+    return messages
+
+
+def test_final_result_is_added_and_committed():
+    module = IncrementalizeASRModule()
+    q = module.queue_class(module, None)
+    module.add_right_buffer(q)
+
+    module._process_update(abstract.UpdateMessage(recognition_iu("hello", False)))
+    module._process_update(abstract.UpdateMessage(recognition_iu("hello world", True)))
+
+    assert drain(q) == [
+        (abstract.UpdateType.ADD, "hello"),
+        (abstract.UpdateType.ADD, " world"),
+        (abstract.UpdateType.COMMIT, " world"),
+    ]
+    assert module.latest_iu().committed
+
+
+class CommitRecorder(abstract.AbstractConsumingModule):
+    @staticmethod
+    def name():
+        return "Commit Recorder"
+
+    @staticmethod
+    def description():
+        return "A module that records the IUs that were committed."
+
+    @staticmethod
+    def input_ius():
+        return [SpeechRecognitionIU]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.committed = []
+
+    def process_iu(self, input_iu):
+        return None
+
+    def process_commit(self, committed_iu):
+        self.committed.append(committed_iu)
+
+
+def test_commit_reaches_process_commit():
+    module = IncrementalizeASRModule()
+    recorder = CommitRecorder()
+    module.subscribe(recorder)
+    module._process_update(abstract.UpdateMessage(recognition_iu("yes", True)))
+
+    q = recorder.left_buffers()[0]
+    while not q.empty():
+        recorder._process_update(q.get())
+    assert recorder.committed == [module.latest_iu()]
@@ -0,0 +1,131 @@
+import time
+import wave
+
+import numpy as np
+import pytest
+
+from retico.core.audio import common, dsp, io
+from retico.core.audio.common import AudioIU
+
+
+def audio_iu(samples, rate, channels=1, sample_offset=None):
+    iu = AudioIU(creator=None, iuid=0)
+    raw_audio = dsp.from_float(samples, 2)
+    iu.set_audio(raw_audio, len(raw_audio) // channels, rate, 2, channels)
+    iu.sample_offset = sample_offset
+    return iu
+
+
+def sine(frequency, rate, nframes, amplitude=0.5):
+    t = np.arange(nframes) / rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def test_resample_keeps_channels_apart():
+    module = io.AudioResampleModule(rate=32000)
+    left = sine(440, 16000, 16000)
+    right = np.zeros_like(left)
+    stereo = np.stack((left, right), axis=1).ravel()
+    outputs = []
+    for chunk in np.split(stereo, 50):
+        output_iu = module.process_iu(audio_iu(chunk, 16000, channels=2))
+        if output_iu is not None:
+            outputs.append(output_iu)
+    assert all(iu.channels == 2 for iu in outputs)
+    frames = sum(iu.nframes for iu in outputs)
+    samples = np.concatenate(
+        [np.frombuffer(iu.audio_view(), np.int16) for iu in outputs]
+    )
+    assert len(samples) == 2 * frames
+    samples = samples.reshape(-1, 2)
+    assert not samples[:, 1].any()
+    assert np.abs(samples[:, 0]).max() > 10000
+
+
+def test_resample_frame_count_of_stereo_input():
+    module = io.AudioResampleModule(rate=16000)
+    output_iu = module.process_iu(audio_iu(np.zeros(640, np.float32), 16000, 2))
+    assert output_iu.nframes == 320
+    assert output_iu.channels == 2
+
+
+def test_speaker_callback_does_not_allocate_silence(monkeypatch):
+    monkeypatch.setattr(common, "_silence", bytes(0))
+    speaker = io.StreamingSpeakerModule(chunk_size=441)
+    silence = common._silence
+    data, _ = speaker.callback(None, 441, None, None)
+    assert common._silence is silence
+    assert not any(data)
+
+
+def write_wave(path, samples, rate=16000):
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(dsp.from_float(samples, 2).tobytes())
+
+
+def test_wave_file_source_as_fast_as_possible_has_a_timeline(tmp_path):
+    path = tmp_path / "sine.wav"
+    write_wave(path, sine(440, 16000, 4000))
+    module = io.WaveFileSourceModule(str(path), chunk_size=1600, speed=0)
+    module.setup()
+    first = module.process_iu(None)
+    second = module.process_iu(None)
+    assert second.start_time() - first.start_time() == pytest.approx(0.1)
+    assert first.end_time() == pytest.approx(second.start_time())
+    assert first.overlap(second) == 0.0
+    module.reset()
+    assert module.process_iu(None).start_sample() == 0
+
+
+def run_dispatcher(dispatcher, duration, speech_at=None, speech=None):
+    q = dispatcher.queue_class(dispatcher, None)
+    dispatcher.add_right_buffer(q)
+    dispatcher.prepare_run()
+    if speech_at is not None:
+        time.sleep(speech_at)
+        dispatcher.process_iu(speech)
+        time.sleep(duration - speech_at)
+    else:
+        time.sleep(duration)
+    dispatcher.shutdown()
+    time.sleep(0.05)
+    ius = []
+    while not q.empty():
+        ius.append(q.get().iu)
+    return ius
+
+
+def test_silence_spans_are_dispatched_when_they_start():
+    dispatcher = io.AudioDispatcherModule(160, rate=16000, silence_span=10)
+    ius = run_dispatcher(dispatcher, 0.5)
+    assert ius[0].nframes == 160 and not ius[0].is_silence
+    spans = ius[1:]
+    assert spans and all(iu.is_silence and iu.nframes == 1600 for iu in spans)
+    for previous, iu in zip(ius, ius[1:]):
+        assert iu.start_sample() == previous.end_sample()
+    for iu in spans:
+        assert iu.created_at - iu.start_time() < 0.015
+
+
+def test_speech_starts_after_the_current_span():
+    dispatcher = io.AudioDispatcherModule(160, rate=16000, silence_span=10)
+    speech = common.SpeechIU(creator=None, iuid=0)
+    speech.set_audio(bytes(3200), 1600, 16000, 2)
+    speech.dispatch = True
+    ius = run_dispatcher(dispatcher, 0.4, speech_at=0.15, speech=speech)
+    for previous, iu in zip(ius, ius[1:]):
+        assert iu.start_sample() == previous.end_sample()
+    speech_ius = [iu for iu in ius if iu.is_dispatching]
+    assert len(speech_ius) == 10
+    assert speech_ius[0].start_sample() % 1600 == 160
+
+
+def test_streaming_speaker_buffers_silence_spans():
+    speaker = io.StreamingSpeakerModule(chunk_size=160, rate=16000)
+    span = AudioIU(creator=None, iuid=0)
+    span.set_silence(1600, 16000, 2)
+    speaker.process_iu(span)
+    assert speaker.audio_buffer.available() == 3200
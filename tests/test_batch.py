@@ -0,0 +1,116 @@
+import csv
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from retico.modules.net import batch as net_batch
+from retico.modules.net.degradations import (
+    Delay,
+    PacketLoss,
+    TraceDegradation,
+    load_trace,
+)
+
+
+def write_wave(path, samples, rate=8000, sample_width=2):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(sample_width)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(samples.tobytes())
+
+
+def tone(nframes, dtype=np.int16, amplitude=8000, offset=0):
+    t = np.arange(nframes) / 8000
+    return (offset + amplitude * np.sin(2 * np.pi * 440 * t)).astype(dtype)
+
+
+def packet_batch(npackets, sample_width=2):
+    dtype = np.uint8 if sample_width == 1 else np.int16
+    samples = np.full(npackets * 160, 100, dtype=dtype)
+    return net_batch.PacketBatch(samples, 8000, sample_width, 1, 160)
+
+
+def test_parse_chain():
+    chain = net_batch.parse_chain(
+        ["delay:delay=0.1,reorder=true", "packetloss:ppl=0.1,burstr=2,seed=none"]
+    )
+    assert chain == [
+        ("delay", {"delay": 0.1, "reorder": True}),
+        ("packetloss", {"ppl": 0.1, "burstr": 2, "seed": None}),
+    ]
+    with pytest.raises(ValueError):
+        net_batch.parse_chain(["jitter:delay=1"])
+
+
+def test_delay_keeps_order_without_reorder():
+    packets = packet_batch(200)
+    Delay(0.1, jitter=0.05, seed=1).degrade_batch(packets)
+    transit = packets.release_times - packets.send_times
+    assert (transit >= 0.05).all()
+    assert (np.diff(packets.release_times) >= 0).all()
+
+
+def test_losses_of_the_chain_are_combined(tmp_path):
+    trace = tmp_path / "trace.csv"
+    trace.write_text("delay,lost\n" + "0.01,0\n0.01,1\n" * 50)
+    expected = packet_batch(100)
+    PacketLoss(0.3, 2, seed=3).degrade_batch(expected)
+    packet_loss = np.asarray(expected.meta["packet-loss"])
+    assert packet_loss.any()
+
+    packets = packet_batch(100)
+    PacketLoss(0.3, 2, seed=3).degrade_batch(packets)
+    TraceDegradation(load_trace(str(trace))).degrade_batch(packets)
+    trace_loss = np.arange(100) % 2 == 1
+    lost = np.asarray(packets.meta["packet-loss"])
+    assert np.array_equal(lost, packet_loss | trace_loss)
+    assert not packets.samples[lost].any()
+    assert (packets.samples[~lost] == 100).all()
+
+
+def test_lost_8_bit_packets_are_silent():
+    packets = packet_batch(100, sample_width=1)
+    PacketLoss(0.5, 2, seed=1).degrade_batch(packets)
+    lost = np.asarray(packets.meta["packet-loss"])
+    assert lost.any()
+    assert (packets.samples[lost] == 128).all()
+    assert (packets.samples[~lost] == 100).all()
+
+
+def test_degrade_file_marks_late_packets(tmp_path):
+    write_wave(tmp_path / "in.wav", tone(8000))
+    packets = net_batch.degrade_file(
+        str(tmp_path / "in.wav"),
+        str(tmp_path / "out.wav"),
+        [Delay(0.1, jitter=0.1, distribution="normal", seed=2)],
+        playout_delay=0.15,
+        metadata_path=str(tmp_path / "out.csv"),
+    )
+    with wave.open(str(tmp_path / "out.wav"), "rb") as wav_file:
+        assert wav_file.getnframes() == 8000
+        output = np.frombuffer(wav_file.readframes(8000), np.int16)
+    with open(tmp_path / "out.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == len(packets) == 50
+    late = np.array([row["late"] == "1" for row in rows])
+    assert late.any() and not late.all()
+    frames = output.reshape(-1, 160)
+    assert not frames[late].any()
+    assert frames[~late].any(axis=1).all()
+
+
+def test_files_with_the_same_name_are_kept_apart(tmp_path):
+    for corpus in ("rnv1", "sct11"):
+        write_wave(tmp_path / "data" / corpus / "audio" / "conv01.wav", tone(1600))
+    inputs = [str(tmp_path / "data" / c / "audio") for c in ("rnv1", "sct11")]
+    chain = net_batch.parse_chain(["packetloss:ppl=0.2,burstr=1,seed=1"])
+    outputs = net_batch.degrade_files(inputs, str(tmp_path / "out"), chain)
+    assert sorted(outputs) == [
+        str(tmp_path / "out" / c / "audio" / "conv01.wav") for c in ("rnv1", "sct11")
+    ]
+    for output in outputs:
+        assert os.path.exists(os.path.splitext(output)[0] + ".csv")
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from retico.core.audio import dsp
+
+
+def sine(frequency, rate, duration, amplitude=0.5):
+    t = np.arange(int(rate * duration)) / rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+@pytest.mark.parametrize("from_rate,to_rate", [(16000, 44100), (44100, 16000)])
+def test_resample_length_and_content(from_rate, to_rate):
+    samples = sine(440, from_rate, 0.5)
+    output = dsp.resample(samples, from_rate, to_rate)
+    assert len(output) == -(-len(samples) * to_rate // from_rate)
+    expected = sine(440, to_rate, 0.5)[: len(output)]
+    delay = dsp.HALF_WIDTH * max(1, to_rate // from_rate) * 2
+    assert np.allclose(output[delay:-delay], expected[delay:-delay], atol=0.02)
+
+
+def test_resampler_is_independent_of_chunk_size():
+    samples = sine(300, 16000, 0.3)
+    whole = dsp.resample(samples, 16000, 22050)
+    resampler = dsp.Resampler(16000, 22050)
+    chunks = [resampler.process(c) for c in np.array_split(samples, 37)]
+    chunked = np.concatenate(chunks + [resampler.flush()])
+    assert np.allclose(whole, chunked, atol=1e-6)
+
+
+def test_convert_sample_width_roundtrip():
+    samples = np.array([-32768, -1, 0, 1, 32767], dtype=np.int16)
+    wide = dsp.convert_sample_width(samples, 2, 4)
+    assert wide.dtype == np.int32
+    assert np.array_equal(dsp.convert_sample_width(wide, 4, 2), samples)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from retico.core.audio import g711
+
+
+@pytest.mark.parametrize("law,zero_code", [("ulaw", 0xFF), ("alaw", 0xD5)])
+def test_encode_silence(law, zero_code):
+    assert g711.encode(np.zeros(4, np.int16), law).tolist() == [zero_code] * 4
+
+
+@pytest.mark.parametrize("law", g711.LAWS)
+def test_decoded_codes_are_fixed_points(law):
+    codes = np.arange(256, dtype=np.uint8)
+    decoded = g711.decode(codes, law)
+    assert np.array_equal(g711.decode(g711.encode(decoded, law), law), decoded)
+
+
+@pytest.mark.parametrize("law", g711.LAWS)
+def test_roundtrip_error_is_relative(law):
+    samples = np.arange(-32768, 32768, 7, dtype=np.int32).astype(np.int16)
+    output = g711.roundtrip(samples, law).astype(np.int32)
+    assert np.array_equal(output, g711.decode(g711.encode(samples, law), law))
+    error = np.abs(output - samples)
+    assert (error <= np.maximum(np.abs(samples.astype(np.int32)) / 16, 16)).all()
+    assert (np.sign(output) * np.sign(samples) >= 0).all()
+
+
+def test_unknown_law():
+    with pytest.raises(ValueError):
+        g711.tables("gsm")
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_matches_audioop():
+    audioop = pytest.importorskip("audioop")
+    samples = np.arange(-32768, 32768, dtype=np.int32).astype(np.int16)
+    raw_audio = samples.tobytes()
+    ulaw = np.frombuffer(audioop.lin2ulaw(raw_audio, 2), np.uint8)
+    alaw = np.frombuffer(audioop.lin2alaw(raw_audio, 2), np.uint8)
+    assert np.array_equal(g711.encode(samples, "ulaw"), ulaw)
+    assert np.array_equal(g711.encode(samples, "alaw"), alaw)
@@ -0,0 +1,127 @@
+import pickle
+import threading
+import time
+
+from retico.core import abstract, resources
+from retico.host import MultiNetworkHost
+
+LOADS = []
+
+
+def load_corpus():
+    LOADS.append(threading.current_thread())
+    time.sleep(0.05)
+    return {"hello": "world"}
+
+
+class CountingSourceModule(abstract.AbstractProducingModule):
+    @staticmethod
+    def name():
+        return "Counting Source Module"
+
+    @staticmethod
+    def description():
+        return "A module that produces a fixed number of IUs when it is run."
+
+    @staticmethod
+    def output_iu():
+        return abstract.IncrementalUnit
+
+    def __init__(self, count=3, **kwargs):
+        super().__init__(**kwargs)
+        self.count = count
+
+    def prepare_run(self):
+        self.notify(self.count)
+
+    def process_iu(self, input_iu):
+        return self.create_iu()
+
+
+class CollectingSinkModule(abstract.AbstractConsumingModule):
+    @staticmethod
+    def name():
+        return "Collecting Sink Module"
+
+    @staticmethod
+    def description():
+        return "A module that collects IUs and ends the dialogue."
+
+    @staticmethod
+    def input_ius():
+        return [abstract.IncrementalUnit]
+
+    def __init__(self, count=3, **kwargs):
+        super().__init__(**kwargs)
+        self.count = count
+        self.corpus = None
+        self.received = []
+
+    def setup(self):
+        self.corpus = resources.shared_resource(("test", "corpus"), load_corpus)
+
+    def reset(self):
+        super().reset()
+        self.received = []
+
+    def process_iu(self, input_iu):
+        self.received.append(input_iu)
+        if len(self.received) == self.count:
+            self.event_call("dialogue_end")
+
+
+def write_template(path, count):
+    template = [
+        [
+            {"retico_class": CountingSourceModule, "args": {"count": count}, "id": 1},
+            {"retico_class": CollectingSinkModule, "args": {"count": count}, "id": 2},
+        ],
+        [(2, 1)],
+    ]
+    with open(path, "wb") as f:
+        pickle.dump(template, f)
+
+
+def make_host(tmp_path, num_instances=3, count=3):
+    filename = str(tmp_path / "network.rtc")
+    write_template(filename, count)
+    return MultiNetworkHost(
+        filename, num_instances, output_folder=str(tmp_path / "out")
+    )
+
+
+def parts(instance):
+    source = [m for m in instance.modules if isinstance(m, CountingSourceModule)]
+    sink = [m for m in instance.modules if isinstance(m, CollectingSinkModule)]
+    return source[0], sink[0]
+
+
+def test_shared_resource_is_loaded_once_under_concurrent_setup(tmp_path):
+    resources.clear_resources()
+    del LOADS[:]
+    host = make_host(tmp_path, num_instances=8)
+    host.instances = [host.create_instance(i) for i in range(host.num_instances)]
+    threads = [threading.Thread(target=i.setup) for i in host.instances]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(LOADS) == 1
+    corpora = [parts(i)[1].corpus for i in host.instances]
+    assert all(c is corpora[0] for c in corpora)
+    resources.clear_resources()
+
+
+def test_reset_and_run_gives_independent_results(tmp_path):
+    resources.clear_resources()
+    host = make_host(tmp_path, num_instances=3, count=4)
+    host.setup()
+    for _ in range(2):
+        results = host.run(timeout=5)
+        assert [r["finished"] for r in results] == [True] * 3
+        for instance in host.instances:
+            source, sink = parts(instance)
+            assert [iu.iuid for iu in sink.received] == [0, 1, 2, 3]
+            assert all(iu.creator is source for iu in sink.received)
+        host.reset()
+    resources.clear_resources()
@@ -0,0 +1,94 @@
+import time
+
+import numpy as np
+import pytest
+
+from retico.core.audio.common import AudioTimeline, DispatchedAudioIU
+from retico.modules.net.network import JitterBufferModule
+
+RATE = 16000
+CHUNK = 320  # 20 ms
+
+
+def packet(timeline, index, dispatching=True):
+    iu = DispatchedAudioIU(creator=None, iuid=index)
+    iu.set_audio(np.full(CHUNK, index + 1, np.int16), CHUNK, RATE, 2)
+    iu.set_dispatching(1.0 if dispatching else 0.0, dispatching)
+    iu.set_timeline(timeline, index * CHUNK)
+    return iu
+
+
+def play(jitter_buffer, arrivals, count, dispatching=True):
+    """Send packets to the jitter buffer at the given times (in seconds after
+    the start of the stream) and return the played IUs."""
+    q = jitter_buffer.queue_class(jitter_buffer, None)
+    jitter_buffer.add_right_buffer(q)
+    timeline = AudioTimeline(RATE, "test")
+    timeline.start()
+    jitter_buffer.prepare_run()
+    for index, arrival in sorted(arrivals.items(), key=lambda item: item[1]):
+        wait = timeline.start_time + arrival - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        jitter_buffer.process_iu(packet(timeline, index, dispatching))
+    time.sleep(count * CHUNK / RATE + 0.3 - (time.time() - timeline.start_time))
+    jitter_buffer.shutdown()
+    played = []
+    while not q.empty():
+        played.append(q.get().iu)
+    return played
+
+
+def test_reorders_conceals_and_discards_late_packets():
+    count = 20
+    arrivals = {i: i * 0.02 + 0.01 for i in range(count)}
+    del arrivals[5]  # lost
+    arrivals[8], arrivals[9] = arrivals[9], arrivals[8]  # reordered
+    arrivals[15] = 15 * 0.02 + 0.2  # arrives after it was due
+    jitter_buffer = JitterBufferModule(delay=0.1, adaptive=False)
+    played = play(jitter_buffer, arrivals, count)
+
+    # After the last packet, the buffer conceals until no packet arrived for
+    # the playout delay
+    assert all(iu.meta_data.get("concealed") for iu in played[count:])
+    played = played[:count]
+    assert [iu.sample_offset for iu in played] == [i * CHUNK for i in range(count)]
+    concealed = [i for i, iu in enumerate(played) if iu.meta_data.get("concealed")]
+    assert concealed == [5, 15]
+    for index, iu in enumerate(played):
+        if index not in concealed:
+            assert (iu.samples() == index + 1).all()
+        else:
+            assert not iu.samples().any()
+    stats = jitter_buffer.stats()
+    assert (stats["played"], stats["late"]) == (18, 1)
+
+
+def test_playout_is_delayed_by_the_playout_delay():
+    arrivals = {i: i * 0.02 for i in range(10)}
+    jitter_buffer = JitterBufferModule(delay=0.1, adaptive=False)
+    played = play(jitter_buffer, arrivals, 10)
+    assert len(played) == 10
+    for iu in played:
+        assert iu.created_at - iu.start_time() == pytest.approx(0.1, abs=0.015)
+
+
+def test_adaptive_delay_follows_the_transit_time():
+    arrivals = {i: i * 0.02 + 0.05 for i in range(40)}
+    jitter_buffer = JitterBufferModule(delay=0.3, min_delay=0.02)
+    play(jitter_buffer, arrivals, 40, dispatching=False)
+    assert 0.04 < jitter_buffer.playout_delay < 0.1
+
+
+def test_delay_is_not_adapted_during_speech():
+    arrivals = {i: i * 0.02 + 0.05 for i in range(20)}
+    jitter_buffer = JitterBufferModule(delay=0.3, min_delay=0.02)
+    play(jitter_buffer, arrivals, 20)
+    assert jitter_buffer.playout_delay == 0.3
+    jitter_buffer.reset()
+    assert jitter_buffer.stats()["received"] == 0
+
+
+def test_unknown_concealment():
+    with pytest.raises(ValueError):
+        JitterBufferModule(concealment="noise")
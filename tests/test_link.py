@@ -0,0 +1,40 @@
+import math
+
+import pytest
+
+from retico.core.audio.common import AudioIU
+from retico.modules.net.degradations import Link
+
+
+def packet(nbytes, created_at):
+    iu = AudioIU(creator=None, iuid=0)
+    iu.set_audio(bytes(nbytes), nbytes // 2, 16000, 2)
+    iu.created_at = created_at
+    return iu
+
+
+def send(link, iu):
+    return link.schedule(iu, iu, None)
+
+
+@pytest.mark.parametrize("burst", [0, 10000])
+def test_burst_does_not_exceed_bandwidth(burst):
+    link = Link(bandwidth=80000, burst=burst, overhead=0)
+    releases = [send(link, packet(1000, 0.0)) for _ in range(8)]
+    # Every packet takes 0.1 seconds on the wire
+    assert releases == pytest.approx([0.1 * (i + 1) for i in range(8)])
+
+
+def test_idle_link_only_adds_serialization_delay():
+    link = Link(bandwidth=80000, overhead=0)
+    assert send(link, packet(1000, 0.0)) == pytest.approx(0.1)
+    assert send(link, packet(1000, 1.0)) == pytest.approx(1.1)
+    assert link.stats()["mean_queuing_delay"] == 0.0
+
+
+def test_tail_drop():
+    link = Link(bandwidth=80000, buffer_size=2000, overhead=0)
+    results = [send(link, packet(1000, 0.0)) for _ in range(5)]
+    assert results[:3] == pytest.approx([0.1, 0.2, 0.3])
+    assert results[3:] == [math.inf, math.inf]
+    assert link.stats()["dropped"] == 2
@@ -0,0 +1,86 @@
+import gc
+
+from retico.core import abstract
+from retico.core.audio.common import AudioIU
+from retico.core.debug.memory import IUMemoryTracker, iu_size
+
+
+class HoldingModule(abstract.AbstractConsumingModule):
+    @staticmethod
+    def name():
+        return "Holding Module"
+
+    @staticmethod
+    def description():
+        return "A module that keeps every IU it receives."
+
+    @staticmethod
+    def input_ius():
+        return [abstract.IncrementalUnit]
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.held = []
+
+    def process_iu(self, input_iu):
+        self.held.append(input_iu)
+
+
+def tracked(tracker):
+    tracker.enable()
+    try:
+        return [abstract.IncrementalUnit(iuid=i) for i in range(3)]
+    finally:
+        tracker.disable()
+
+
+def test_tracker_counts_only_live_ius():
+    tracker = IUMemoryTracker()
+    ius = tracked(tracker)
+    abstract.IncrementalUnit(iuid=99)
+    assert tracker.total_created == 3
+    del ius[1:]
+    gc.collect()
+    snapshot = tracker.snapshot()
+    assert snapshot["live"] == 1
+    assert snapshot["created"] == 3
+    assert snapshot["per_type"]["IncrementalUnit"]["count"] == 1
+
+
+def test_shared_buffers_are_counted_once():
+    tracker = IUMemoryTracker()
+    tracker.enable()
+    try:
+        data = bytes(1000)
+        first = AudioIU(iuid=0)
+        first.set_audio(data, 500, 16000, 2)
+        second = AudioIU(iuid=1)
+        second.set_audio(data, 500, 16000, 2)
+    finally:
+        tracker.disable()
+    single = iu_size(first)
+    assert single >= 1000
+    assert tracker.snapshot()["bytes"] < 2 * single
+
+
+def test_find_stale_reports_old_ius_held_by_a_module():
+    tracker = IUMemoryTracker()
+    module = HoldingModule()
+    held, linked = abstract.IncrementalUnit(iuid=0), abstract.IncrementalUnit(iuid=1)
+    held.created_at -= 120
+    linked.created_at -= 120
+    module.process_iu(held)
+    module.process_iu(abstract.IncrementalUnit(iuid=2))
+    q = module.queue_class(None, module)
+    q.put(abstract.UpdateMessage(abstract.IncrementalUnit(iuid=3, previous_iu=linked)))
+    module.add_left_buffer(q)
+    stale = tracker.find_stale([module], max_age=60)
+    assert sorted((path, iu.iuid) for _, path, iu in stale) == [
+        ("_left_buffers[0][0].previous_iu", 1),
+        ("held[0]", 0),
+    ]
+    snapshot = tracker.snapshot([module], max_age=60)
+    assert sorted(s["path"] for s in snapshot["stale"]) == [
+        "_left_buffers[0][0].previous_iu",
+        "held[0]",
+    ]
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from retico.core.audio.common import AudioIU
+from retico.core.audio.meter import AudioMeterModule, zero_runs
+
+RATE = 1000
+
+
+def runs(values):
+    leading, inner, trailing = zero_runs(np.array(values, dtype=bool))
+    return leading, list(inner), trailing
+
+
+def test_zero_runs_edge_cases():
+    assert runs([]) == (0, [], 0)
+    assert runs([0, 0, 0]) == (0, [], 0)
+    assert runs([1, 1, 1]) == (3, [], 0)
+    assert runs([1, 0, 1]) == (1, [], 1)
+    assert runs([1, 1, 0, 1, 0, 0, 1, 1, 1, 0]) == (2, [1, 3], 0)
+    assert runs([0, 1, 1, 0, 1, 0]) == (0, [2, 1], 0)
+    assert runs([0, 1, 0, 1, 1]) == (0, [1], 2)
+
+
+def chunk(levels, silence=False):
+    iu = AudioIU(creator=None, iuid=0)
+    if silence:
+        iu.set_silence(len(levels), RATE, 2)
+    else:
+        samples = np.asarray(levels, dtype=np.int16)
+        iu.set_audio(samples.tobytes(), len(samples), RATE, 2)
+    return iu
+
+
+def audio(n):
+    return [1000] * n
+
+
+def silence(n):
+    return [0] * n
+
+
+def test_runs_across_ius_are_measured_as_a_whole():
+    meter = AudioMeterModule(window=10, min_dropout=0.005, max_dropout=0.1)
+    meter.process_iu(chunk(audio(50) + silence(20)))
+    meter.process_iu(chunk(silence(100)))
+    meter.process_iu(chunk(silence(10) + audio(40)))
+    stats = meter.stats()
+    assert stats["dropouts"] == 0
+    assert stats["silent_run"] == 0.0
+    meter.process_iu(chunk(audio(10) + silence(10) + audio(10)))
+    meter.process_iu(chunk(silence(30), silence=True))
+    meter.process_iu(chunk(audio(10)))
+    stats = meter.stats()
+    assert stats["dropouts"] == 2
+    assert stats["dropout_time"] == pytest.approx(0.04)
+
+
+def test_leading_silence_and_short_runs_are_no_dropouts():
+    meter = AudioMeterModule(window=10, min_dropout=0.005, max_dropout=0.1)
+    meter.process_iu(chunk(silence(50)))
+    meter.process_iu(chunk(audio(10) + silence(4) + audio(10) + silence(30)))
+    stats = meter.stats()
+    assert stats["total_dropouts"] == 0
+    assert stats["silent_run"] == pytest.approx(0.03)
+
+
+def test_dropouts_leave_the_window_with_the_audio():
+    meter = AudioMeterModule(window=0.1, min_dropout=0.005, max_dropout=0.1)
+    first = chunk(audio(10) + silence(10) + audio(10))
+    first.created_at -= 3600
+    meter.process_iu(first)
+    assert meter.stats()["dropouts"] == 1
+    meter.process_iu(chunk(audio(70)))
+    assert meter.stats()["dropouts"] == 1
+    meter.process_iu(chunk(audio(40)))
+    stats = meter.stats()
+    assert stats["dropouts"] == 0
+    assert stats["total_dropouts"] == 1
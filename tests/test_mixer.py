@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from retico.core.audio import dsp, io
+from retico.core.audio.common import AudioIU
+
+RATE = 1000
+
+
+def source_iu(source, value, nframes, sample_offset=None, silence=False):
+    iu = AudioIU(creator=source, iuid=0)
+    if silence:
+        iu.set_silence(nframes, RATE, 2)
+    else:
+        samples = np.full(nframes, value, dtype=np.float32)
+        iu.set_audio(dsp.from_float(samples, 2), nframes, RATE, 2)
+    iu.sample_offset = sample_offset
+    return iu
+
+
+def mix(module, ius):
+    q = module.queue_class(module, None)
+    module.add_right_buffer(q)
+    for iu in ius:
+        module.process_iu(iu)
+    outputs = []
+    while not q.empty():
+        outputs.append(q.get().iu)
+    return outputs
+
+
+def levels(output_iu):
+    return dsp.to_float(output_iu.raw_audio, output_iu.sample_width)
+
+
+def test_mono_mix_waits_for_all_sources():
+    module = io.AudioMixerModule(100, rate=RATE, channels=1)
+    assert mix(module, [source_iu("b", 0.2, 50, 0), source_iu("a", 0.1, 100, 0)]) == []
+    outputs = mix(module, [source_iu("b", 0.2, 50, 50)])
+    assert len(outputs) == 1
+    assert outputs[0].start_sample() == 0
+    assert levels(outputs[0]) == pytest.approx(np.full(100, 0.3), abs=1e-3)
+
+
+def test_each_source_gets_its_own_channel():
+    module = io.AudioMixerModule(100, rate=RATE, channels=2)
+    outputs = mix(
+        module,
+        [
+            source_iu("a", 0.1, 50, 0),
+            source_iu("b", 0.2, 100, 0),
+            source_iu("a", 0.1, 50, 50),
+        ],
+    )
+    assert len(outputs) == 1
+    assert outputs[0].channels == 2
+    samples = levels(outputs[0]).reshape(-1, 2)
+    assert samples[:, 0] == pytest.approx(np.full(100, 0.1), abs=1e-3)
+    assert samples[:, 1] == pytest.approx(np.full(100, 0.2), abs=1e-3)
+
+
+def test_stalled_source_does_not_stall_the_mix():
+    module = io.AudioMixerModule(100, rate=RATE, channels=1, max_delay=0.01)
+    ius = [source_iu("a", 0.1, 50, 0), source_iu("b", 0.2, 300, 0)]
+    outputs = mix(module, ius)
+    assert [o.start_sample() for o in outputs] == [0, 100]
+    first = levels(outputs[0])
+    assert first[:50] == pytest.approx(np.full(50, 0.3), abs=1e-3)
+    assert first[50:] == pytest.approx(np.full(50, 0.2), abs=1e-3)
+
+
+def test_silence_spans_are_not_mixed_and_late_audio_is_dropped():
+    module = io.AudioMixerModule(100, rate=RATE, channels=1)
+    ius = [source_iu("a", 0.1, 50, 0), source_iu("b", 0.0, 200, None, silence=True)]
+    assert mix(module, ius) == []
+    outputs = mix(module, [source_iu("a", 0.1, 150, 50)])
+    assert [o.start_sample() for o in outputs] == [0, 100]
+    assert levels(outputs[0]) == pytest.approx(np.full(100, 0.1), abs=1e-3)
+    ius = [source_iu("b", 0.5, 150, 150), source_iu("a", 0.1, 100, 200)]
+    outputs = mix(module, ius)
+    assert [o.start_sample() for o in outputs] == [200]
+    assert levels(outputs[0]) == pytest.approx(np.full(100, 0.6), abs=1e-3)
@@ -0,0 +1,69 @@
+import math
+import time
+
+from retico.core.audio.common import DispatchedAudioIU
+from retico.modules.net.degradations import Degradation
+from retico.modules.net.network import NetworkModule
+
+
+class FixedSchedule(Degradation):
+    @staticmethod
+    def name():
+        return "Fixed Schedule"
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.start = time.time()
+
+    def degrade(self, iu, original_iu):
+        return iu
+
+    def schedule(self, iu, original_iu, release_at):
+        delay = self.delays.pop(0)
+        if delay is None or delay == math.inf:
+            return delay
+        return self.start + delay
+
+
+def packet(index):
+    iu = DispatchedAudioIU(creator=None, iuid=index)
+    iu.set_audio(bytes(20), 10, 1000, 2)
+    iu.set_dispatching(1.0, True)
+    return iu
+
+
+def send(delays, wait=0.15):
+    module = NetworkModule()
+    module.add_degradation(FixedSchedule(delays))
+    q = module.queue_class(module, None)
+    module.add_right_buffer(q)
+    module.prepare_run()
+    for index in range(len(delays)):
+        module.process_iu(packet(index))
+    time.sleep(wait)
+    released = []
+    while not q.empty():
+        released.append(q.get().iu.grounded_in.iuid)
+    return module, released
+
+
+def test_ius_are_released_in_the_order_of_their_release_time():
+    module, released = send([0.08, 0.02, 0.05, 0.02, None])
+    module.shutdown()
+    assert released == [4, 1, 3, 2, 0]
+
+
+def test_dropped_ius_are_never_released():
+    module, released = send([0.01, math.inf, 0.02])
+    module.shutdown()
+    assert released == [0, 2]
+    assert module.pending() == 0
+
+
+def test_shutdown_discards_pending_ius():
+    module, released = send([0.01, 10.0, 10.0], wait=0.05)
+    assert released == [0]
+    assert module.pending() == 2
+    module.shutdown()
+    assert module.pending() == 0
+    assert module._release_thread is None
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from retico.core.audio.common import AudioIU
+from retico.modules.net.degradations import PacketLoss
+
+
+def burst_lengths(states):
+    padded = np.concatenate(([0], states, [0]))
+    edges = np.diff(padded)
+    return np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+
+
+@pytest.mark.parametrize("ppl,burstr", [(0.05, 1.0), (0.1, 2.0), (0.2, 4.0)])
+def test_loss_rate_and_burst_length(ppl, burstr):
+    states = PacketLoss(ppl, burstr, seed=1).loss_pattern(500000)
+    assert states.mean() == pytest.approx(ppl, rel=0.05)
+    # The mean length of a burst is 1 / q = burstr / (1 - ppl)
+    expected = burstr / (1 - ppl)
+    assert burst_lengths(states).mean() == pytest.approx(expected, rel=0.05)
+
+
+def test_patterns_are_reproducible():
+    first = PacketLoss(0.1, 2.0, seed=7).loss_pattern(3000)
+    second = PacketLoss(0.1, 2.0, seed=7).loss_pattern(3000)
+    assert np.array_equal(first, second)
+
+
+def test_per_packet_states_follow_the_pattern():
+    expected = PacketLoss(0.2, 2.0, seed=3).loss_pattern(PacketLoss.BATCH_SIZE)
+    degradation = PacketLoss(0.2, 2.0, seed=3)
+    states = [degradation.determine_packetloss() for _ in range(len(expected))]
+    assert states == expected.tolist()
+
+
+def test_no_loss():
+    assert not PacketLoss(0.0, 1.0, seed=1).loss_pattern(10000).any()
+
+
+def audio_iu(value, nframes=160):
+    iu = AudioIU(creator=None, iuid=0)
+    iu.set_audio(np.full(nframes, value, np.int16), nframes, 16000, 2)
+    return iu
+
+
+@pytest.mark.parametrize("concealment", PacketLoss.CONCEALMENTS)
+def test_concealment_of_lost_packets(concealment):
+    degradation = PacketLoss(0.3, 2.0, concealment=concealment, seed=5)
+    previous_lost = False
+    for _ in range(200):
+        iu = degradation.degrade(audio_iu(1000), None)
+        output = iu.samples()
+        lost = iu.meta_data["packet-loss"]
+        if not lost:
+            assert (output == 1000).all()
+        elif concealment == "zero":
+            assert not output.any()
+        elif concealment == "repeat":
+            assert (output == 1000).all()
+        elif not previous_lost:
+            assert output[0] > 500 and abs(output[-1]) < abs(output[0])
+        previous_lost = lost
+
+
+def test_unknown_concealment():
+    with pytest.raises(ValueError):
+        PacketLoss(0.1, 1.0, concealment="noise")
@@ -0,0 +1,59 @@
+from retico.core.audio import io
+from retico.core.audio.common import AudioIU, AudioTimeline
+
+
+def pcm_iu(start, nframes, timeline=None, sample_offset=None):
+    iu = AudioIU(creator=None, iuid=start)
+    data = b"".join(i.to_bytes(2, "little") for i in range(start, start + nframes))
+    iu.set_audio(data, nframes, 16000, 2)
+    if timeline is not None:
+        iu.set_timeline(timeline, sample_offset)
+    return iu
+
+
+def rechunk(module, ius):
+    q = module.queue_class(module, None)
+    module.add_right_buffer(q)
+    for iu in ius:
+        module.process_iu(iu)
+    outputs = []
+    while not q.empty():
+        outputs.append(q.get().iu)
+    return outputs
+
+
+def test_output_has_fixed_size_and_keeps_all_audio():
+    module = io.AudioRechunkerModule(300)
+    inputs = [pcm_iu(i * 250, 250) for i in range(6)]
+    outputs = rechunk(module, inputs)
+    assert [o.nframes for o in outputs] == [300] * 5
+    assert b"".join(bytes(o.raw_audio) for o in outputs) == b"".join(
+        bytes(i.raw_audio) for i in inputs
+    )
+    assert [o.grounded_in for o in outputs] == inputs[:5]
+
+
+def test_chunks_inside_one_input_are_views():
+    module = io.AudioRechunkerModule(100)
+    outputs = rechunk(module, [pcm_iu(0, 250), pcm_iu(250, 150)])
+    types = [type(o.raw_audio) for o in outputs]
+    assert types == [memoryview, memoryview, bytearray, memoryview]
+
+
+def test_rest_is_kept_until_the_chunk_is_complete():
+    module = io.AudioRechunkerModule(300)
+    assert rechunk(module, [pcm_iu(0, 200)]) == []
+    outputs = rechunk(module, [pcm_iu(200, 100)])
+    assert len(outputs) == 1
+    module.reset()
+    assert rechunk(module, [pcm_iu(0, 200)]) == []
+
+
+def test_sample_offsets_are_continuous():
+    timeline = AudioTimeline(16000)
+    module = io.AudioRechunkerModule(160)
+    outputs = rechunk(
+        module, [pcm_iu(0, 250, timeline, 1000), pcm_iu(250, 250, timeline, 1250)]
+    )
+    assert [o.start_sample() for o in outputs] == [1000, 1160, 1320]
+    assert all(o.stream_id == timeline.stream_id for o in outputs)
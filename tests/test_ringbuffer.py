@@ -0,0 +1,33 @@
+from retico.core.audio.ringbuffer import RingBuffer
+
+
+def test_write_and_read_wrap_around():
+    buffer = RingBuffer(8)
+    assert buffer.write(b"abcdef") == 6
+    assert buffer.read(4) == bytearray(b"abcd")
+    assert buffer.write(b"ghijkl") == 6
+    assert buffer.available() == 8
+    assert buffer.read(8) == bytearray(b"efghijkl")
+    assert buffer.stats()["overruns"] == 0
+
+
+def test_overrun_drops_what_does_not_fit():
+    buffer = RingBuffer(4)
+    assert buffer.write(b"abcdef") == 4
+    assert buffer.stats()["overruns"] == 1
+    assert buffer.stats()["overrun_bytes"] == 2
+    assert buffer.read(4) == bytearray(b"abcd")
+
+
+def test_underrun_is_counted_only_when_requested():
+    buffer = RingBuffer(8)
+    buffer.write(b"ab")
+    out = bytearray(4)
+    assert buffer.read_into(out, count_underrun=False) == 2
+    assert buffer.stats()["underruns"] == 0
+    buffer.write(b"cd")
+    assert buffer.read_into(out) == 2
+    assert out[:2] == bytearray(b"cd")
+    assert buffer.stats()["underruns"] == 1
+    assert buffer.stats()["underrun_bytes"] == 2
+    assert buffer.read(1) is None
@@ -0,0 +1,52 @@
+import pytest
+
+from retico.core.audio.common import AudioIU, AudioTimeline
+
+
+def timeline_iu(timeline, nframes):
+    iu = AudioIU(creator=None, iuid=0)
+    iu.set_audio(bytes(2 * nframes), nframes, timeline.rate, 2)
+    iu.set_timeline(timeline, timeline.advance(nframes))
+    return iu
+
+
+def test_advance_returns_consecutive_offsets():
+    timeline = AudioTimeline(16000)
+    assert timeline.start_time is None
+    assert timeline.advance(160) == 0
+    assert timeline.start_time is not None
+    assert timeline.advance(320) == 160
+    assert timeline.position == 480
+
+
+def test_sample_times_follow_the_speed():
+    timeline = AudioTimeline(16000, speed=2.0)
+    timeline.start(100.0)
+    assert timeline.sample_to_time(16000) == pytest.approx(100.5)
+    assert timeline.time_to_sample(100.5) == 16000
+    assert AudioTimeline(16000).sample_to_time(0) is None
+
+
+def test_iu_times_and_overlap():
+    timeline = AudioTimeline(16000)
+    timeline.start(10.0)
+    first = timeline_iu(timeline, 1600)
+    second = timeline_iu(timeline, 1600)
+    assert first.start_time() == pytest.approx(10.0)
+    assert first.end_time() == pytest.approx(second.start_time())
+    assert first.overlap(second) == 0.0
+    assert first.overlap(first) == pytest.approx(0.1)
+
+    other = AudioTimeline(16000)
+    other.start(10.05)
+    shifted = timeline_iu(other, 1600)
+    assert first.overlap(shifted) == pytest.approx(0.05)
+    assert second.overlap(shifted) == pytest.approx(0.05)
+
+
+def test_iu_without_timeline():
+    iu = AudioIU(creator=None, iuid=0)
+    iu.set_audio(bytes(320), 160, 16000, 2)
+    assert iu.start_time() is None
+    assert iu.end_sample() is None
+    assert iu.overlap(iu) is None
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from retico.core import resources
+from retico.core.audio.common import AudioIU
+from retico.modules.net import batch as net_batch
+from retico.modules.net.degradations import NetworkTrace, TraceDegradation, load_trace
+
+DELAYS = [0.01, 0.02, 0.03, 0.04, 0.05]
+LOST = [0, 0, 1, 0, 0]
+
+
+def write_trace(tmp_path):
+    path = tmp_path / "trace.csv"
+    path.write_text(
+        "delay,lost\n" + "".join("%s,%d\n" % p for p in zip(DELAYS, LOST))
+    )
+    return NetworkTrace(str(path))
+
+
+def test_trace_formats(tmp_path):
+    csv_path = write_trace(tmp_path).path
+    npy_path = tmp_path / "trace.npy"
+    np.save(str(npy_path), np.array([DELAYS, LOST]).T)
+    f32_path = tmp_path / "trace.f32"
+    np.array([0.01, 0.02, np.nan, 0.04, 0.05], dtype="<f4").tofile(str(f32_path))
+    neg_path = tmp_path / "negative.npy"
+    np.save(str(neg_path), np.array([0.01, 0.02, -1.0, 0.04, 0.05]))
+    for path in (csv_path, npy_path, f32_path, neg_path):
+        trace = NetworkTrace(str(path))
+        assert len(trace) == 5
+        assert list(trace.lost) == [bool(v) for v in LOST]
+        assert trace.lookup(2) == (0.0, True)
+        assert trace.lookup(3) == (pytest.approx(0.04), False)
+    with pytest.raises(ValueError):
+        NetworkTrace(str(tmp_path / "trace.txt"))
+
+
+def test_load_trace_is_shared(tmp_path, monkeypatch):
+    resources.clear_resources()
+    path = tmp_path / "trace.csv"
+    path.write_text("delay\n0.01\n")
+    monkeypatch.chdir(tmp_path)
+    assert load_trace("trace.csv") is load_trace(str(path))
+    resources.clear_resources()
+
+
+def packet(created_at):
+    iu = AudioIU(creator=None, iuid=0)
+    iu.set_audio(np.full(160, 1000, np.int16).tobytes(), 160, 8000, 2)
+    iu.created_at = created_at
+    return iu
+
+
+def replay(degradation, count):
+    results = []
+    for index in range(count):
+        iu = packet(1000.0 + 0.02 * index)
+        degradation.degrade(iu, iu)
+        release_at = degradation.schedule(iu, iu, None)
+        lost = iu.meta_data["packet-loss"]
+        results.append((release_at - iu.created_at, lost, any(iu.raw_audio)))
+    return results
+
+
+def test_offset_and_loop(tmp_path):
+    trace = write_trace(tmp_path)
+    results = replay(TraceDegradation(trace, offset=0.04, reorder=True), 5)
+    delays = [delay for delay, _, _ in results]
+    assert delays == pytest.approx([0.0, 0.04, 0.05, 0.01, 0.02])
+    assert [lost for _, lost, _ in results] == [True, False, False, False, False]
+    assert [audible for _, _, audible in results] == [False, True, True, True, True]
+
+
+def test_packets_after_the_end_are_not_degraded(tmp_path):
+    trace = write_trace(tmp_path)
+    results = replay(TraceDegradation(trace, offset=0.06, loop=False), 4)
+    assert results[:2] == [
+        (pytest.approx(0.04), False, True),
+        (pytest.approx(0.05), False, True),
+    ]
+    assert results[2:] == [
+        (pytest.approx(0.05 - 0.02), False, True),
+        (pytest.approx(0.05 - 0.04), False, True),
+    ]
+
+
+def test_packets_keep_their_order_without_reorder(tmp_path):
+    trace = write_trace(tmp_path)
+    degradation = TraceDegradation(trace)
+    releases = []
+    for index in range(5):
+        iu = packet(1000.0)
+        degradation.degrade(iu, iu)
+        releases.append(degradation.schedule(iu, iu, None))
+    assert releases == pytest.approx([1000.01, 1000.02, 1000.02, 1000.04, 1000.05])
+
+
+def test_batch_matches_the_packets(tmp_path):
+    trace = write_trace(tmp_path)
+    results = replay(TraceDegradation(trace, offset=0.02, reorder=True), 12)
+    samples = np.full(12 * 160, 1000, dtype=np.int16)
+    packets = net_batch.PacketBatch(samples, 8000, 2, 1, 160)
+    TraceDegradation(trace, offset=0.02, reorder=True).degrade_batch(packets)
+    transit = packets.release_times - packets.send_times
+    assert list(transit) == pytest.approx([delay for delay, _, _ in results])
+    lost = [lost for _, lost, _ in results]
+    assert list(packets.meta["packet-loss"]) == lost
+    assert [bool(p.any()) for p in packets.samples] == [not v for v in lost]
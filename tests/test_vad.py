@@ -0,0 +1,57 @@
+import numpy as np
+
+from retico.core.audio import dsp
+from retico.core.audio.common import AudioIU
+from retico.core.prosody.vad import EnergyVADModule
+
+
+def feed(module, samples, rate, channels):
+    results = []
+    chunk = int(rate * 0.02) * channels
+    for start in range(0, len(samples), chunk):
+        raw_audio = dsp.from_float(samples[start : start + chunk], 2)
+        iu = AudioIU(creator=None, iuid=0)
+        iu.set_audio(raw_audio, len(raw_audio) // channels, rate, 2, channels)
+        results.append(module.process_iu(iu))
+    return results
+
+
+def test_stereo_speech_is_detected_like_mono():
+    rate = 16000
+    t = np.arange(rate) / rate
+    mono = (0.3 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+    mono[rate // 2 :] = 0
+    stereo = np.stack((mono, mono), axis=1).ravel()
+
+    mono_results = feed(EnergyVADModule(hangover=0.2), mono, rate, 1)
+    stereo_results = feed(EnergyVADModule(hangover=0.2), stereo, rate, 2)
+    assert [iu.is_speaking for iu in mono_results] == [
+        iu.is_speaking for iu in stereo_results
+    ]
+    assert any(iu.is_speaking for iu in stereo_results)
+    assert not stereo_results[-1].is_speaking
+
+
+def chunk_iu(samples, rate, silence=False):
+    iu = AudioIU(creator=None, iuid=0)
+    if silence:
+        iu.set_silence(len(samples), rate, 2)
+    else:
+        iu.set_audio(dsp.from_float(samples, 2), len(samples), rate, 2)
+    return iu
+
+
+def test_silence_span_shorter_than_a_frame_is_kept_in_the_rest():
+    rate = 16000
+    t = np.arange(rate) / rate
+    speech = (0.3 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+    chunks = [speech[:100], np.zeros(100, dtype=np.float32), speech[200:420]]
+
+    spans = EnergyVADModule()
+    audio = EnergyVADModule()
+    for i, samples in enumerate(chunks):
+        spans.process_iu(chunk_iu(samples, rate, silence=i == 1))
+        audio.process_iu(chunk_iu(samples, rate))
+        assert len(spans._rest) == len(audio._rest)
+    assert len(spans._rest) == 100
+    assert spans.energy == audio.energy
@@ -0,0 +1,91 @@
+import pytest
+
+from retico.core.audio import io
+from retico.core.audio.common import AudioIU, AudioTimeline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.slept = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now + 5000.0
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(io, "time", clock)
+    return clock
+
+
+def play(module, ius):
+    heard = []
+    for iu in ius:
+        last = module.last_heard_at
+        module.process_iu(iu)
+        if module.last_heard_at != last:
+            heard.append(module.last_heard_at)
+    return heard
+
+
+def chunk(nframes, silence=False):
+    iu = AudioIU(creator=None, iuid=0)
+    if silence:
+        iu.set_silence(nframes, 1000, 2)
+    else:
+        iu.set_audio(bytes(2 * nframes), nframes, 1000, 2)
+    return iu
+
+
+def test_full_device_buffer_paces_the_input(clock):
+    module = io.VirtualSpeakerModule(rate=1000, buffer_size=100, output_latency=0.02)
+    start = clock.time()
+    heard = play(module, [chunk(100) for _ in range(5)])
+    assert heard == pytest.approx([start + 0.02 + 0.1 * i for i in range(5)])
+    assert clock.slept == pytest.approx(0.3)
+    stats = module.stats()
+    assert stats["chunks"] == 5
+    assert stats["underruns"] == 0
+    assert stats["buffered"] == pytest.approx(0.1)
+
+
+def test_late_input_is_an_underrun(clock):
+    module = io.VirtualSpeakerModule(rate=1000, buffer_size=100, output_latency=0.0)
+    start = clock.time()
+    play(module, [chunk(100)])
+    clock.now += 0.25
+    heard = play(module, [chunk(100)])
+    assert heard == pytest.approx([start + 0.25])
+    stats = module.stats()
+    assert stats["underruns"] == 1
+    assert stats["underrun_time"] == pytest.approx(0.15)
+
+
+def test_silence_spans_are_played_but_not_heard(clock):
+    module = io.VirtualSpeakerModule(rate=1000, buffer_size=100, output_latency=0.0)
+    start = clock.time()
+    heard = play(module, [chunk(100), chunk(1000, silence=True), chunk(100)])
+    assert heard == pytest.approx([start, start + 1.1])
+    assert clock.slept == pytest.approx(1.0)
+    assert module.stats()["chunks"] == 2
+
+
+def test_latency_is_measured_from_the_timeline(clock):
+    module = io.VirtualSpeakerModule(rate=1000, buffer_size=100, output_latency=0.02)
+    timeline = AudioTimeline(1000)
+    timeline.start(clock.time() - 0.5)
+    iu = chunk(100)
+    iu.set_timeline(timeline, 0)
+    play(module, [iu])
+    assert module.stats()["max_latency"] == pytest.approx(0.52)
+    module.reset()
+    assert module.stats()["chunks"] == 0
@@ -0,0 +1,71 @@
+import wave
+
+import numpy as np
+
+from retico.core.audio.wav import BufferedWaveWriter
+
+
+def pcm(values, dtype=np.int16):
+    return np.asarray(values, dtype=dtype).tobytes()
+
+
+def read_frames(path):
+    with wave.open(str(path), "rb") as wav_file:
+        width = wav_file.getsampwidth()
+        data = wav_file.readframes(wav_file.getnframes())
+        return wav_file.getnchannels(), np.frombuffer(
+            data, dtype=np.uint8 if width == 1 else np.int16
+        )
+
+
+def test_audio_written_in_pieces_is_complete(tmp_path):
+    path = tmp_path / "out.wav"
+    writer = BufferedWaveWriter(str(path), rate=100, block_size=0.1)
+    samples = np.arange(250, dtype=np.int16)
+    for start in range(0, 250, 30):
+        writer.write(pcm(samples[start : start + 30]))
+    writer.close()
+    channels, frames = read_frames(path)
+    assert channels == 1
+    assert list(frames) == list(samples)
+    assert writer.frames_written == 250
+
+
+def test_blocks_are_released_when_a_track_falls_behind(tmp_path):
+    path = tmp_path / "out.wav"
+    writer = BufferedWaveWriter(
+        str(path), rate=100, tracks=2, block_size=0.1, max_blocks=2
+    )
+    writer.write(pcm([1] * 5), track=1)
+    writer.write(pcm([2] * 40), track=0)
+    writer.write(pcm([1] * 10), track=1)
+    writer.close()
+    channels, frames = read_frames(path)
+    assert channels == 2
+    frames = frames.reshape(-1, 2)
+    assert list(frames[:, 0]) == [2] * 40
+    assert list(frames[:, 1]) == [1] * 5 + [0] * 35
+    assert writer.dropped_frames == 10
+
+
+def test_audio_for_released_blocks_is_dropped(tmp_path):
+    path = tmp_path / "out.wav"
+    writer = BufferedWaveWriter(str(path), rate=100, block_size=0.1)
+    writer.write(pcm([1] * 15))
+    writer.write(pcm([3] * 15), position=5)
+    writer.close()
+    _, frames = read_frames(path)
+    assert writer.dropped_frames == 5
+    assert list(frames) == [1] * 10 + [3] * 10
+    assert writer.frames_written == 20
+
+
+def test_silence_of_8_bit_audio_is_centered(tmp_path):
+    path = tmp_path / "out.wav"
+    writer = BufferedWaveWriter(
+        str(path), rate=100, sample_width=1, tracks=2, block_size=0.1
+    )
+    writer.write(pcm([200] * 10, dtype=np.uint8), track=0)
+    writer.close()
+    _, frames = read_frames(path)
+    assert list(frames.reshape(-1, 2)[:, 1]) == [128] * 10